@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from datetime import datetime
-from pathlib import Path
+import re
+from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
 from app.api import deps
+from app.core import metrics, profiling
 from app.core.config import get_settings
 from app.models.user import User
+from app.schemas.upload import PresignedUpload, UploadPresignRequest
+from app.db.session import engine
+from app.services import ai_usage, export, reading_cards, storage
+from app.utils.security import create_token
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -75,21 +83,144 @@ async def test_ai(_: User = Depends(deps.require_admin)):
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: User = Depends(deps.get_current_user_async),
 ):
+    if (file.size or 0) > get_settings().upload_max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    contents = await file.read()
+    metrics.UPLOAD_BYTES.labels("admin").inc(len(contents))
+    url = await storage.save_upload("upload", file.filename, contents, file.content_type or "application/octet-stream", ".bin")
+    return {"url": url}
+
+
+@router.post("/upload/presign", response_model=PresignedUpload)
+async def presign_upload(
+    payload: UploadPresignRequest,
+    current_user: User = Depends(deps.get_current_user_async),
+):
+    if payload.size > get_settings().upload_max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    return storage.presign_upload("upload", payload, ".bin")
+
+
+@router.get("/export/{kind}")
+def export_table(
+    kind: str,
+    format: str = Query(default="ndjson"),
+    gzip: bool = Query(default=True),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    user_id: int | None = Query(default=None),
+    _: User = Depends(deps.require_admin),
+):
+    if kind not in export.EXPORT_SOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {kind}")
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    stream = export.export_stream(kind, fmt=format, gzip=gzip, since=since, until=until, user_id=user_id)
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    filename = export.export_filename(kind, format, gzip)
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/profile/worker")
+async def profile_worker(
+    seconds: float = Query(default=10, gt=0),
+    interval_ms: int = Query(default=5, ge=1, le=1000),
+    _: User = Depends(deps.require_admin),
+):
+    """Sample every thread of the worker serving this call for `seconds`; returns collapsed stacks."""
     settings = get_settings()
-    date_path = datetime.utcnow().strftime("%Y/%m/%d")
-    upload_dir = Path(settings.upload_dir) / date_path
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    if seconds > settings.profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.profile_max_seconds}")
+    if not profiling.try_begin_worker_profile():
+        raise HTTPException(status_code=409, detail="A worker profile is already running")
+    try:
+        sampler = profiling.StackSampler(interval_ms / 1000).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await run_in_threadpool(sampler.stop)
+    finally:
+        profiling.end_worker_profile()
+    filename = f"worker-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.collapsed"
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(sampler.sample_count),
+            "X-Worker-Pid": str(os.getpid()),
+        },
+    )
+
+
+@router.post("/profile/request-token")
+def profile_request_token(current_user: User = Depends(deps.require_admin)):
+    """Short-lived token; send it as `X-Profile-Token` on any request to profile that request."""
+    settings = get_settings()
+    expires = timedelta(minutes=settings.profile_token_expire_minutes)
+    token = create_token({"sub": str(current_user.id), "type": "profile"}, expires)
+    return {"token": token, "header": "X-Profile-Token", "expires_in": int(expires.total_seconds())}
+
+
+@router.get("/profile/requests/{profile_id}")
+def get_request_profile(profile_id: str, _: User = Depends(deps.require_admin)):
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = get_settings().profile_dir / f"{profile_id}.collapsed"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+def _check_rollup_params(granularity: str, dimension: str) -> None:
+    if granularity not in ai_usage.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(ai_usage.GRANULARITIES)}")
+    if dimension not in ai_usage.DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(ai_usage.DIMENSIONS)}")
+
+
+@router.get("/analytics/ai/series")
+def ai_usage_series(
+    granularity: str = Query(default="day"),
+    dimension: str = Query(default="model"),
+    key: str | None = Query(default=None),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    _: User = Depends(deps.require_admin),
+    session: Session = Depends(deps.get_db),
+):
+    """Per-bucket calls, errors, p50/p95 latency, tokens and cost; reads rollups only."""
+    _check_rollup_params(granularity, dimension)
+    return ai_usage.series(session, granularity, dimension, since=since, until=until, key=key)
+
+
+@router.get("/analytics/ai/summary")
+def ai_usage_summary(
+    granularity: str = Query(default="day"),
+    dimension: str = Query(default="model"),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=500),
+    _: User = Depends(deps.require_admin),
+    session: Session = Depends(deps.get_db),
+):
+    """Totals per model or user over the range (bucket sketches merged for percentiles)."""
+    _check_rollup_params(granularity, dimension)
+    return ai_usage.summary(session, granularity, dimension, since=since, until=until, limit=limit)
 
-    suffix = Path(file.filename or "file.bin").suffix
-    safe_name = f"upload_{int(datetime.utcnow().timestamp())}{suffix}"
-    dest = upload_dir / safe_name
 
-    contents = await file.read()
-    with open(dest, "wb") as f:
-        f.write(contents)
+@router.get("/analytics/cards")
+def card_analytics(_: User = Depends(deps.require_admin), session: Session = Depends(deps.get_db)):
+    """How often each card is drawn (by side) and average colour scores, from readingcard rows."""
+    return reading_cards.card_stats(session)
 
-    relative = dest.relative_to(Path.cwd())
-    url = "/" + str(relative).replace("\\", "/")
-    return {"url": url}
+
+@router.post("/analytics/ai/compact")
+def ai_usage_compact(_: User = Depends(deps.require_admin)):
+    """Roll up pending AICallLog rows and apply retention now instead of waiting for the timer."""
+    return ai_usage.run_maintenance(engine)
@@ -1,84 +1,135 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import json
 import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Awaitable, List, Optional, Sequence, Tuple, TypeVar
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps
+from app.core import admission, metrics
 from app.core.config import get_settings
+from app.core.response_cache import response_cache
+from app.core.responses import FastJSONResponse, rows_as_dicts
+from app.db.session import get_async_session
 from app.models.ai_log import AICallLog
+from app.models.archive_job import ArchiveJob
 from app.models.card_definition import CardDefinition
 from app.models.card_reading import CardReading
-from app.schemas.reading import ReadingRead
+from app.schemas.reading import BatchInterpretRequest, ReadingRead, ReadingSummary
 from app.schemas.card import CardDefinitionRead, CardFace
-from app.services import ai_client
+from app.schemas.upload import PresignedUpload, UploadPresignRequest
+from app.services import ai_client, archive, prompt_budget, reading_cards, reading_similarity, storage
 import logging
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
+T = TypeVar("T")
 
-def _serialize_card_definition(card) -> CardDefinitionRead:
-    return CardDefinitionRead(
-        id=card.id,
-        front=CardFace(
-            title=card.front_title,
-            english=card.front_english,
-            value=card.front_value,
-            color=card.front_color,
-            image=card.front_image,
-        ),
-        back=CardFace(
-            title=card.back_title,
-            english=card.back_english,
-            value=card.back_value,
-            color=card.back_color,
-            image=card.back_image,
-        ),
-    )
+
+_FACE_FIELDS = tuple(CardFace.model_fields)
+_FACE_COLUMNS = {
+    side: tuple(getattr(CardDefinition, f"{side}_{field}") for field in _FACE_FIELDS) for side in ("front", "back")
+}
 
 
 @router.get("/cards", response_model=List[CardDefinitionRead])
 def list_card_definitions(
+    request: Request,
     session: Session = Depends(deps.get_db),
     current_user=Depends(deps.get_current_user),
 ):
-    cards = session.exec(select(CardDefinition).order_by(CardDefinition.id)).all()
-    return [_serialize_card_definition(card) for card in cards]
+    # the same catalog for every user; card definitions only change when seeded
+    cached = response_cache.get(("cards",))
+    if cached is None:
+        version = response_cache.version
+        # trusted rows straight to CardDefinitionRead-shaped dicts (app.core.responses)
+        rows = session.exec(
+            select(CardDefinition.id, *_FACE_COLUMNS["front"], *_FACE_COLUMNS["back"]).order_by(CardDefinition.id)
+        ).all()
+        cached = response_cache.put(("cards",), card_dicts(rows), version)
+    return cached.response(request)
+
+
+def card_dicts(rows: Sequence[Sequence[Any]]) -> List[dict]:
+    """(id, front faces..., back faces...) rows as CardDefinitionRead-shaped dicts."""
+    n = len(_FACE_FIELDS)
+    return [
+        {
+            "id": row[0],
+            "front": dict(zip(_FACE_FIELDS, row[1 : n + 1])),
+            "back": dict(zip(_FACE_FIELDS, row[n + 1 :])),
+        }
+        for row in rows
+    ]
 
 
 @router.post("/upload")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user=Depends(deps.get_current_user_optional),
+    current_user=Depends(deps.get_current_user_optional_async),
 ):
-    settings = get_settings()
-    upload_dir = Path(settings.upload_dir) / datetime.utcnow().strftime("%Y/%m/%d")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    if (file.size or 0) > get_settings().upload_max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    prefix = f"reading_{getattr(current_user, 'id', 'anon')}"
+    content = await file.read()
+    metrics.UPLOAD_BYTES.labels("ai").inc(len(content))
+    url = await storage.save_upload(prefix, file.filename, content, file.content_type or "image/png", ".png")
+    return {"url": url}
 
-    suffix = Path(file.filename or "file.png").suffix or ".png"
-    prefix = f"{getattr(current_user, 'id', 'anon')}"
-    filename = f"reading_{prefix}_{int(datetime.utcnow().timestamp())}{suffix}"
-    dest = upload_dir / filename
 
-    content = await file.read()
-    with open(dest, "wb") as f:
-        f.write(content)
+@router.post("/upload/presign", response_model=PresignedUpload)
+async def presign_image_upload(
+    payload: UploadPresignRequest,
+    current_user=Depends(deps.get_current_user_optional_async),
+):
+    """Direct upload: PUT the file to `upload_url` with `headers`, then use `url`."""
+    if payload.size > get_settings().upload_max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    return storage.presign_upload(f"reading_{getattr(current_user, 'id', 'anon')}", payload, ".png")
 
-    relative = dest.relative_to(Path.cwd())
-    url = "/" + str(relative).replace("\\", "/")
-    return {"url": url}
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # the body is already consumed, so the next ASGI message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _unless_disconnected(request: Request, call: Awaitable[T]) -> T:
+    """Await `call`, cancelling it (and its upstream connection) if the client goes away."""
+    task = asyncio.ensure_future(call)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if not task.done():
+        # the client disconnected first
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        raise ai_client.AICallCancelled("client disconnected")
+    return task.result()
 
 
 @router.post("/card/interpret-with-image", response_model=ReadingRead)
 async def interpret_with_image(
+    request: Request,
+    response: Response,
     card_type: str = Form(...),
     scene_desc: str = Form(...),
     cardset_layout: str = Form(default="[]"),
@@ -87,31 +138,16 @@ async def interpret_with_image(
     cardset_layout_summary: str = Form(default=""),
     cardset_score_logic: str = Form(default=""),
     image_files: List[UploadFile] = File(default_factory=list),
-    session: Session = Depends(deps.get_db),
-    current_user=Depends(deps.get_current_user),
+    session: AsyncSession = Depends(deps.get_async_db),
+    current_user=Depends(deps.get_current_user_async),
 ):
-    print(
-        "[ai] interpret start",
-        {
-            "user": current_user.id,
-            "card_type": card_type,
-            "scene_len": len(scene_desc or ""),
-            "layout_raw_len": len(cardset_layout or ""),
-            "scores_raw_len": len(cardset_scores or ""),
-        },
-        flush=True,
-    )
     deps.rate_limit_ai(current_user.id)
     settings = get_settings()
-    logger.info(
-        "interpret request user=%s files=%s card_type=%s",
-        current_user.id,
-        0,
-        card_type,
-    )
+    # the deadline covers the whole request, so time spent before the AI call counts
+    deadline = asyncio.get_running_loop().time() + settings.ai_request_timeout_seconds
     saved_paths: List[str] = []
     upload_dir = Path(settings.upload_dir) / datetime.utcnow().strftime("%Y/%m/%d")
-    os.makedirs(upload_dir, exist_ok=True)
+    await run_in_threadpool(os.makedirs, upload_dir, exist_ok=True)
 
     file_buffers: List[Tuple[str, bytes]] = []
     for idx, file in enumerate(image_files):
@@ -129,59 +165,47 @@ async def interpret_with_image(
         parsed_scores = {}
 
     logger.info(
-        "ai request user=%s layout_len=%s scores_len=%s files=%s layout_summary_len=%s score_text_len=%s scene_len=%s",
-        current_user.id,
-        len(cardset_layout or ""),
-        len(cardset_scores or ""),
-        0,
-        len(cardset_layout_summary or ""),
-        len(cardset_score_text or ""),
-        len(scene_desc or ""),
-    )
-
-    prompt = ai_client.build_prompt(
-        card_type=card_type,
-        scene_desc=scene_desc,
-        cardset_layout=json.dumps(parsed_layout, ensure_ascii=False),
-        cardset_scores=json.dumps(parsed_scores, ensure_ascii=False),
-        cardset_score_text=cardset_score_text,
-        cardset_layout_summary=cardset_layout_summary,
-        cardset_score_logic=cardset_score_logic,
-    )
-    print(
-        "[ai] prompt preview",
-        {
-            "prompt_len": len(prompt),
-            "prompt_snippet": prompt[:200],
+        "interpret request",
+        extra={
+            "user_id": current_user.id,
+            "card_type": card_type,
+            "files": len(file_buffers),
+            "scene_len": len(scene_desc or ""),
+            "layout_len": len(cardset_layout or ""),
+            "scores_len": len(cardset_scores or ""),
+            "layout_summary_len": len(cardset_layout_summary or ""),
+            "score_text_len": len(cardset_score_text or ""),
         },
-        flush=True,
     )
-    try:
-        ai_result = await ai_client.call_ai_model(files=file_buffers, prompt=prompt, user_id=current_user.id)
-    except Exception as exc:  # surface AI errors to frontend
-        logger.exception("AI call failed user=%s", current_user.id)
-        raise HTTPException(status_code=400, detail=f"AI invocation failed: {exc}") from exc
 
-    print(
-        "[ai] model response",
-        {
-            "latency_ms": ai_result.get("latency_ms"),
-            "has_cards": bool(ai_result.get("cards") or ai_result.get("raw", {}).get("cards")),
-            "analysis_len": len(ai_result.get("analysis") or json.dumps(ai_result.get("raw") or {})),
-        },
-        flush=True,
-    )
+    orientation = reading_similarity.orientation_from_layout(parsed_layout)
+    prior = await _find_prior(session, card_type, orientation, scene_desc, current_user.id)
 
-    logger.info(
-        "ai response user=%s latency_ms=%s has_cards=%s analysis_len=%s",
-        current_user.id,
-        ai_result.get("latency_ms"),
-        bool(ai_result.get("cards") or ai_result.get("raw", {}).get("cards")),
-        len(ai_result.get("analysis") or json.dumps(ai_result.get("raw") or {})),
-    )
-
-    cards_json = ai_result.get("cards") or ai_result.get("raw", {}).get("cards")
-    ai_response = ai_result.get("analysis") or json.dumps(ai_result.get("raw"), ensure_ascii=False)
+    if prior is not None and settings.reading_reuse_mode == "serve":
+        ai_response, cards_json, log = prior.ai_response, prior.cards_json, None
+        response.headers["X-Reading-Reused-From"] = str(prior.id)
+    else:
+        ai_cfg = await run_in_threadpool(settings.load_ai_config)
+        model_name = ai_cfg.model if ai_cfg else "stub"
+        prompt = ai_client.assemble_prompt(
+            card_type=card_type,
+            scene_desc=scene_desc,
+            cardset_layout=parsed_layout,
+            cardset_scores=parsed_scores,
+            cardset_score_text=cardset_score_text,
+            cardset_layout_summary=cardset_layout_summary,
+            cardset_score_logic=cardset_score_logic,
+            reference_analysis=prior.ai_response if prior is not None else None,
+            deck=await prompt_budget.get_deck(),
+            model=model_name,
+        )
+        # end the read transaction so the pooled connection isn't held for the whole model
+        # call; loaded rows stay usable (expire_on_commit=False) and the writes below check
+        # a connection out again
+        await session.commit()
+        ai_response, cards_json, log = await _interpret(
+            request, session, prompt, file_buffers, current_user.id, model_name, deadline
+        )
 
     reading = CardReading(
         user_id=current_user.id,
@@ -192,28 +216,308 @@ async def interpret_with_image(
         image_urls=saved_paths,
     )
     session.add(reading)
+    if log is not None:
+        session.add(log)
+    await session.flush()
+    session.add_all(
+        reading_cards.normalize(
+            reading.id, parsed_layout, reading_cards.extract_cards(cards_json, ai_response), await prompt_budget.get_deck()
+        )
+    )
+    fingerprint = None
+    if orientation:
+        fingerprint = reading_similarity.build_fingerprint(reading.id, current_user.id, card_type, orientation, scene_desc)
+        session.add(fingerprint)
+
+    if settings.auto_archive_readings:
+        session.add(ArchiveJob(reading_id=reading.id))
+
+    await session.commit()
+    await session.refresh(reading)
+    if fingerprint is not None:
+        reading_similarity.remember(fingerprint)
+    if settings.auto_archive_readings:
+        archive.wake()
+    return reading
+
+
+async def _interpret(
+    request: Request,
+    session: AsyncSession,
+    prompt: ai_client.PromptBuild,
+    file_buffers: List[Tuple[str, bytes]],
+    user_id: int,
+    model_name: str,
+    deadline: float,
+) -> Tuple[str, Any, AICallLog]:
+    """Run the model call; returns (analysis, cards, success log) or raises the HTTP error."""
+    logger.debug("prompt built", extra={"prompt_len": len(prompt.text), "prompt_snippet": prompt.text[:200]})
+    call_start = time.perf_counter()
+    failure = None
+    try:
+        with metrics.track_ai_inflight():
+            ai_result = await _unless_disconnected(
+                request,
+                ai_client.call_ai_model(
+                    files=file_buffers, prompt=prompt.text, user_id=user_id, deadline=deadline, system=prompt.system
+                ),
+            )
+    except ai_client.AICallCancelled:
+        logger.info("AI call cancelled, client disconnected", extra={"user_id": user_id})
+        failure = ("cancelled", HTTPException(status_code=499, detail="Client closed request"))
+    except ai_client.AICallTimeout as exc:
+        logger.warning("AI call timed out", extra={"user_id": user_id})
+        failure = ("timeout", HTTPException(status_code=504, detail=f"AI invocation failed: {exc}"))
+    except Exception as exc:  # surface AI errors to frontend
+        logger.exception("AI call failed", extra={"user_id": user_id})
+        failure = ("error", HTTPException(status_code=400, detail=f"AI invocation failed: {exc}"))
+    if failure is not None:
+        outcome, error = failure
+        # failed calls feed the usage rollups
+        session.add(
+            AICallLog(
+                user_id=user_id,
+                model=model_name,
+                latency_ms=int((time.perf_counter() - call_start) * 1000),
+                prompt_tokens_raw=prompt.raw_tokens,
+                prompt_tokens_compacted=prompt.tokens,
+                status=outcome,
+            )
+        )
+        await session.commit()
+        raise error
+
+    return _completed(ai_result, user_id, model_name, prompt)
+
+
+async def _find_prior(
+    session: AsyncSession, card_type: str, orientation: dict, scene_desc: str, user_id: int
+) -> Optional[CardReading]:
+    """The reading a near-duplicate request can reuse (READING_REUSE_MODE), if any."""
+    if get_settings().reading_reuse_mode == "off":
+        return None
+    match = await reading_similarity.find_similar(card_type, orientation, scene_desc, user_id)
+    prior = await session.get(CardReading, match.reading_id) if match is not None else None
+    metrics.record_cache("reading_reuse", prior is not None)
+    if prior is not None:
+        logger.info(
+            "similar reading found",
+            extra={"user_id": user_id, "prior_id": prior.id, "score": round(match.score, 3)},
+        )
+    return prior
+
 
+def _completed(
+    ai_result: dict, user_id: int, model_name: str, prompt: ai_client.PromptBuild
+) -> Tuple[str, Any, AICallLog]:
+    cards_json = ai_result.get("cards") or ai_result.get("raw", {}).get("cards")
+    ai_response = ai_result.get("analysis") or json.dumps(ai_result.get("raw"), ensure_ascii=False)
+    logger.info(
+        "interpret response",
+        extra={
+            "user_id": user_id,
+            "latency_ms": ai_result.get("latency_ms"),
+            "has_cards": bool(cards_json),
+            "analysis_len": len(ai_response),
+        },
+    )
+    usage = (ai_result.get("raw") or {}).get("usage") or {}
+    cached = ai_client.cached_tokens(usage)
+    if usage.get("prompt_tokens") is not None:
+        metrics.AI_PROMPT_TOKENS.labels(model_name, "cached").inc(cached or 0)
+        metrics.AI_PROMPT_TOKENS.labels(model_name, "uncached").inc(max(usage["prompt_tokens"] - (cached or 0), 0))
     log = AICallLog(
-        user_id=current_user.id,
-        model=(settings.load_ai_config().model if settings.load_ai_config() else "stub"),
-        tokens_in=None,
-        tokens_out=None,
+        user_id=user_id,
+        model=model_name,
+        tokens_in=usage.get("prompt_tokens"),
+        tokens_out=usage.get("completion_tokens"),
+        tokens_cached=cached,
         latency_ms=ai_result.get("latency_ms"),
+        prompt_tokens_raw=prompt.raw_tokens,
+        prompt_tokens_compacted=prompt.tokens,
         status="success",
     )
-    session.add(log)
+    return ai_response, cards_json, log
 
-    session.commit()
-    session.refresh(reading)
-    return reading
+
+@router.post("/card/interpret-batch")
+async def interpret_batch(
+    payload: BatchInterpretRequest,
+    session: AsyncSession = Depends(deps.get_async_db),
+    current_user=Depends(deps.get_current_user_async),
+):
+    """Interpret several layouts at once, streaming one NDJSON line per item as it finishes.
+
+    Item lines carry the request ``index`` and either the interpretation or an error
+    ``status``/``detail``; the last line lists the saved reading id per index, all written
+    in one transaction once every call has finished.
+    """
+    settings = get_settings()
+    items = payload.items
+    if not items or len(items) > settings.ai_batch_max_items:
+        raise HTTPException(status_code=400, detail=f"A batch takes 1-{settings.ai_batch_max_items} items")
+    user_id = current_user.id
+    deps.rate_limit_ai(user_id, cost=len(items))
+
+    ai_cfg = await run_in_threadpool(settings.load_ai_config)
+    model_name = ai_cfg.model if ai_cfg else "stub"
+    tier, extra_params, timeout = "standard", None, settings.ai_request_timeout_seconds
+    if payload.tier == "offline" and ai_cfg and ai_cfg.offline_params:
+        tier, extra_params, timeout = "offline", ai_cfg.offline_params, settings.ai_batch_offline_timeout_seconds
+
+    # lookups and prompts first: the request session can't be shared by concurrent calls
+    orientations, prompts, served = [], {}, {}
+    deck = await prompt_budget.get_deck()
+    for index, item in enumerate(items):
+        orientation = reading_similarity.orientation_from_layout(item.cardset_layout)
+        orientations.append(orientation)
+        prior = await _find_prior(session, item.card_type, orientation, item.scene_desc, user_id)
+        if prior is not None and settings.reading_reuse_mode == "serve":
+            served[index] = (prior.ai_response, prior.cards_json, prior.id)
+            continue
+        prompts[index] = ai_client.assemble_prompt(
+            card_type=item.card_type,
+            scene_desc=item.scene_desc,
+            cardset_layout=item.cardset_layout,
+            cardset_scores=item.cardset_scores,
+            cardset_score_text=item.cardset_score_text,
+            cardset_layout_summary=item.cardset_layout_summary,
+            cardset_score_logic=item.cardset_score_logic,
+            reference_analysis=prior.ai_response if prior is not None else None,
+            deck=deck,
+            model=model_name,
+        )
+    logger.info(
+        "interpret batch",
+        extra={"user_id": user_id, "items": len(items), "served": len(served), "tier": tier},
+    )
+    semaphore = asyncio.Semaphore(max(1, settings.ai_batch_concurrency))
+
+    async def run(index: int) -> Tuple[int, dict]:
+        async with semaphore, admission.ai_slots.hold() as shed:
+            if shed is not None:
+                return index, {"status": 503, "detail": "Server busy, retry later", "reason": shed}
+            call_start = time.perf_counter()
+            deadline = asyncio.get_running_loop().time() + timeout
+            try:
+                with metrics.track_ai_inflight():
+                    ai_result = await ai_client.call_ai_model(
+                        files=[],
+                        prompt=prompts[index].text,
+                        user_id=user_id,
+                        deadline=deadline,
+                        extra_params=extra_params,
+                        system=prompts[index].system,
+                    )
+            except ai_client.AICallTimeout as exc:
+                logger.warning("AI call timed out", extra={"user_id": user_id, "index": index})
+                outcome, status, detail = "timeout", 504, str(exc)
+            except Exception as exc:  # reported on the item's line
+                logger.exception("AI call failed", extra={"user_id": user_id, "index": index})
+                outcome, status, detail = "error", 400, str(exc)
+            else:
+                ai_response, cards_json, log = _completed(ai_result, user_id, model_name, prompts[index])
+                return index, {"ai_response": ai_response, "cards_json": cards_json, "log": log}
+            log = AICallLog(
+                user_id=user_id,
+                model=model_name,
+                latency_ms=int((time.perf_counter() - call_start) * 1000),
+                prompt_tokens_raw=prompts[index].raw_tokens,
+                prompt_tokens_compacted=prompts[index].tokens,
+                status=outcome,
+            )
+            return index, {"status": status, "detail": f"AI invocation failed: {detail}", "log": log}
+
+    def line(data: dict) -> bytes:
+        return (json.dumps(data, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    async def stream():
+        results: dict = {}
+        tasks = [asyncio.ensure_future(run(index)) for index in prompts]
+        try:
+            for index, (ai_response, cards_json, prior_id) in served.items():
+                results[index] = {"ai_response": ai_response, "cards_json": cards_json}
+                yield line({"index": index, "status": 200, "ai_response": ai_response, "cards_json": cards_json, "reused_from": prior_id})
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                results[index] = result
+                body = {k: v for k, v in result.items() if k != "log"}
+                yield line({"index": index, "status": 200, **body} if "ai_response" in body else {"index": index, **body})
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    results.setdefault(*task.result())
+                task.cancel()
+            # keep what was paid for even if the client went away mid-stream
+            reading_ids = await asyncio.shield(_save_batch(items, orientations, results, user_id))
+        yield line({"done": True, "tier": tier, "reading_ids": reading_ids})
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def _save_batch(items: list, orientations: list, results: dict, user_id: int) -> List[Optional[int]]:
+    readings: dict = {}
+    fingerprints = []
+    # the usage compactor treats created_at as insert time (its settle window), so logs
+    # built as items finished are stamped now, when they are actually written
+    inserted_at = datetime.utcnow()
+    async with get_async_session() as session:
+        for index, result in results.items():
+            if result.get("log") is not None:
+                result["log"].created_at = inserted_at
+                session.add(result["log"])
+            if "ai_response" not in result:
+                continue
+            item = items[index]
+            readings[index] = CardReading(
+                user_id=user_id,
+                card_type=item.card_type,
+                scene_desc=item.scene_desc,
+                ai_response=result["ai_response"],
+                cards_json=result["cards_json"],
+                image_urls=[],
+            )
+            session.add(readings[index])
+        await session.flush()
+        deck = await prompt_budget.get_deck()
+        for index, reading in readings.items():
+            session.add_all(
+                reading_cards.normalize(
+                    reading.id,
+                    items[index].cardset_layout,
+                    reading_cards.extract_cards(reading.cards_json, reading.ai_response),
+                    deck,
+                )
+            )
+            if get_settings().auto_archive_readings:
+                session.add(ArchiveJob(reading_id=reading.id))
+            if orientations[index]:
+                fingerprint = reading_similarity.build_fingerprint(
+                    reading.id, user_id, reading.card_type, orientations[index], reading.scene_desc
+                )
+                session.add(fingerprint)
+                fingerprints.append(fingerprint)
+        await session.commit()
+    for fingerprint in fingerprints:
+        reading_similarity.remember(fingerprint)
+    if readings and get_settings().auto_archive_readings:
+        archive.wake()
+    return [readings[index].id if index in readings else None for index in range(len(items))]
+
+
+def my_readings_query(user_id: int):
+    # only the summary columns are selected; fetch payloads via /readings/{id}
+    return (
+        select(*(getattr(CardReading, field) for field in ReadingSummary.model_fields))
+        .where(CardReading.user_id == user_id)
+        .order_by(CardReading.created_at.desc())
+    )
 
 
-@router.get("/readings/my", response_model=List[ReadingRead])
+@router.get("/readings/my", response_model=List[ReadingSummary])
 def my_readings(current_user=Depends(deps.get_current_user), session: Session = Depends(deps.get_db)):
-    readings = session.exec(
-        select(CardReading).where(CardReading.user_id == current_user.id).order_by(CardReading.created_at.desc())
-    ).all()
-    return readings
+    rows = session.exec(my_readings_query(current_user.id)).all()
+    return FastJSONResponse(rows_as_dicts(rows, tuple(ReadingSummary.model_fields)))
 
 
 @router.get("/readings/{reading_id}", response_model=ReadingRead)
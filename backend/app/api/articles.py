@@ -1,18 +1,31 @@
 ﻿from __future__ import annotations
 
 import markdown2
-from typing import Optional
+from typing import Any, Optional, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
 from sqlmodel import Session, select
-from sqlalchemy import or_
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 
 from app.api import deps
+from app.core.response_cache import response_cache
+from app.core.responses import FastJSONResponse
+from app.models.archive_job import ArchiveJob
 from app.models.article import Article, ArticleLike, ArticleTagLink, Comment, Tag
 from app.models.card_reading import CardReading
 from app.models.user import User
-from app.schemas.article import ArticleCreate, ArticleRead, CommentCreate, CommentRead
+from app.schemas.article import (
+    ArchiveJobRead,
+    ArchiveRequest,
+    ArticleCreate,
+    ArticleRead,
+    CommentCreate,
+    CommentRead,
+)
+from app.services import archive
+from app.services.notifications import article_topic, broker, user_topic
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -25,10 +38,48 @@ class ArticleUpdate(BaseModel):
     delete: Optional[bool] = None
 
 
+# Statement builders for the hot queries below; app.db.query_plans checks their plans.
+
+
+def tag_by_name_query(name: str):
+    return select(Tag).where(Tag.name == name)
+
+
+def article_tags_query(article_id: int):
+    return select(Tag).join(ArticleTagLink, Tag.id == ArticleTagLink.tag_id).where(ArticleTagLink.article_id == article_id)
+
+
+def article_likes_query(article_id: int):
+    return select(ArticleLike).where(ArticleLike.article_id == article_id)
+
+
+def comments_query(article_id: int):
+    return select(Comment).where(Comment.article_id == article_id).order_by(Comment.created_at.asc())
+
+
+def feed_query(author_id: int | None = None, tag: str | None = None):
+    """Published articles (or one author's, drafts included), newest first, optionally by tag."""
+    if author_id is not None:
+        query = select(Article).where(Article.author_id == author_id)
+    else:
+        query = select(Article).where(Article.is_published == True)  # noqa: E712
+    query = query.order_by(Article.created_at.desc())
+    if tag:
+        query = query.join(ArticleTagLink, ArticleTagLink.article_id == Article.id).join(Tag, Tag.id == ArticleTagLink.tag_id).where(Tag.name == tag)
+    return query
+
+
+def feed_tags_query(ids):
+    return select(ArticleTagLink.article_id, Tag.name).join(Tag, Tag.id == ArticleTagLink.tag_id).where(ArticleTagLink.article_id.in_(ids))
+
+
+def feed_likes_query(ids):
+    return select(ArticleLike.article_id, func.count()).where(ArticleLike.article_id.in_(ids)).group_by(ArticleLike.article_id)
+
+
 def _attach_tags(session: Session, article: Article, tag_names: list[str]) -> None:
-    unique_names = {name.strip().lower() for name in tag_names if name.strip() and not name.strip().isdigit()}
-    for name in unique_names:
-        tag = session.exec(select(Tag).where(Tag.name == name)).first()
+    for name in archive.clean_tag_names(tag_names):
+        tag = session.exec(tag_by_name_query(name)).first()
         if not tag:
             tag = Tag(name=name)
             session.add(tag)
@@ -44,14 +95,9 @@ def _clear_tags(session: Session, article_id: int) -> None:
 
 
 def _to_read_model(session: Session, article: Article) -> ArticleRead:
-    tag_names_raw = [
-        tag.name
-        for tag in session.exec(
-            select(Tag).join(ArticleTagLink, Tag.id == ArticleTagLink.tag_id).where(ArticleTagLink.article_id == article.id)
-        ).all()
-    ]
+    tag_names_raw = [tag.name for tag in session.exec(article_tags_query(article.id)).all()]
     tag_names = [t for t in tag_names_raw if t and not t.strip().isdigit()]
-    likes = session.exec(select(ArticleLike).where(ArticleLike.article_id == article.id)).all()
+    likes = session.exec(article_likes_query(article.id)).all()
     likes_count = len(likes)
     author = session.get(User, article.author_id)
     return ArticleRead(
@@ -71,6 +117,66 @@ def _to_read_model(session: Session, article: Article) -> ArticleRead:
     )
 
 
+ARTICLE_COLUMNS = (
+    Article.id,
+    Article.title,
+    Article.content_markdown,
+    Article.content_html,
+    Article.is_published,
+    Article.is_auto_generated,
+    Article.is_featured,
+    Article.author_id,
+    Article.from_reading_id,
+    Article.created_at,
+)
+
+
+def _article_dicts(session: Session, query) -> list[dict]:
+    """ArticleRead-shaped dicts for the articles `query` selects, without ORM or pydantic objects.
+
+    Tags, like counts and author names take one query each, filtered by `query` itself.
+    """
+    # execute, not exec: the query is a scalar select of Article, the columns need rows
+    rows = session.execute(query.with_only_columns(*ARTICLE_COLUMNS)).all()
+    if not rows:
+        return []
+    ids = query.with_only_columns(Article.id).order_by(None)
+    tags: dict[int, list[str]] = {}
+    for article_id, name in session.exec(feed_tags_query(ids)).all():
+        if name and not name.strip().isdigit():
+            tags.setdefault(article_id, []).append(name)
+    likes = dict(session.exec(feed_likes_query(ids)).all())
+    authors = dict(session.exec(select(User.id, User.nickname).where(User.id.in_({row[7] for row in rows}))).all())
+    return article_dicts(rows, tags, likes, authors)
+
+
+def article_dicts(
+    rows: Sequence[Sequence[Any]],
+    tags: dict[int, list[str]],
+    likes: dict[int, int],
+    authors: dict[int, str],
+) -> list[dict]:
+    """ARTICLE_COLUMNS rows plus their related values as ArticleRead-shaped dicts."""
+    return [
+        {
+            "id": id_,
+            "title": title,
+            "content_markdown": markdown,
+            "content_html": html,
+            "is_published": is_published,
+            "is_auto_generated": is_auto_generated,
+            "is_featured": is_featured,
+            "author_id": author_id,
+            "author_name": authors.get(author_id),
+            "from_reading_id": from_reading_id,
+            "tags": tags.get(id_, []),
+            "created_at": created_at,
+            "likes_count": likes.get(id_, 0),
+        }
+        for id_, title, markdown, html, is_published, is_auto_generated, is_featured, author_id, from_reading_id, created_at in rows
+    ]
+
+
 @router.post("/", response_model=ArticleRead)
 def create_article(
     payload: ArticleCreate,
@@ -98,11 +204,13 @@ def create_article(
 
     _attach_tags(session, article, payload.tag_names)
     session.commit()
+    response_cache.invalidate("feed")
     return _to_read_model(session, article)
 
 
 @router.get("/", response_model=list[ArticleRead])
 def list_articles(
+    request: Request,
     session: Session = Depends(deps.get_db),
     tag: str | None = Query(default=None),
     scope: str | None = Query(default="community"),
@@ -110,27 +218,70 @@ def list_articles(
     current_user=Depends(deps.get_current_user_optional),
 ):
     scope = (scope or "community").lower()
-    if author_id is not None:
-        query = select(Article).where(Article.author_id == author_id)
-    elif scope == "mine":
+    if author_id is None and scope == "mine":
         if not current_user:
             raise HTTPException(status_code=401, detail="Not authenticated")
-        query = select(Article).where(Article.author_id == current_user.id)
-    else:  # community or default
-        query = select(Article).where(Article.is_published == True)
-    query = query.order_by(Article.created_at.desc())
-    if tag:
-        query = query.join(ArticleTagLink, ArticleTagLink.article_id == Article.id).join(Tag, Tag.id == ArticleTagLink.tag_id).where(Tag.name == tag)
-    articles = session.exec(query).all()
-    return [_to_read_model(session, a) for a in articles]
+        query = feed_query(author_id=current_user.id, tag=tag)
+    else:  # an author's page, or the community feed
+        query = feed_query(author_id=author_id, tag=tag)
+    if author_id is None and scope != "mine":
+        # the community feed is the same for everyone; like counts may lag by the cache TTL
+        cached = response_cache.get(("feed", tag))
+        if cached is None:
+            version = response_cache.version
+            cached = response_cache.put(("feed", tag), _article_dicts(session, query), version)
+        return cached.response(request)
+    return FastJSONResponse(_article_dicts(session, query))
+
+
+@router.post("/archive", response_model=ArchiveJobRead, status_code=202)
+def archive_reading(
+    payload: ArchiveRequest,
+    session: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Queue a reading for the archive worker; repeated calls return the same job."""
+    reading = session.get(CardReading, payload.reading_id)
+    if not reading:
+        raise HTTPException(status_code=404, detail="Reading not found")
+    if current_user.role != "admin" and reading.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    job = archive.enqueue(session, reading.id, payload.analysis, payload.cover_url, payload.tag_names)
+    try:
+        session.commit()
+    except IntegrityError:  # queued concurrently
+        session.rollback()
+        job = archive.enqueue(session, reading.id, payload.analysis, payload.cover_url, payload.tag_names)
+        session.commit()
+    session.refresh(job)
+    archive.wake()
+    return job
+
+
+@router.get("/archive/{reading_id}", response_model=ArchiveJobRead)
+def archive_status(
+    reading_id: int,
+    session: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    job = session.get(ArchiveJob, reading_id)
+    reading = session.get(CardReading, reading_id)
+    if not job or not reading or (current_user.role != "admin" and reading.user_id != current_user.id):
+        raise HTTPException(status_code=404, detail="Archive job not found")
+    return job
 
 
 @router.get("/{article_id}", response_model=ArticleRead)
-def get_article(article_id: int, session: Session = Depends(deps.get_db)):
-    article = session.get(Article, article_id)
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")
-    return _to_read_model(session, article)
+def get_article(article_id: int, request: Request, session: Session = Depends(deps.get_db)):
+    cached = response_cache.get(("article", article_id))
+    if cached is None:
+        version = response_cache.version
+        article = session.get(Article, article_id)
+        if not article:
+            raise HTTPException(status_code=404, detail="Article not found")
+        content = _to_read_model(session, article).model_dump(mode="json")
+        cached = response_cache.put(("article", article_id), content, version)
+    return cached.response(request)
 
 
 @router.patch("/{article_id}", response_model=None)
@@ -149,6 +300,7 @@ def update_article(
     if payload.delete:
         session.delete(article)
         session.commit()
+        _invalidate_article(article_id)
         return {"deleted": True}
 
     update_data = payload.model_dump(exclude_none=True)
@@ -165,10 +317,25 @@ def update_article(
 
     session.add(article)
     session.commit()
+    _invalidate_article(article_id)
     session.refresh(article)
     return _to_read_model(session, article)
 
 
+def _invalidate_article(article_id: int) -> None:
+    """Drop cached responses showing the article; call after the write commits."""
+    response_cache.invalidate("article", article_id)
+    response_cache.invalidate("feed")
+
+
+def _notify_topics(article: Article, actor_id: int) -> list[str]:
+    """Viewers of the article, plus its author unless they did it themselves."""
+    topics = [article_topic(article.id)]
+    if article.author_id != actor_id:
+        topics.append(user_topic(article.author_id))
+    return topics
+
+
 @router.post("/{article_id}/comments", response_model=CommentRead)
 def comment_article(
     article_id: int,
@@ -183,6 +350,11 @@ def comment_article(
     session.add(comment)
     session.commit()
     session.refresh(comment)
+    broker.publish(
+        _notify_topics(article, current_user.id),
+        "comment",
+        {"article_id": article_id, "comment": CommentRead.model_validate(comment).model_dump(mode="json")},
+    )
     return comment
 
 
@@ -195,13 +367,28 @@ def like_article(
     article = session.get(Article, article_id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
-    like = ArticleLike(article_id=article_id, user_id=current_user.id)
-    session.merge(like)
-    session.commit()
+    # liking twice is a no-op (merge used to trip the unique constraint with a 500)
+    if session.exec(
+        select(ArticleLike.id).where(ArticleLike.article_id == article_id, ArticleLike.user_id == current_user.id)
+    ).first() is not None:
+        return {"liked": True}
+    session.add(ArticleLike(article_id=article_id, user_id=current_user.id))
+    try:
+        session.commit()
+    except IntegrityError:  # the same user liking concurrently
+        session.rollback()
+        return {"liked": True}
+    response_cache.invalidate("article", article_id)
+    likes_count = session.exec(select(func.count()).select_from(ArticleLike).where(ArticleLike.article_id == article_id)).one()
+    broker.publish(
+        _notify_topics(article, current_user.id),
+        "like",
+        {"article_id": article_id, "user_id": current_user.id, "likes_count": likes_count},
+    )
     return {"liked": True}
 
 
 @router.get("/{article_id}/comments", response_model=list[CommentRead])
 def list_comments(article_id: int, session: Session = Depends(deps.get_db)):
-    comments = session.exec(select(Comment).where(Comment.article_id == article_id).order_by(Comment.created_at.asc())).all()
+    comments = session.exec(comments_query(article_id)).all()
     return comments
@@ -13,9 +13,13 @@ from app.utils.security import hash_password, verify_password
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def user_by_email_query(email: str):
+    return select(User).where(User.email == email)
+
+
 @router.post("/register", response_model=UserRead)
 def register(payload: RegisterRequest, session: Session = Depends(deps.get_db)):
-    existing = session.exec(select(User).where(User.email == payload.email)).first()
+    existing = session.exec(user_by_email_query(payload.email)).first()
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     user = User(
@@ -31,7 +35,7 @@ def register(payload: RegisterRequest, session: Session = Depends(deps.get_db)):
 
 @router.post("/login", response_model=TokenPair)
 def login(payload: LoginRequest, session: Session = Depends(deps.get_db), _: None = Depends(deps.rate_limit_login)):
-    user = session.exec(select(User).where(User.email == payload.email)).first()
+    user = session.exec(user_by_email_query(payload.email)).first()
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     tokens = deps.issue_token_pair(user)
@@ -44,7 +48,6 @@ def me(current_user: User = Depends(deps.get_current_user)):
 
 
 @router.post("/refresh", response_model=TokenPair)
-def refresh_token(current_user: User = Depends(deps.get_current_user)):
-    # Token type check is omitted for simplicity; in production verify "type" == "refresh"
+def refresh_token(current_user: User = Depends(deps.get_refresh_user)):
     tokens = deps.issue_token_pair(current_user)
     return TokenPair(**tokens)
@@ -8,9 +8,11 @@ from fastapi import Depends, HTTPException, Header, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core import metrics
 from app.core.config import get_settings
-from app.db.session import get_session
+from app.db.session import get_async_session, get_session
 from app.models.user import User
 from app.utils.security import create_token
 
@@ -21,15 +23,16 @@ auth_scheme = HTTPBearer(auto_error=False)
 _rate_limit_store: Dict[str, list[float]] = {}
 
 
-def _check_rate_limit(key: str, limit: int, period_seconds: int) -> None:
+def _check_rate_limit(key: str, limit: int, period_seconds: int, cost: int = 1) -> None:
     if limit <= 0:
         return  # rate limiting disabled
     now = time.time()
     entries = _rate_limit_store.get(key, [])
     entries = [ts for ts in entries if ts > now - period_seconds]
-    if len(entries) >= limit:
+    if len(entries) + cost > limit:
+        metrics.RATE_LIMIT_REJECTIONS.labels(key.split(":", 1)[0]).inc()
         raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
-    entries.append(now)
+    entries.extend([now] * cost)
     _rate_limit_store[key] = entries
 
 
@@ -37,8 +40,9 @@ def rate_limit_login() -> None:
     _check_rate_limit("login", settings.rate_limit_login_per_minute, 60)
 
 
-def rate_limit_ai(user_id: int) -> None:
-    _check_rate_limit(f"ai:{user_id}", settings.rate_limit_ai_per_hour, 3600)
+def rate_limit_ai(user_id: int, cost: int = 1) -> None:
+    """`cost` is the number of interpretations requested (batches count every item)."""
+    _check_rate_limit(f"ai:{user_id}", settings.rate_limit_ai_per_hour, 3600, cost)
 
 
 def get_db() -> Session:
@@ -46,21 +50,37 @@ def get_db() -> Session:
         yield session
 
 
+async def get_async_db() -> AsyncSession:
+    async with get_async_session() as session:
+        yield session
+
+
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials | None, token_type: str = "access") -> int | None:
+    if credentials is None:
+        return None
+    try:
+        payload = jwt.decode(credentials.credentials, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    # refresh, profiling and upload tokens share the secret but must not authenticate requests
+    if payload.get("type") != token_type:
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+    return int(user_id)
+
+
 def get_current_user(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(auth_scheme)],
     session: Session = Depends(get_db),
 ) -> User:
     if credentials is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("sub")
+    user_id = _user_id_from_credentials(credentials)
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = session.get(User, int(user_id))
+    user = session.get(User, user_id)
     if user is None or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
@@ -70,17 +90,53 @@ def get_current_user_optional(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(auth_scheme)],
     session: Session = Depends(get_db),
 ) -> User | None:
-    if credentials is None:
+    user_id = _user_id_from_credentials(credentials)
+    if user_id is None:
         return None
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-    except JWTError:
+    user = session.get(User, user_id)
+    if user is None or not user.is_active:
         return None
-    user_id = payload.get("sub")
+    return user
+
+
+def get_refresh_user(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(auth_scheme)],
+    session: Session = Depends(get_db),
+) -> User:
+    """The user behind a refresh token (only accepted by /auth/refresh)."""
+    user_id = _user_id_from_credentials(credentials, token_type="refresh")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    user = session.get(User, user_id)
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+async def get_current_user_async(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(auth_scheme)],
+    session: AsyncSession = Depends(get_async_db),
+) -> User:
+    """Async twin of get_current_user for async routes (no threadpool hop, no sync IO)."""
+    if credentials is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    user_id = _user_id_from_credentials(credentials)
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user = await session.get(User, user_id)
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+async def get_current_user_optional_async(
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(auth_scheme)],
+    session: AsyncSession = Depends(get_async_db),
+) -> User | None:
+    user_id = _user_id_from_credentials(credentials)
     if user_id is None:
         return None
-    user = session.get(User, int(user_id))
+    user = await session.get(User, user_id)
     if user is None or not user.is_active:
         return None
     return user
@@ -0,0 +1,144 @@
+"""Comment and like notifications over SSE or WebSocket (app.services.notifications).
+
+    GET /api/notifications/stream?article_id=7      # one article, no login needed
+    GET /api/notifications/stream?token=<access>    # comments/likes on the caller's articles
+    WS  /api/notifications/ws?article_id=7          # the same topics as JSON messages
+
+EventSource cannot set headers, so the access token may be passed as ``token``; an
+Authorization header works too. Refresh and profiling tokens are rejected. SSE frames are
+``event: <type>`` with the JSON payload as ``data``; WebSocket messages are
+``{"type": ..., "data": ...}``. Types are ``comment``, ``like`` and ``resync`` (events
+were dropped; re-fetch).
+
+SSE streams end after NOTIFY_STREAM_MAX_SECONDS and EventSource reconnects on its own:
+uvicorn waits for open responses before a worker exits, so an endless stream would hold
+up restarts. WebSockets need no cap since uvicorn closes them (1012) when shutting down.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.api import deps
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.session import get_async_session
+from app.models.article import Article
+from app.models.user import User
+from app.services.notifications import Subscriber, article_topic, broker, user_topic
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+settings = get_settings()
+
+
+def _bearer(token: Optional[str], authorization: Optional[str]) -> Optional[str]:
+    if token:
+        return token
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return None
+
+
+async def _topics(article_id: Optional[int], token: Optional[str]) -> List[str]:
+    if len(broker) >= settings.notify_max_subscribers:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many subscribers")
+    async with get_async_session() as session:
+        if article_id is not None:
+            if await session.get(Article, article_id) is None:
+                raise HTTPException(status_code=404, detail="Article not found")
+            return [article_topic(article_id)]
+        user_id = deps._user_id_from_credentials(
+            HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) if token else None,
+            token_type="access",
+        )
+        user = await session.get(User, user_id) if user_id is not None else None
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return [user_topic(user.id)]
+
+
+class EventStreamResponse(Response):
+    """SSE body fed straight from a Subscriber.
+
+    Unlike StreamingResponse there is no generator or task group per stream, only one
+    small task that waits for the client to go away.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, sub: Subscriber, max_seconds: float) -> None:
+        self.sub = sub
+        self.max_seconds = max_seconds
+        self.status_code = 200
+        self.background = None
+        self.raw_headers = [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),  # don't let nginx buffer the stream
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        watcher = asyncio.create_task(_close_on_disconnect(receive, self.sub))
+        # checked on every wake-up, which keep-alive ticks guarantee; no timer per stream
+        ends_at = asyncio.get_running_loop().time() + self.max_seconds
+        metrics.NOTIFY_SUBSCRIBERS.labels("sse").inc()
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+            while (events := await self.sub.get()) is not None:
+                chunk = "".join(f"event: {e.type}\ndata: {e.data}\n\n" for e in events) or ": ping\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+                if asyncio.get_running_loop().time() >= ends_at:
+                    break
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+            broker.unsubscribe(self.sub)
+            metrics.NOTIFY_SUBSCRIBERS.labels("sse").dec()
+
+
+async def _close_on_disconnect(receive: Receive, sub: Subscriber) -> None:
+    while (await receive())["type"] not in ("http.disconnect", "websocket.disconnect"):
+        pass
+    sub.close()
+
+
+@router.get("/stream", response_class=EventStreamResponse)
+async def notification_stream(
+    article_id: Optional[int] = Query(default=None),
+    token: Optional[str] = Query(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    topics = await _topics(article_id, _bearer(token, authorization))
+    return EventStreamResponse(broker.subscribe(topics), settings.notify_stream_max_seconds)
+
+
+@router.websocket("/ws")
+async def notification_socket(websocket: WebSocket, article_id: Optional[int] = None, token: Optional[str] = None):
+    try:
+        topics = await _topics(article_id, _bearer(token, websocket.headers.get("authorization")))
+    except HTTPException as exc:
+        await websocket.close(code=4000 + exc.status_code)
+        return
+    await websocket.accept()
+    sub = broker.subscribe(topics)
+    watcher = asyncio.create_task(_close_on_disconnect(websocket.receive, sub))
+    metrics.NOTIFY_SUBSCRIBERS.labels("ws").inc()
+    try:
+        # uvicorn sends protocol pings, so keep-alive ticks are skipped here
+        while (events := await sub.get()) is not None:
+            for e in events:
+                await websocket.send_text(f'{{"type":"{e.type}","data":{e.data}}}')
+        if not watcher.done():
+            await websocket.close(code=1001)  # server shutting down
+    except (WebSocketDisconnect, OSError):
+        pass  # went away mid-send
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(sub)
+        metrics.NOTIFY_SUBSCRIBERS.labels("ws").dec()
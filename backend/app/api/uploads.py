@@ -0,0 +1,41 @@
+"""Receiver for direct uploads when STORAGE_BACKEND=local (see app.services.storage).
+
+    PUT /api/uploads/direct/<key>?token=<from /ai/upload/presign or /admin/upload/presign>
+
+With S3 the browser PUTs to the bucket and this route is never involved.
+"""
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from jose import JWTError, jwt
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.services import storage
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+settings = get_settings()
+
+
+@router.put("/direct/{key:path}")
+async def direct_upload(key: str, request: Request, token: str = Query(...)):
+    backend = storage.get_storage()
+    if not isinstance(backend, storage.LocalStorage):
+        raise HTTPException(status_code=404, detail="Direct uploads go to object storage")
+    try:
+        claims = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        raise HTTPException(status_code=403, detail="Invalid or expired upload token")
+    if claims.get("type") != "upload" or claims.get("key") != key:
+        raise HTTPException(status_code=403, detail="Invalid or expired upload token")
+    if request.headers.get("content-type") != claims["content_type"]:
+        raise HTTPException(status_code=403, detail="Content-Type does not match the signed upload")
+    size = int(claims["size"])
+    if await backend.exists(key):
+        return {"url": backend.url(key)}  # same key, same bytes
+    try:
+        await backend.write_stream(key, request.stream(), size, claims["sha256"])
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    metrics.UPLOAD_BYTES.labels("direct").inc(size)
+    return {"url": backend.url(key)}
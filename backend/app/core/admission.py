@@ -0,0 +1,188 @@
+"""Per-worker admission control: shed expensive work before latency collapses.
+
+Requests are classed by path and method:
+
+* critical - auth, every GET/HEAD/OPTIONS, admin and /metrics: always admitted;
+* low      - AI interpretation and image uploads (``ADMISSION_LOW_PRIORITY_PATHS``):
+             bounded by AI slots with a short wait queue, shed first on loop lag or
+             DB pool saturation; batch interpretation takes a slot per item call;
+* normal   - other writes: shed only under severe loop lag or a saturated pool.
+
+Shed requests get 503 with ``Retry-After``. All signals are local to the worker, which
+is where the queueing happens.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import time
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import get_settings
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+# normal-priority writes are only shed when lag is this many times the low-priority limit
+_NORMAL_LAG_FACTOR = 4
+# low-priority paths that take AI slots per upstream call instead of per request (below api_prefix)
+_PER_ITEM_PATHS = ("/ai/card/interpret-batch",)
+
+
+class LoadState:
+    """Latest load signals for this worker."""
+
+    def __init__(self, sample_interval: float = 0.5) -> None:
+        self.sample_interval = sample_interval
+        self.loop_lag = 0.0
+        self._sampled_at: Optional[float] = None
+
+    def record_loop_lag(self, lag: float) -> None:
+        self.loop_lag = lag
+        self._sampled_at = time.monotonic()
+
+    def current_loop_lag(self) -> float:
+        """Last sample, or how overdue the next one is if the loop is blocked right now."""
+        if self._sampled_at is None:
+            return self.loop_lag
+        overdue = time.monotonic() - self._sampled_at - self.sample_interval
+        return max(self.loop_lag, overdue)
+
+
+def pool_usage(engines: Iterable[Engine]) -> float:
+    """Highest checked-out / capacity ratio across engines with a bounded QueuePool."""
+    usage = 0.0
+    for eng in engines:
+        pool = eng.pool
+        if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+            continue  # NullPool/StaticPool have nothing to saturate
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        if capacity > 0:
+            usage = max(usage, pool.checkedout() / capacity)
+    return usage
+
+
+class AISlots:
+    """Per-worker cap on upstream AI work in flight, with a bounded wait queue.
+
+    Low-priority requests hold one slot each. A batch holds one per item while that
+    item's call runs (``_PER_ITEM_PATHS``), so batches count against the same cap.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.settings = get_settings()
+        self._slots = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, waiting in a bounded queue; returns a rejection reason on failure."""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return None
+        if self._waiting >= self.settings.admission_max_queue:
+            return "queue_full"
+        self._waiting += 1
+        metrics.ADMISSION_QUEUED.inc()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.settings.admission_queue_timeout_seconds)
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self._waiting -= 1
+            metrics.ADMISSION_QUEUED.dec()
+
+    def release(self) -> None:
+        self._slots.release()
+
+    @contextlib.asynccontextmanager
+    async def hold(self) -> AsyncIterator[Optional[str]]:
+        """Hold a slot for the block; yields the rejection reason instead when shed."""
+        if not self.settings.admission_enabled:
+            yield None
+            return
+        reason = await self.acquire()
+        if reason is not None:
+            metrics.ADMISSION_REJECTIONS.labels(LOW, reason).inc()
+            yield reason
+            return
+        try:
+            yield None
+        finally:
+            self.release()
+
+
+load_state = LoadState()
+ai_slots = AISlots(get_settings().admission_max_ai_inflight)
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, engines: Tuple[Engine, ...] = ()) -> None:
+        self.app = app
+        self.settings = get_settings()
+        self.engines = engines
+        self.api_prefix = self.settings.api_prefix
+        self.low_paths = tuple(f"{self.api_prefix}{p}" for p in self.settings.admission_low_priority_paths)
+        self.per_item_paths = tuple(f"{self.api_prefix}{p}" for p in _PER_ITEM_PATHS)
+
+    def priority(self, method: str, path: str) -> str:
+        if method in _READ_METHODS or path.startswith(f"{self.api_prefix}/auth/"):
+            return CRITICAL
+        if path.startswith(f"{self.api_prefix}/admin/") or path == "/metrics":
+            return CRITICAL
+        if path.startswith(self.low_paths):
+            return LOW
+        return NORMAL
+
+    def _overload_reason(self, priority: str) -> Optional[str]:
+        lag_limit = self.settings.admission_max_loop_lag_ms / 1000
+        if priority == NORMAL:
+            lag_limit *= _NORMAL_LAG_FACTOR
+        if load_state.current_loop_lag() > lag_limit:
+            return "loop_lag"
+        if self.engines and pool_usage(self.engines) >= self.settings.admission_max_db_pool_usage:
+            return "db_pool"
+        return None
+
+    async def _reject(self, send: Send, priority: str, reason: str) -> None:
+        metrics.ADMISSION_REJECTIONS.labels(priority, reason).inc()
+        body = json.dumps({"detail": "Server busy, retry later", "reason": reason}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.settings.admission_retry_after_seconds).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+        priority = self.priority(scope.get("method", "GET"), scope.get("path", ""))
+        if priority == CRITICAL:
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._overload_reason(priority)
+        if reason is None and priority == LOW and not scope.get("path", "").startswith(self.per_item_paths):
+            reason = await ai_slots.acquire()
+            if reason is None:
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    ai_slots.release()
+                return
+        if reason is not None:
+            await self._reject(send, priority, reason)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,120 @@
+"""gzip/brotli response compression negotiated from Accept-Encoding.
+
+Brotli is used when the optional ``brotli`` package is installed and the client prefers
+or accepts it; gzip otherwise. Only complete bodies of at least COMPRESSION_MIN_BYTES with
+a text-like content type are compressed. Streamed responses (SSE, NDJSON batches,
+exports, files) pass through untouched so nothing gets buffered, and so do partial
+(206) responses and ones that already carry a Content-Encoding, such as the
+precompressed variants served from ``app.core.response_cache``. A strong ETag on a
+compressed response is made weak.
+"""
+from __future__ import annotations
+
+import gzip
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+_COMPRESSIBLE = ("application/json", "application/javascript", "application/xml", "image/svg+xml", "text/")
+# bigger bodies are compressed off the event loop
+_THREADPOOL_BYTES = 64 * 1024
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best encoding we support for an Accept-Encoding header; brotli wins ties."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    settings = get_settings()
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality if level is None else level)
+    # mtime=0 keeps the bytes (and anything hashing them) stable across runs
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level if level is None else level, mtime=0)
+
+
+def compressible(headers: Headers) -> bool:
+    return headers.get("content-type", "").startswith(_COMPRESSIBLE) and "content-encoding" not in headers
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_settings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until we know whether the body is complete
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=held)
+            partial = held["status"] == 206 or "content-range" in headers
+            if message.get("more_body", False) or partial or not compressible(headers):
+                await send(held)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.settings.compression_min_bytes:
+                if len(body) > _THREADPOOL_BYTES:
+                    encoded = await run_in_threadpool(compress, body, encoding)
+                else:
+                    encoded = compress(body, encoding)
+                if len(encoded) < len(body):
+                    body = encoded
+                    headers["content-encoding"] = encoding
+                    headers["content-length"] = str(len(body))
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        # the encoded bytes differ, so a strong validator can't cover both
+                        headers["etag"] = f"W/{etag}"
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 from pydantic import BaseModel, Field
@@ -19,6 +19,11 @@ class AIConfig(BaseModel):
     model: str
     chat_completion_path: str | None = None
     default_params: Dict[str, Any] = Field(default_factory=dict)
+    # extra request params for the cheaper, slower batch tier (e.g. {"service_tier": "flex"});
+    # empty means the provider has none and offline batches run at the standard tier
+    offline_params: Dict[str, Any] = Field(default_factory=dict)
+    # mark the system prefix with `cache_control`; None decides by provider
+    cache_control: Optional[bool] = None
 
 
 class Settings(BaseSettings):
@@ -32,16 +37,135 @@ class Settings(BaseSettings):
     app_name: str = "AI Card Master"
     api_prefix: str = "/api"
     database_url: str = Field(default_factory=lambda: f"sqlite:///{(BASE_DIR / 'db.sqlite3').as_posix()}")
+    # optional override; derived from database_url (aiosqlite/asyncpg) when unset
+    async_database_url: Optional[str] = None
     jwt_secret: str = "CHANGE_ME"
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
 
+    log_level: str = "INFO"
+    log_json: bool = True
+    metrics_enabled: bool = True
+    # bearer token for /metrics; unset means loopback clients only
+    metrics_token: Optional[str] = None
+    profile_max_seconds: int = 60
+    profile_interval_ms: int = 5
+    profile_token_expire_minutes: int = 10
+    # end-to-end deadline for an interpretation; the upstream AI call is aborted when it passes
+    ai_request_timeout_seconds: float = 60.0
+    # prompt assembly: estimated input-token budget (0 = unlimited) and the shortest the
+    # scene description may be cut to when over it
+    prompt_token_budget: int = 4000
+    prompt_min_scene_chars: int = 300
+    # batch interpretation: items per request, model calls in flight per batch, and the
+    # per-item deadline when a batch runs at the offline tier
+    ai_batch_max_items: int = 20
+    ai_batch_concurrency: int = 4
+    ai_batch_offline_timeout_seconds: float = 600.0
+    # when set, ai_client appends sanitized call timings here (replay with `python -m bench.replay`)
+    ai_record_path: Optional[Path] = None
+    profile_dir: Path = Field(default_factory=lambda: BASE_DIR / "profiles")
+
+    # admission control (per worker): low-priority paths (AI interpretation, uploads) get
+    # `admission_max_ai_inflight` slots plus a bounded wait queue, and are shed with 503
+    # once event-loop lag or DB pool usage crosses these limits; reads and auth never are
+    admission_enabled: bool = True
+    admission_max_loop_lag_ms: int = 200
+    admission_max_ai_inflight: int = 32
+    admission_max_queue: int = 64
+    admission_queue_timeout_seconds: float = 5.0
+    admission_max_db_pool_usage: float = 0.9
+    admission_retry_after_seconds: int = 5
+    # path prefixes below api_prefix
+    admission_low_priority_paths: List[str] = Field(default_factory=lambda: ["/ai/card/", "/ai/upload", "/uploads/direct/"])
+
+    # reading -> article archiving: queue every new reading automatically, worker poll
+    # interval (0 disables the worker), jobs per batch, and when a claimed batch is retried
+    auto_archive_readings: bool = False
+    archive_interval_seconds: float = 30.0
+    archive_batch_size: int = 50
+    archive_claim_timeout_seconds: int = 300
+
+    # comment/like notifications: events a subscriber may fall behind before the oldest are
+    # dropped (the client is told to resync), keep-alive interval, SSE stream lifetime before
+    # the client reconnects, open streams per worker, and a directory for the unix sockets
+    # that bridge events between workers on one host
+    notify_queue_size: int = 32
+    notify_heartbeat_seconds: float = 25.0
+    notify_stream_max_seconds: float = 300.0
+    notify_max_subscribers: int = 50_000
+    notify_bridge_dir: Optional[Path] = None
+
+    # response compression: gzip, or brotli when installed, for complete bodies of at least
+    # compression_min_bytes; streamed responses (SSE, NDJSON, exports, files) are left alone
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    # hot public responses (card catalog, community feed, article detail) cached per worker
+    # with their compressed variants; writes drop this worker's entries, others expire
+    response_cache_ttl_seconds: float = 30.0
+    response_cache_max_entries: int = 512
+
+    # /uploads: files are content-named and served as immutable for upload_cache_max_age;
+    # /uploads/_d/<width>/... derivatives (Pillow) are limited to these widths and rendered
+    # in a process pool of image_workers
+    upload_cache_max_age: int = 31_536_000
+    image_derivative_widths: List[int] = Field(default_factory=lambda: [160, 320, 640, 1280])
+    image_derivative_quality: int = 80
+    image_workers: int = 2
+
+    # Idempotency-Key handling: stored responses live for the TTL; a retry waits up to
+    # idempotency_wait_seconds for a still-running first attempt; path regexes are below api_prefix.
+    # Keyed request bodies are buffered to fingerprint them, so larger ones get a 413
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_seconds: float = 90.0
+    idempotency_max_body_bytes: int = 1_048_576
+    idempotency_max_request_bytes: int = 20 * 1024 * 1024
+    idempotency_paths: List[str] = Field(
+        default_factory=lambda: [r"/ai/card/interpret-(with-image|batch)", r"/articles/?", r"/articles/\d+/comments"]
+    )
+
     rate_limit_login_per_minute: int = 5
     rate_limit_ai_per_hour: int = 20
     ai_api_key: Optional[str] = Field(default=None, alias="AI_API_KEY")
 
+    # near-duplicate reading reuse (needs numpy): "off", "seed" (prior interpretation added to
+    # the prompt) or "serve" (answered without a model call); scope "user" only matches the
+    # caller's own readings, "global" matches anyone's
+    reading_reuse_mode: str = "off"
+    reading_reuse_threshold: float = 0.92
+    reading_reuse_layout_weight: float = 0.7
+    reading_reuse_scope: str = "user"
+
+    # large CardReading payloads: "zstd" (needs zstandard), "zlib" or "none"
+    payload_compression: str = "zlib"
+    payload_compression_min_bytes: int = 512
+
+    # AI usage rollups: background compactor period (0 disables), raw AICallLog retention
+    # once rolled up (0 keeps forever), hourly rollup retention, and prices per 1k tokens
+    # as {"model": [input, output]} for cost figures
+    ai_rollup_interval_seconds: int = 300
+    ai_log_retention_days: int = 30
+    ai_rollup_hourly_retention_days: int = 90
+    ai_model_prices: Dict[str, List[float]] = Field(default_factory=dict)
+
     upload_dir: Path = Field(default_factory=lambda: BASE_DIR / "uploads")
+    # upload storage (app.services.storage): "local" (upload_dir, served at /uploads) or "s3"
+    # (any S3-compatible endpoint; path-style addressing suits MinIO-style servers).
+    # storage_public_base_url overrides where files are linked from (e.g. a CDN); direct
+    # uploads are presigned for upload_presign_ttl_seconds; uploads are capped at upload_max_bytes
+    storage_backend: str = "local"
+    storage_public_base_url: Optional[str] = None
+    s3_endpoint_url: str = "https://s3.amazonaws.com"
+    s3_region: str = "us-east-1"
+    s3_bucket: str = ""
+    s3_access_key_id: str = ""
+    s3_secret_access_key: str = ""
+    s3_path_style: bool = True
+    upload_presign_ttl_seconds: int = 600
+    upload_max_bytes: int = 20 * 1024 * 1024
     ai_config_path: Path = Field(default_factory=lambda: PROJECT_ROOT / "config" / "ai.yaml")
 
     def load_ai_config(self) -> Optional[AIConfig]:
@@ -0,0 +1,356 @@
+"""`Idempotency-Key` support for retried writes (interpretations, new articles, comments).
+
+The first request with a key claims a row in ``idempotencyrecord`` and runs normally;
+its response is stored (compressed) until ``IDEMPOTENCY_TTL_SECONDS`` and replayed with
+``Idempotent-Replayed: true`` for any retry with the same key, caller and request.
+Multipart forms are compared by their fields and file digests, because every rebuild of
+a form picks a new boundary. A retry that arrives while the first request is still
+running waits for it: in-process through a shared future, across workers by polling the
+row. Reusing a key with a different request is a 422. Server errors, auth failures and
+shed or rate-limited responses are not stored, so those retries run again. Keyed bodies
+are buffered, so they are capped at IDEMPOTENCY_MAX_REQUEST_BYTES (413 beyond it).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import _user_id_from_credentials
+from app.core.config import get_settings
+from app.db.compressed import compress_bytes, decompress_bytes
+from app.db.session import get_async_session
+from app.models.idempotency import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 128
+# responses a retry should re-run rather than replay; auth failures happen before any
+# side effect, and a retry with a fresh token must not get the old 401
+_UNSTORED_STATUSES = {401, 403, 429, 499}
+_PURGE_INTERVAL = 600
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    content_type: Optional[str]
+    body: bytes
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+
+
+async def _send_json(send: Send, status: int, payload: dict, extra_headers: List[Tuple[bytes, bytes]] = ()) -> None:
+    body = json.dumps(payload).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra_headers]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _fingerprint(scope: Scope, path: str, body: bytes) -> str:
+    """Hash of the request a key is bound to.
+
+    Multipart bodies are hashed from their parsed fields and a digest of each file part:
+    a client rebuilding the same form for a retry gets a new random boundary.
+    """
+    digest = hashlib.sha256(b"POST " + path.encode() + b"\n")
+    content_type = dict(scope.get("headers") or []).get(b"content-type", b"")
+    if not content_type.lower().startswith(b"multipart/form-data"):
+        digest.update(body)
+        return digest.hexdigest()[:32]
+
+    async def replay_body() -> Message:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    try:
+        form = await Request(scope, replay_body).form()
+    except Exception:  # noqa: BLE001 - unparseable: let the route reject it, keyed on the raw bytes
+        digest.update(body)
+        return digest.hexdigest()[:32]
+    try:
+        for name, value in form.multi_items():
+            if isinstance(value, str):
+                part = ["field", name, value]
+            else:
+                part = ["file", name, value.filename or "", value.content_type or "", hashlib.sha256(await value.read()).hexdigest()]
+            digest.update(json.dumps(part).encode() + b"\n")
+    finally:
+        await form.close()
+    return digest.hexdigest()[:32]
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_settings()
+        prefix = re.escape(self.settings.api_prefix)
+        self.patterns = [re.compile(prefix + pattern) for pattern in self.settings.idempotency_paths]
+        self._inflight: Dict[Tuple[str, str], _InFlight] = {}
+        self._next_purge = 0.0
+        # an in-flight row is renewed every third of this while its owner runs, so it
+        # only lapses (and a retry may take over) when the owning worker died
+        self._lease_seconds = self.settings.ai_request_timeout_seconds + 30
+
+    def _caller(self, headers: Dict[bytes, bytes]) -> str:
+        # the same check the routes use: only access tokens name a user
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return "anon"
+        user_id = _user_id_from_credentials(HTTPAuthorizationCredentials(scheme=scheme, credentials=token.strip()))
+        return "anon" if user_id is None else f"user:{user_id}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        path = scope.get("path", "")
+        if raw_key is None or not any(p.fullmatch(path) for p in self.patterns):
+            await self.app(scope, receive, send)
+            return
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"})
+            return
+
+        limit = self.settings.idempotency_max_request_bytes
+        declared = headers.get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            await _send_json(send, 413, {"detail": "Request body too large"})
+            return
+        chunks, received = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > limit:
+                await _send_json(send, 413, {"detail": "Request body too large"})
+                return
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = await _fingerprint(scope, path, body)
+        caller = self._caller(headers)
+        await self._maybe_purge()
+
+        for _ in range(3):
+            record = await self._claim(caller, key, fingerprint)
+            if record is None:
+                await self._run_owner(scope, receive, send, body, caller, key)
+                return
+            if record.fingerprint != fingerprint:
+                await _send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request"})
+                return
+            if record.state == "done":
+                await self._replay(send, self._stored(record))
+                return
+            finished, stored = await self._wait(caller, key)
+            if not finished:
+                break
+            if stored is not None:
+                await self._replay(send, stored)
+                return
+            # the first attempt ended without a reusable response; try to run it ourselves
+        await _send_json(
+            send,
+            409,
+            {"detail": "A request with this Idempotency-Key is still in progress"},
+            [(b"retry-after", b"5")],
+        )
+
+    async def _claim(self, caller: str, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        """Insert an in-flight row; returns None when claimed, else the existing row."""
+        now = datetime.utcnow()
+        async with get_async_session() as session:
+            record = (
+                await session.exec(select(IdempotencyRecord).where(IdempotencyRecord.scope == caller, IdempotencyRecord.key == key))
+            ).first()
+            # expired responses and in-flight rows left behind by a dead worker are free again
+            if record is not None and record.expires_at <= now and (caller, key) not in self._inflight:
+                await session.delete(record)
+                await session.commit()
+                record = None
+            if record is not None:
+                return record
+            session.add(
+                IdempotencyRecord(
+                    scope=caller,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=self._lease_seconds),
+                )
+            )
+            try:
+                await session.commit()
+            except IntegrityError:  # a concurrent retry claimed it first
+                await session.rollback()
+                return (
+                    await session.exec(
+                        select(IdempotencyRecord).where(IdempotencyRecord.scope == caller, IdempotencyRecord.key == key)
+                    )
+                ).first() or await self._claim(caller, key, fingerprint)
+            return None
+
+    async def _run_owner(self, scope: Scope, receive: Receive, send: Send, body: bytes, caller: str, key: str) -> None:
+        entry = _InFlight()
+        self._inflight[(caller, key)] = entry
+        body_sent = False
+        start: Optional[Message] = None
+        parts: List[bytes] = []
+        size = 0
+
+        async def owner_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            message = await receive()
+            if message["type"] == "http.disconnect" and entry.waiters:
+                # a retry is attached to this run: finish it for them instead of aborting
+                await asyncio.shield(entry.future)
+            return message
+
+        async def capture_send(message: Message) -> None:
+            nonlocal start, size
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and size <= self.settings.idempotency_max_body_bytes:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                parts.append(chunk)
+            await send(message)
+
+        stored: Optional[StoredResponse] = None
+        heartbeat = asyncio.create_task(self._heartbeat(caller, key))
+        try:
+            await self.app(scope, owner_receive, capture_send)
+            if (
+                start is not None
+                and start["status"] < 500
+                and start["status"] not in _UNSTORED_STATUSES
+                and size <= self.settings.idempotency_max_body_bytes
+            ):
+                content_type = dict(start.get("headers") or []).get(b"content-type", b"").decode("latin-1") or None
+                stored = StoredResponse(start["status"], content_type, b"".join(parts))
+        finally:
+            heartbeat.cancel()
+            try:
+                await asyncio.shield(self._finish(caller, key, stored))
+            finally:
+                self._inflight.pop((caller, key), None)
+                if not entry.future.done():
+                    entry.future.set_result(stored)
+
+    async def _heartbeat(self, caller: str, key: str) -> None:
+        """Keep extending the in-flight row; batches can run far longer than one lease."""
+        while True:
+            await asyncio.sleep(self._lease_seconds / 3)
+            try:
+                async with get_async_session() as session:
+                    await session.execute(
+                        update(IdempotencyRecord)
+                        .where(
+                            IdempotencyRecord.scope == caller,
+                            IdempotencyRecord.key == key,
+                            IdempotencyRecord.state != "done",
+                        )
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=self._lease_seconds))
+                    )
+                    await session.commit()
+            except Exception:  # noqa: BLE001 - the next beat retries
+                logger.exception("idempotency heartbeat failed")
+
+    async def _finish(self, caller: str, key: str, stored: Optional[StoredResponse]) -> None:
+        async with get_async_session() as session:
+            record = (
+                await session.exec(select(IdempotencyRecord).where(IdempotencyRecord.scope == caller, IdempotencyRecord.key == key))
+            ).first()
+            if record is None:
+                return
+            if stored is None:
+                await session.delete(record)
+            else:
+                record.state = "done"
+                record.status_code = stored.status
+                record.content_type = stored.content_type
+                record.body = compress_bytes(stored.body)
+                record.expires_at = datetime.utcnow() + timedelta(seconds=self.settings.idempotency_ttl_seconds)
+                session.add(record)
+            await session.commit()
+
+    async def _wait(self, caller: str, key: str) -> Tuple[bool, Optional[StoredResponse]]:
+        """Wait for the running attempt; returns (finished, stored response or None)."""
+        timeout = self.settings.idempotency_wait_seconds
+        entry = self._inflight.get((caller, key))
+        if entry is not None:
+            entry.waiters += 1
+            try:
+                return True, await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+            except asyncio.TimeoutError:
+                return False, None
+            finally:
+                entry.waiters -= 1
+
+        # running on another worker: poll its row
+        deadline = time.monotonic() + timeout
+        delay = 0.1
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+            async with get_async_session() as session:
+                record = (
+                    await session.exec(select(IdempotencyRecord).where(IdempotencyRecord.scope == caller, IdempotencyRecord.key == key))
+                ).first()
+            if record is None:
+                return True, None
+            if record.state == "done":
+                return True, self._stored(record)
+        return False, None
+
+    @staticmethod
+    def _stored(record: IdempotencyRecord) -> StoredResponse:
+        return StoredResponse(record.status_code or 200, record.content_type, decompress_bytes(record.body or b"\x00"))
+
+    async def _replay(self, send: Send, stored: StoredResponse) -> None:
+        headers = [(b"content-length", str(len(stored.body)).encode()), (REPLAYED_HEADER, b"true")]
+        if stored.content_type:
+            headers.append((b"content-type", stored.content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": stored.status, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + _PURGE_INTERVAL
+        try:
+            async with get_async_session() as session:
+                result = await session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < datetime.utcnow()))
+                await session.commit()
+            if result.rowcount:
+                logger.info("purged expired idempotency keys", extra={"removed": result.rowcount})
+        except Exception:  # noqa: BLE001
+            logger.exception("idempotency purge failed")
@@ -0,0 +1,167 @@
+"""Prometheus metrics registry and the `/metrics` endpoint.
+
+Under multi-worker uvicorn set ``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable
+directory before the workers start; each worker then writes its samples to mmap files
+there and `/metrics` aggregates all workers (see prometheus_client multiprocess mode).
+Each worker marks itself dead on shutdown, so its live gauges drop out of the totals; a
+supervisor that reaps workers itself can call ``mark_worker_dead(pid)`` instead (e.g.
+gunicorn's ``child_exit`` hook).
+
+`/metrics` is not public: with METRICS_TOKEN set it needs ``Authorization: Bearer
+<token>`` (Prometheus ``authorization.credentials``), otherwise it only answers
+loopback clients. Behind a reverse proxy on the same host, set the token.
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from app.core.config import get_settings
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_AI_BUCKETS = (0.5, 1, 2, 4, 8, 12, 16, 24, 32, 45, 60, 90)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template",
+    ("method", "route", "status"),
+    buckets=_LATENCY_BUCKETS,
+)
+AI_LATENCY = Histogram(
+    "ai_call_duration_seconds",
+    "Upstream AI provider call latency",
+    ("provider", "model", "outcome"),
+    buckets=_AI_BUCKETS,
+)
+DB_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Database statement latency by statement class",
+    ("statement",),
+    buckets=_DB_BUCKETS,
+)
+AI_INFLIGHT = Gauge(
+    "ai_interpretations_in_flight",
+    "Interpretations currently waiting on the AI provider",
+    multiprocess_mode="livesum",
+)
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received through upload routes", ("route",))
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Requests rejected by rate limiting", ("bucket",))
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests shed by admission control", ("priority", "reason")
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Low-priority requests waiting for an AI slot",
+    multiprocess_mode="livesum",
+)
+AI_PROMPT_TOKENS = Counter(
+    "ai_prompt_tokens_total", "AI input tokens as reported by the provider, by cache status", ("model", "cache")
+)
+ARCHIVE_JOBS = Counter("archive_jobs_total", "Readings processed by the archive worker, by result", ("result",))
+NOTIFY_SUBSCRIBERS = Gauge(
+    "notify_subscribers",
+    "Open comment/like notification streams",
+    ("transport",),
+    multiprocess_mode="livesum",
+)
+NOTIFY_EVENTS = Counter(
+    "notify_events_total",
+    "Notification events published, received over the worker bridge, or dropped (lagged/bridge_dropped)",
+    ("result",),
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Most recent event-loop scheduling delay",
+    # live workers only: an exited worker's last (often shutdown-time) sample must not linger
+    multiprocess_mode="livemax",
+)
+EVENT_LOOP_LAG_HIST = Histogram(
+    "event_loop_lag_distribution_seconds",
+    "Event-loop scheduling delay samples",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+_STATEMENT_CLASSES = ("select", "insert", "update", "delete")
+
+
+def statement_class(statement: str) -> str:
+    head = statement.lstrip()[:6].lower()
+    return head if head in _STATEMENT_CLASSES else "other"
+
+
+def observe_db(statement: str, seconds: float) -> None:
+    DB_LATENCY.labels(statement_class(statement)).observe(seconds)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+@contextmanager
+def track_ai_inflight() -> Iterator[None]:
+    AI_INFLIGHT.inc()
+    try:
+        yield
+    finally:
+        AI_INFLIGHT.dec()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5, on_sample: Optional[Callable[[float], None]] = None) -> None:
+    """Sleep `interval` repeatedly; any overshoot is time the loop was blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HIST.observe(lag)
+        if on_sample is not None:
+            on_sample(lag)
+
+
+def _registry() -> Optional[CollectorRegistry]:
+    if not MULTIPROCESS:
+        return None  # default process-global registry
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_worker_dead(pid: int) -> None:
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def _allowed(request: Request) -> bool:
+    token = get_settings().metrics_token
+    if token:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(credentials.encode(), token.encode())
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if not _allowed(request):
+        return PlainTextResponse("Forbidden", status_code=403)
+    registry = _registry()
+    payload = generate_latest(registry) if registry is not None else generate_latest()
+    return Response(payload, media_type=CONTENT_TYPE_LATEST)
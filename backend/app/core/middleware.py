@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics, observability, profiling
+from app.core.config import get_settings
+
+logger = logging.getLogger("app.request")
+
+REQUEST_ID_HEADER = "x-request-id"
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "x-profile-id"
+
+
+class RequestTimingMiddleware:
+    """Assign a request id and log one structured line per request.
+
+    Pure ASGI (not BaseHTTPMiddleware) so streaming responses are not buffered and the
+    request context stays in the same task as the endpoint.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.encode())
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+        token = observability.begin_request(request_id)
+        stats = observability.current_stats()
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            elapsed = time.perf_counter() - started
+            # unmatched paths share one label so scanners cannot blow up metric cardinality
+            metrics.HTTP_LATENCY.labels(scope.get("method"), getattr(route, "path", "unmatched"), str(status_code)).observe(elapsed)
+            logger.info(
+                "request",
+                extra={
+                    "method": scope.get("method"),
+                    "route": getattr(route, "path", None) or scope.get("path"),
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "db_queries": stats.db_queries,
+                    "db_ms": round(stats.db_ms, 1),
+                    "ai_ms": round(stats.ai_ms, 1),
+                },
+            )
+            observability.end_request(token)
+
+
+class ProfileRequestMiddleware:
+    """Profile a single request end-to-end when it carries a valid `X-Profile-Token`.
+
+    Tokens are minted by `POST /admin/profile/request-token`. Requests without the header
+    only pay for one header lookup. The sampler sees every thread of the worker, so
+    concurrent requests on the same worker show up in the profile as well.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_settings()
+
+    def _token_valid(self, token: str) -> bool:
+        try:
+            payload = jwt.decode(token, self.settings.jwt_secret, algorithms=[self.settings.jwt_algorithm])
+        except JWTError:
+            return False
+        return payload.get("type") == "profile"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope.get("headers") or []).get(PROFILE_TOKEN_HEADER.encode())
+        if not token or not self._token_valid(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        sampler = profiling.StackSampler(self.settings.profile_interval_ms / 1000).start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await run_in_threadpool(sampler.stop)
+            await run_in_threadpool(profiling.save_profile, self.settings.profile_dir, profile_id, sampler)
+            logger.info(
+                "request profiled",
+                extra={"profile_id": profile_id, "samples": sampler.sample_count, "path": scope.get("path")},
+            )
@@ -0,0 +1,153 @@
+"""Structured logging and per-request context (request id, DB/AI timings)."""
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+
+
+@dataclass
+class RequestStats:
+    request_id: str
+    db_queries: int = 0
+    db_ms: float = 0.0
+    ai_ms: float = 0.0
+
+
+# Mutable object in a ContextVar: threadpool hops copy the context, but still share the
+# same RequestStats instance, so sync dependencies/routes add to the request's totals.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def current_request_id() -> Optional[str]:
+    stats = _request_stats.get()
+    return stats.request_id if stats else None
+
+
+def begin_request(request_id: str):
+    """Install fresh stats for this request; returns the token for `end_request`."""
+    return _request_stats.set(RequestStats(request_id=request_id))
+
+
+def end_request(token) -> None:
+    _request_stats.reset(token)
+
+
+def add_ai_time(ms: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.ai_ms += ms
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Keep `extra` fields on the queued record (the stock handler flattens it to text)."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = "INFO", json_format: bool = True) -> None:
+    """Route all logging through a queue so request handlers never block on stdout.
+
+    The QueueHandler only enqueues; a single QueueListener thread formats and writes.
+    Safe to call more than once (e.g. create_app in tests); later calls are no-ops.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+    )
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _StructuredQueueHandler(log_queue)
+    # filter runs on the calling thread/task, where the request context is visible
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uv_logger = logging.getLogger(name)
+        uv_logger.handlers = []
+        uv_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count queries, accumulate DB time into the current request's stats and feed DB metrics."""
+    if getattr(engine, "_request_stats_instrumented", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+        elapsed = time.perf_counter() - conn.info["_query_start"].pop()
+        metrics.observe_db(statement, elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_ms += elapsed * 1000
+
+    engine._request_stats_instrumented = True
@@ -0,0 +1,103 @@
+"""In-process sampling profiler producing collapsed stacks (flamegraph.pl / speedscope input).
+
+A daemon thread snapshots every thread's Python stack via ``sys._current_frames()`` at a
+fixed interval. Nothing runs unless a profile has been started, so it costs nothing
+when disabled; while running, overhead is proportional to the sampling rate.
+"""
+from __future__ import annotations
+
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import BASE_DIR
+
+_SITE_PACKAGES = re.compile(r".*[\\/](site|dist)-packages[\\/]")
+_BACKEND_PREFIX = str(BASE_DIR).replace("\\", "/") + "/"
+_STDLIB_PREFIX = sysconfig.get_paths()["stdlib"].replace("\\", "/") + "/"
+
+
+def _frame_label(code) -> str:  # noqa: ANN001
+    filename = code.co_filename.replace("\\", "/")
+    filename = _SITE_PACKAGES.sub("", filename)
+    for prefix in (_BACKEND_PREFIX, _STDLIB_PREFIX):
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+        self.duration: float = 0.0
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_worker_lock = threading.Lock()
+
+
+def worker_profile_running() -> bool:
+    return _worker_lock.locked()
+
+
+def try_begin_worker_profile() -> bool:
+    """One whole-worker profile at a time; returns False if one is already running."""
+    return _worker_lock.acquire(blocking=False)
+
+
+def end_worker_profile() -> None:
+    _worker_lock.release()
+
+
+def save_profile(directory: Path, name: str, sampler: StackSampler) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.collapsed"
+    path.write_text(sampler.collapsed(), encoding="utf-8")
+    return path
@@ -0,0 +1,117 @@
+"""In-process cache of hot public JSON responses with their compressed variants.
+
+Routes serving the same bytes to everyone (the card catalog, the community feed, article
+detail) keep their rendered body here under a tuple key. The gzip/brotli variants are
+built on first request per encoding and stored on the entry, so compression runs once
+per content version rather than per request. When an entry expires and the route
+renders identical bytes again, the existing entry and its variants are kept. Responses
+carry a weak ETag, and ``If-None-Match`` gets a 304.
+
+Writes call ``invalidate`` with a key prefix. That only reaches this worker, so other
+workers catch up when their entries expire (RESPONSE_CACHE_TTL_SECONDS).
+
+    cached = response_cache.get(("article", article_id))
+    if cached is None:
+        version = response_cache.version
+        cached = response_cache.put(("article", article_id), render(), version)
+    return cached.response(request)
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core import compression, metrics
+from app.core.config import get_settings
+from app.core.responses import dumps
+
+# compressed once per version, so spend more CPU on ratio than the per-request path does
+_CACHED_LEVELS = {"gzip": 9, "br": 9}
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "media_type", "expires", "_variants", "_lock")
+
+    def __init__(self, body: bytes, media_type: str, expires: float) -> None:
+        self.body = body
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.media_type = media_type
+        self.expires = expires
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:  # one thread compresses, concurrent requests wait for it
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = compression.compress(self.body, encoding, _CACHED_LEVELS[encoding])
+                    self._variants[encoding] = variant
+        return variant
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        settings = get_settings()
+        body = self.body
+        if settings.compression_enabled and len(body) >= settings.compression_min_bytes:
+            encoding = compression.negotiate(request.headers.get("accept-encoding"))
+            if encoding is not None:
+                body = self.encoded(encoding)
+                headers["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class ResponseCache:
+    def __init__(self) -> None:
+        self._entries: "OrderedDict[Tuple[Hashable, ...], CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by every invalidate; a render that started before one is not stored
+        self.version = 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and entry.expires > time.monotonic()
+            if fresh:
+                self._entries.move_to_end(key)
+        metrics.record_cache("response", fresh)
+        return entry if fresh else None
+
+    def put(
+        self, key: Tuple[Hashable, ...], content: Any, version: int, media_type: str = "application/json"
+    ) -> CachedBody:
+        """Store `content` rendered as JSON unless `key` was invalidated since `version`."""
+        settings = get_settings()
+        entry = CachedBody(dumps(content), media_type, time.monotonic() + settings.response_cache_ttl_seconds)
+        with self._lock:
+            if version != self.version:
+                return entry  # served once, not cached
+            previous = self._entries.get(key)
+            if previous is not None and previous.etag == entry.etag:
+                previous.expires = entry.expires  # same bytes: keep the compressed variants
+                entry = previous
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.response_cache_max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *prefix: Hashable) -> None:
+        """Drop every entry whose key starts with `prefix`."""
+        n = len(prefix)
+        with self._lock:
+            self.version += 1
+            for key in [k for k in self._entries if k[:n] == prefix]:
+                del self._entries[key]
+
+
+response_cache = ResponseCache()
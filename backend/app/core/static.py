@@ -0,0 +1,135 @@
+"""``/uploads``: immutable static serving with strong ETags, byte ranges and derivatives.
+
+Uploaded files never change once written. Every response therefore carries
+``Cache-Control: public, max-age=<UPLOAD_CACHE_MAX_AGE>, immutable`` and a strong ETag
+built from size and mtime. Single byte ranges get 206, and ``If-Range`` is honoured.
+``/uploads/_d/...`` paths are resized derivatives (``app.services.images``), rendered
+into upload_dir on first request and then served like any other file.
+
+The on-disk layout matches the URLs, so nginx can serve everything it already has and
+hand only misses to the app:
+
+    location /uploads/ {
+        alias /srv/app/backend/uploads/;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        try_files $uri @app;
+    }
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.services import images
+
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) for a single `bytes=` range; raises ValueError if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # unknown unit or multiple ranges: send the whole file
+    first, _, last = spec.strip().partition("-")
+    if not first:  # suffix range: the last N bytes
+        if not last.isdigit() or int(last) == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class ImmutableFileResponse(FileResponse):
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, stat_result: os.stat_result, request_headers: Headers) -> None:
+        etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+        super().__init__(
+            path,
+            stat_result=stat_result,
+            headers={
+                "etag": etag,
+                "cache-control": f"public, max-age={get_settings().upload_cache_max_age}, immutable",
+                "accept-ranges": "bytes",
+            },
+        )
+        self.range: Optional[Tuple[int, int]] = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                self.range = _byte_range(range_header, stat_result.st_size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["content-range"] = f"bytes */{stat_result.st_size}"
+        if self.range is not None:
+            first, last = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {first}-{last}/{stat_result.st_size}"
+            self.headers["content-length"] = str(last - first + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.status_code == 416:
+            del self.headers["content-length"]
+            await Response(status_code=416, headers=dict(self.headers))(scope, receive, send)
+            return
+        if self.range is None:
+            await super().__call__(scope, receive, send)
+            return
+        first, last = self.range
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = last - first + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(first)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:  # file shorter than its stat said; end the body anyway
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class UploadFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            derivative = images.parse(path.replace(os.sep, "/")) if exc.status_code == 404 else None
+            if derivative is None:
+                raise
+        source, source_stat = await anyio.to_thread.run_sync(self.lookup_path, derivative.source)
+        if source_stat is None:
+            raise HTTPException(status_code=404)
+        if not images.available():
+            root = scope.get("root_path", "")
+            return RedirectResponse(f"{root}/{derivative.source}", status_code=307)
+        dest = os.path.join(self.directory, path)
+        try:
+            await images.ensure(source, dest, derivative)
+        except Exception as exc:  # noqa: BLE001 - not an image Pillow can read, too large, ...
+            raise HTTPException(status_code=415, detail="Unsupported image") from exc
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self, full_path: str, stat_result: os.stat_result, scope: Scope, status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        response = ImmutableFileResponse(full_path, stat_result, request_headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
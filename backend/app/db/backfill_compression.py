@@ -0,0 +1,92 @@
+"""Rewrite legacy CardReading payloads into the compressed format.
+
+    python -m app.db.backfill_compression --batch-size 500
+
+Legacy rows are plain TEXT/JSON values (SQLite) or values left in the uncompressed 0x00
+format by migration 0004 when PostgreSQL columns were retyped to BYTEA; both are
+re-encoded with the configured PAYLOAD_COMPRESSION.
+
+Walks the table by primary key in batches (keyset pagination, one transaction per
+batch) so it can run against a live database and be resumed at any point.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.compressed import (
+    MARKER_PLAIN,
+    CompressedJSON,
+    CompressedText,
+    compress_bytes,
+    compresses,
+    is_compressed_format,
+)
+
+logger = logging.getLogger(__name__)
+
+_TEXT_COLUMNS = ("ai_response",)
+_JSON_COLUMNS = ("cards_json", "image_urls")
+
+
+def _needs_rewrite(value: Any) -> bool:
+    if value is None:
+        return False
+    if not is_compressed_format(value):
+        return True
+    # stored plain (e.g. converted by migration 0004), but would be compressed if written now
+    stored = bytes(value)
+    return stored[:1] == MARKER_PLAIN and compresses(len(stored) - 1)
+
+
+def _encode(column: str, value: Any, dialect) -> Any:
+    if not _needs_rewrite(value):
+        return value
+    if is_compressed_format(value):
+        return compress_bytes(bytes(value)[1:])
+    if column in _TEXT_COLUMNS:
+        return CompressedText().process_bind_param(value, dialect)
+    return CompressedJSON().process_bind_param(json.loads(value), dialect)
+
+
+def backfill_reading_compression(engine: Engine, batch_size: int = 500, start_after_id: int = 0) -> int:
+    """Compress every legacy row; returns the number of rows rewritten."""
+    columns = _TEXT_COLUMNS + _JSON_COLUMNS
+    select_sql = text(f"SELECT id, {', '.join(columns)} FROM cardreading WHERE id > :last_id ORDER BY id LIMIT :limit")
+    update_sql = text(f"UPDATE cardreading SET {', '.join(f'{c} = :{c}' for c in columns)} WHERE id = :id")
+    last_id = start_after_id
+    rewritten = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_sql, {"last_id": last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                values = dict(zip(columns, row[1:]))
+                if not any(_needs_rewrite(v) for v in values.values()):
+                    continue
+                updates.append({"id": row[0], **{c: _encode(c, v, engine.dialect) for c, v in values.items()}})
+            if updates:
+                conn.execute(update_sql, updates)
+            last_id = rows[-1][0]
+        rewritten += len(updates)
+        logger.info("backfill batch done last_id=%s rewritten=%s", last_id, rewritten)
+    return rewritten
+
+
+if __name__ == "__main__":
+    from app.db.session import engine
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--start-after-id", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    total = backfill_reading_compression(engine, batch_size=args.batch_size, start_after_id=args.start_after_id)
+    print(f"rewrote {total} readings")
@@ -0,0 +1,107 @@
+"""Transparent compression for large text/JSON columns.
+
+Stored values are bytes prefixed with a one-byte format marker so codecs can change
+over time and rows written before compression existed (plain TEXT/JSON) keep working:
+
+    0x00  plain utf-8 (below the size threshold)
+    0x01  zlib
+    0x02  zstd (requires the optional ``zstandard`` package)
+
+The columns are BYTEA/BLOB. SQLite stores whatever it is given, so existing databases
+need no DDL. On PostgreSQL, migration 0004 (``app.db.migrations``) retypes the legacy
+TEXT/JSON columns to BYTEA in the plain format; run ``python -m app.db.backfill_compression``
+afterwards to compress the converted rows.
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from app.core.config import get_settings
+
+try:  # optional: better ratio and speed than zlib when installed
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+MARKER_PLAIN = b"\x00"
+MARKER_ZLIB = b"\x01"
+MARKER_ZSTD = b"\x02"
+
+settings = get_settings()
+
+
+def _codec() -> str:
+    codec = (settings.payload_compression or "none").lower()
+    if codec == "zstd" and zstandard is None:
+        return "zlib"
+    return codec
+
+
+def compresses(size: int) -> bool:
+    """Whether a payload of `size` bytes is stored compressed under the current settings."""
+    return _codec() != "none" and size >= settings.payload_compression_min_bytes
+
+
+def compress_bytes(raw: bytes) -> bytes:
+    codec = _codec()
+    if not compresses(len(raw)):
+        return MARKER_PLAIN + raw
+    if codec == "zstd":
+        return MARKER_ZSTD + zstandard.ZstdCompressor(level=3).compress(raw)
+    return MARKER_ZLIB + zlib.compress(raw, 6)
+
+
+def decompress_bytes(stored: bytes) -> bytes:
+    marker, body = stored[:1], stored[1:]
+    if marker == MARKER_PLAIN:
+        return body
+    if marker == MARKER_ZLIB:
+        return zlib.decompress(body)
+    if marker == MARKER_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed payload found but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unknown compressed payload marker: {marker!r}")
+
+
+def is_compressed_format(value: Any) -> bool:
+    """True when a raw column value was written by these types (vs. legacy text/JSON)."""
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+
+class CompressedText(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> bytes | None:
+        if value is None:
+            return None
+        return compress_bytes(str(value).encode("utf-8"))
+
+    def process_result_value(self, value: Any, dialect) -> str | None:
+        if value is None:
+            return None
+        if not is_compressed_format(value):
+            return value  # legacy uncompressed TEXT row
+        return decompress_bytes(bytes(value)).decode("utf-8")
+
+
+class CompressedJSON(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> bytes | None:
+        if value is None:
+            return None
+        return compress_bytes(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        if not is_compressed_format(value):
+            return json.loads(value)  # legacy JSON column stored as text
+        return json.loads(decompress_bytes(bytes(value)))
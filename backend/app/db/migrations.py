@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+class Migration(NamedTuple):
+    id: str
+    description: str
+    statements: Tuple[str, ...]
+    # (table, column, DDL type) added only when missing, since ADD COLUMN has no IF NOT EXISTS
+    add_columns: Tuple[Tuple[str, str, str], ...] = ()
+    # run only on this dialect (e.g. "postgresql"); elsewhere it is recorded as applied
+    dialect: Optional[str] = None
+
+
+def _to_compressed_bytea(table: str, column: str) -> str:
+    """PostgreSQL: retype a legacy TEXT/JSON column to BYTEA in the plain (0x00) format of
+    app.db.compressed, so old rows stay readable; skipped when it already is BYTEA."""
+    return (
+        "DO $$ BEGIN "
+        f"IF (SELECT data_type FROM information_schema.columns WHERE table_name = '{table}' "
+        f"AND column_name = '{column}') <> 'bytea' THEN "
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA "
+        f"USING ('\\x00'::bytea || convert_to({column}::text, 'UTF8')); "
+        "END IF; END $$"
+    )
+
+
+# Ordered, append-only. `create_all` never alters existing tables, so every schema
+# change that must reach an existing database gets a migration here. Keep statements
+# idempotent (IF NOT EXISTS) so fresh databases built by create_all apply them as no-ops;
+# new columns go in `add_columns`, which skips any that already exist.
+MIGRATIONS: List[Migration] = [
+    Migration(
+        id="0001_hot_query_composite_indexes",
+        description="Composite indexes for filtered + ordered list queries",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_cardreading_user_created ON cardreading (user_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_article_published_created ON article (is_published, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_article_author_created ON article (author_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_comment_article_created ON comment (article_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_articletaglink_tag_article ON articletaglink (tag_id, article_id)",
+            "CREATE INDEX IF NOT EXISTS ix_aicalllog_created ON aicalllog (created_at)",
+        ),
+    ),
+    Migration(
+        id="0002_aicalllog_prompt_tokens",
+        description="Estimated prompt size before and after compaction on AI call logs",
+        statements=(),
+        add_columns=(
+            ("aicalllog", "prompt_tokens_raw", "INTEGER"),
+            ("aicalllog", "prompt_tokens_compacted", "INTEGER"),
+        ),
+    ),
+    Migration(
+        id="0003_aicalllog_cached_tokens",
+        description="Prompt tokens served from the provider cache on AI call logs",
+        statements=(),
+        add_columns=(("aicalllog", "tokens_cached", "INTEGER"),),
+    ),
+    Migration(
+        # SQLite keeps any value in any column, so there the compressed types need no DDL
+        id="0004_cardreading_payloads_bytea",
+        description="Reading payload columns to BYTEA for compressed storage",
+        statements=tuple(
+            _to_compressed_bytea("cardreading", column) for column in ("ai_response", "cards_json", "image_urls")
+        ),
+        dialect="postgresql",
+    ),
+    Migration(
+        id="0005_readingcard_layout_indexes",
+        description="Card stats indexes led by in_layout, replacing the unfiltered ones",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_readingcard_layout_reading ON readingcard (in_layout, reading_id)",
+            "CREATE INDEX IF NOT EXISTS ix_readingcard_layout_card ON readingcard (in_layout, card_id, orientation)",
+            "CREATE INDEX IF NOT EXISTS ix_readingcard_layout_color ON readingcard (in_layout, color, value)",
+            "DROP INDEX IF EXISTS ix_readingcard_card_orientation",
+            "DROP INDEX IF EXISTS ix_readingcard_color_reading",
+        ),
+    ),
+]
+
+
+def _ensure_migrations_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+                "id VARCHAR(128) PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+
+
+def applied_migrations(engine: Engine) -> set[str]:
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text(f"SELECT id FROM {MIGRATIONS_TABLE}"))}
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply pending migrations in order, one transaction each. Returns applied ids."""
+    done = applied_migrations(engine)
+    newly_applied: List[str] = []
+    for migration in MIGRATIONS:
+        if migration.id in done:
+            continue
+        with engine.begin() as conn:
+            if migration.dialect is not None and migration.dialect != engine.dialect.name:
+                statements, add_columns = (), ()
+            else:
+                statements, add_columns = migration.statements, migration.add_columns
+            for table, column, ddl in add_columns:
+                if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (id, description, applied_at) VALUES (:id, :description, :applied_at)"),
+                {"id": migration.id, "description": migration.description, "applied_at": datetime.utcnow()},
+            )
+        logger.info("applied migration %s", migration.id)
+        newly_applied.append(migration.id)
+    return newly_applied
+
+
+if __name__ == "__main__":
+    from app import models  # noqa: F401
+    from app.db.session import engine
+    from sqlmodel import SQLModel
+
+    SQLModel.metadata.create_all(engine)
+    applied = run_migrations(engine)
+    print("applied:", ", ".join(applied) if applied else "nothing pending")
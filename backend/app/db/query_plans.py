@@ -0,0 +1,160 @@
+"""EXPLAIN QUERY PLAN regression check for the hot route queries.
+
+Run against a freshly seeded throwaway SQLite database, or an existing one:
+
+    python -m app.db.query_plans
+    python -m app.db.query_plans --database-url sqlite:///data/scale.sqlite3
+
+Exits non-zero when a hot query falls back to a full table scan or a temp B-tree sort
+that it is not explicitly allowed to use. ``tests/test_query_plans.py`` runs the same
+check against the seeded fixture.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.api import ai, articles, auth
+from app.db.migrations import run_migrations
+from app.models.ai_log import AICallLog
+from app.models.article import Article, ArticleLike, ArticleTagLink, Comment, Tag
+from app.models.card_reading import CardReading
+from app.models.reading_card import ReadingCard
+from app.models.user import User
+from app.services import ai_usage, reading_cards
+
+
+class HotQuery(NamedTuple):
+    name: str
+    build: Callable[[], Any]
+    # filtered joins (e.g. by tag) legitimately sort a small result set in memory
+    allow_temp_sort: bool = False
+
+
+def _feed_ids():
+    return articles.feed_query().with_only_columns(Article.id).order_by(None)
+
+
+# Built with the routes' and services' own statement builders, so a query changed there is
+# checked as it now runs; a new hot query needs its builder registered here.
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("readings.my", lambda: ai.my_readings_query(1)),
+    HotQuery("articles.feed", lambda: articles.feed_query()),
+    HotQuery("articles.by_author", lambda: articles.feed_query(author_id=1)),
+    HotQuery("articles.feed_by_tag", lambda: articles.feed_query(tag="tag-1"), allow_temp_sort=True),
+    HotQuery("articles.tags_of_article", lambda: articles.article_tags_query(1)),
+    HotQuery("articles.likes_of_article", lambda: articles.article_likes_query(1)),
+    HotQuery("articles.feed_tags", lambda: articles.feed_tags_query(_feed_ids())),
+    HotQuery("articles.feed_likes", lambda: articles.feed_likes_query(_feed_ids())),
+    HotQuery("articles.comments", lambda: articles.comments_query(1)),
+    HotQuery("articles.tag_lookup", lambda: articles.tag_by_name_query("tag-1")),
+    HotQuery("auth.user_by_email", lambda: auth.user_by_email_query("user1@example.com")),
+    *(
+        HotQuery(f"reading_cards.{name}", lambda name=name: reading_cards.card_stats_queries()[name])
+        for name in ("readings", "draws", "colors")
+    ),
+    HotQuery("ai_usage.pending_logs", lambda: ai_usage.pending_logs_query(0, 5000)),
+    HotQuery("ai_usage.expired_logs", lambda: ai_usage.expired_logs_query(datetime(2025, 6, 1), 10**9, 5000)),
+    HotQuery("ai_usage.rollups", lambda: ai_usage.rollup_query("day", "model", datetime(2025, 1, 1), None, None)),
+]
+
+
+def seed_plan_fixture(engine: Engine, users: int = 20, articles_per_user: int = 5) -> None:
+    """Small but non-trivial dataset so every table and index has rows to plan against."""
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    base = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        tags = [Tag(name=f"tag-{i}") for i in range(10)]
+        session.add_all(tags)
+        for u in range(1, users + 1):
+            session.add(User(id=u, email=f"user{u}@example.com", password_hash="x", nickname=f"u{u}"))
+        session.flush()
+        for u in range(1, users + 1):
+            for a in range(articles_per_user):
+                created = base + timedelta(hours=u * articles_per_user + a)
+                article = Article(author_id=u, title="t", content_markdown="m", is_published=a % 3 != 0, created_at=created)
+                session.add(article)
+                session.flush()
+                session.add(ArticleTagLink(article_id=article.id, tag_id=tags[(u + a) % len(tags)].id))
+                session.add(Comment(article_id=article.id, user_id=u, content="c", created_at=created))
+                session.add(ArticleLike(article_id=article.id, user_id=u))
+                reading = CardReading(user_id=u, card_type="t", created_at=created)
+                session.add(reading)
+                session.flush()
+                for c in range(3):
+                    session.add(
+                        ReadingCard(
+                            reading_id=reading.id,
+                            card_id=f"card_{(u + a + c) % 12 + 1:02d}",
+                            orientation="front" if c % 2 else "back",
+                            color=("red", "blue", "yellow", "green")[(a + c) % 4],
+                            value=c + 1,
+                            in_layout=True,
+                        )
+                    )
+                session.add(AICallLog(user_id=u, model="m", latency_ms=100, created_at=created))
+        session.commit()
+
+
+def explain(engine: Engine, statement: Any) -> List[str]:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def plan_problems(detail_lines: List[str], allow_temp_sort: bool = False) -> List[str]:
+    problems = []
+    for detail in detail_lines:
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            problems.append(f"full scan: {detail}")
+        if "USE TEMP B-TREE" in detail and not allow_temp_sort:
+            problems.append(f"temp sort: {detail}")
+    return problems
+
+
+def check_query_plans(engine: Engine) -> dict[str, List[str]]:
+    """Return {query name: problems} for every hot query with a regressed plan."""
+    failures: dict[str, List[str]] = {}
+    for query in HOT_QUERIES:
+        problems = plan_problems(explain(engine, query.build()), query.allow_temp_sort)
+        if problems:
+            failures[query.name] = problems
+    return failures
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check hot query plans for full scans and temp sorts.")
+    parser.add_argument("--database-url", help="check an existing database (e.g. a synthetic snapshot) instead of a seeded fixture")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url:
+            engine = create_engine(args.database_url)
+        else:
+            engine = create_engine(f"sqlite:///{(Path(tmp) / 'plans.sqlite3').as_posix()}")
+            seed_plan_fixture(engine)
+        for query in HOT_QUERIES:
+            print(f"{query.name}:")
+            for detail in explain(engine, query.build()):
+                print(f"  {detail}")
+        failures = check_query_plans(engine)
+        engine.dispose()
+    if failures:
+        for name, problems in failures.items():
+            for problem in problems:
+                print(f"FAIL {name}: {problem}", file=sys.stderr)
+        return 1
+    print("all hot query plans use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
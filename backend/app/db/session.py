@@ -1,21 +1,46 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Generator
 
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import get_settings
 
 settings = get_settings()
 engine = create_engine(settings.database_url, echo=False)
 
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def _async_database_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver (aiosqlite/asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme and scheme.split("+", 1)[1] in ("aiosqlite", "asyncpg"):
+        return url
+    base = scheme.split("+", 1)[0]
+    return f"{_ASYNC_DRIVERS.get(base, scheme)}{sep}{rest}"
+
+
+async_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    echo=False,
+)
+
 
 def init_db() -> None:
     from app import models  # noqa: F401
     from app.db.card_seed import ensure_card_definitions
+    from app.db.migrations import run_migrations
 
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
     with Session(engine) as session:
         ensure_card_definitions(session)
 
@@ -24,3 +49,10 @@ def init_db() -> None:
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False so refreshed rows stay readable after commit without lazy IO
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,323 @@
+"""Synthetic large-dataset generator for scale and performance testing.
+
+Builds a reusable SQLite snapshot with realistic volumes of users, articles, tags,
+likes, comments and card readings (layouts drawn from ``config/card_definitions.json``):
+
+    python -m app.db.synthetic --snapshot data/scale.sqlite3 --users 200000 --articles 2000000
+
+Generation is seeded and deterministic: timestamps count back from a fixed ``--epoch``
+rather than the wall clock, so every performance change to feed, search and pagination
+is measured against the same data. Rows are written with batched
+executemany inserts; a ``<snapshot>.json`` manifest records the parameters and counts.
+Use ``restore_snapshot`` (or ``--restore-to``) to copy a snapshot into place.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import shutil
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import markdown2
+from sqlalchemy import Table, event, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.db.card_seed import CARD_DEFINITION_PATH, ensure_card_definitions
+from app.db.migrations import MIGRATIONS_TABLE, run_migrations
+from app.models.ai_log import AICallLog
+from app.models.article import Article, ArticleLike, ArticleTagLink, Comment, Tag
+from app.models.card_reading import CardReading
+from app.models.user import User
+from app.utils.security import pwd_context
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_PASSWORD = "password123"
+COLORS = ("red", "blue", "yellow", "green")
+_BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+TAG_WORDS = (
+    "职场", "亲子", "亲密关系", "自我成长", "情绪", "沟通", "团队", "决策", "压力", "目标",
+    "原则", "冲突", "领导力", "转型", "复盘", "倾听", "边界", "习惯", "焦虑", "内省",
+)
+SCENES = (
+    "最近和团队在项目节奏上有分歧，想看看自己的真实想法。",
+    "孩子升学选择让我很纠结，希望理清自己的期待。",
+    "换工作的决定拖了三个月，想知道卡住我的是什么。",
+    "和伴侣沟通总是不欢而散，想了解我的沟通模式。",
+    "新晋管理者，不知道如何平衡结果和人情。",
+)
+
+
+@dataclass
+class SyntheticConfig:
+    users: int = 1000
+    articles: int = 10000
+    tags: int = 200
+    tags_per_article: int = 3
+    likes_per_article: int = 5
+    comments_per_article: int = 3
+    readings: int = 10000
+    ai_logs: int = 10000
+    days: int = 365
+    seed: int = 42
+    batch_size: int = 10000
+    epoch: str = "2026-01-01T00:00:00"  # timestamps span the `days` before this (ISO, naive UTC)
+
+
+def load_cards() -> List[dict]:
+    return json.loads(CARD_DEFINITION_PATH.read_text(encoding="utf-8-sig"))
+
+
+def build_layout(rng: random.Random, cards: List[dict]) -> List[dict]:
+    """Mirror the frontend's 3x4 board payload (CardSetBoard.slotToLayoutItem)."""
+    order = rng.sample(cards, len(cards))
+    layout = []
+    for slot_index, card in enumerate(order):
+        side = "front" if rng.random() < 0.5 else "back"
+        face = card[side]
+        row, col = slot_index // 4 + 1, slot_index % 4 + 1
+        row_label = ("第一排", "第二排", "第三排")[row - 1] if row <= 3 else f"第{row}排"
+        layout.append(
+            {
+                "cardId": card["id"],
+                "side": side,
+                "title": face.get("title"),
+                "english": face.get("english"),
+                "value": face.get("value"),
+                "color": face.get("color"),
+                "slotIndex": slot_index,
+                "row": row,
+                "col": col,
+                "rowLabel": row_label,
+                "positionLabel": f"{row_label} 第{col}位",
+            }
+        )
+    return layout
+
+
+def _sqlite_bulk_pragmas(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):  # noqa: ANN001
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=OFF")
+        cur.execute("PRAGMA synchronous=OFF")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.close()
+
+
+def _insert_batches(engine: Engine, table: Table, rows: Iterator[Dict[str, Any]], batch_size: int) -> int:
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    insert = table.insert()
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            with engine.begin() as conn:
+                conn.execute(insert, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert, batch)
+        total += len(batch)
+    logger.info("inserted %s rows into %s", total, table.name)
+    return total
+
+
+def _password_hash(seed: int) -> str:
+    # bcrypt once, reused for every user; the salt comes from the seed so reruns match
+    salt_rng = random.Random(seed)
+    salt = "".join(salt_rng.choice(_BCRYPT_ALPHABET) for _ in range(21)) + salt_rng.choice(".Oeu")
+    return pwd_context.handler("bcrypt").using(salt=salt).hash(SYNTHETIC_PASSWORD)
+
+
+def generate(engine: Engine, cfg: SyntheticConfig) -> Dict[str, int]:
+    epoch = datetime.fromisoformat(cfg.epoch)
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    with Session(engine) as session:
+        ensure_card_definitions(session)
+    with engine.begin() as conn:  # bookkeeping timestamps too, so reruns are byte-identical
+        conn.execute(text("UPDATE carddefinition SET created_at = :t"), {"t": epoch})
+        conn.execute(text(f"UPDATE {MIGRATIONS_TABLE} SET applied_at = :t"), {"t": epoch})
+
+    rng = random.Random(cfg.seed)
+    cards = load_cards()
+    start = epoch - timedelta(days=cfg.days)
+    span_seconds = cfg.days * 86400
+    password_hash = _password_hash(cfg.seed)
+    html_cache: Dict[int, str] = {}
+
+    def ts(index: int, count: int) -> datetime:
+        # ids grow with time, with jitter, like production inserts
+        base = span_seconds * index / max(count, 1)
+        return start + timedelta(seconds=base + rng.uniform(0, span_seconds / max(count, 1)))
+
+    def users() -> Iterator[Dict[str, Any]]:
+        for i in range(1, cfg.users + 1):
+            yield {
+                "id": i,
+                "email": f"user{i}@example.com",
+                "password_hash": password_hash,
+                "nickname": f"用户{i}",
+                "avatar_url": None,
+                "role": "admin" if i == 1 else "user",
+                "created_at": ts(i, cfg.users),
+                "is_active": True,
+            }
+
+    def tags() -> Iterator[Dict[str, Any]]:
+        for i in range(1, cfg.tags + 1):
+            word = TAG_WORDS[(i - 1) % len(TAG_WORDS)]
+            yield {"id": i, "name": word if i <= len(TAG_WORDS) else f"{word}{i}"}
+
+    def readings() -> Iterator[Dict[str, Any]]:
+        for i in range(1, cfg.readings + 1):
+            layout = build_layout(rng, cards)
+            scores = {c: 0 for c in COLORS}
+            for item in layout:
+                scores[item["color"]] += int(item["value"] or 0) + max(0, 3 - item["row"])
+            dominant = max(scores, key=scores.get)
+            yield {
+                "id": i,
+                "user_id": rng.randint(1, cfg.users),
+                "card_type": "性格色彩",
+                "scene_desc": rng.choice(SCENES),
+                "ai_response": f"## 解读\n\n主导色彩：{dominant}。得分 {json.dumps(scores)}。\n\n" + "分析段落。" * rng.randint(50, 400),
+                "cards_json": layout,
+                "image_urls": [],
+                "created_at": ts(i, cfg.readings),
+            }
+
+    def articles() -> Iterator[Dict[str, Any]]:
+        for i in range(1, cfg.articles + 1):
+            paragraphs = rng.randint(2, 12)
+            if paragraphs not in html_cache:
+                html_cache[paragraphs] = markdown2.markdown("\n\n".join(["正文段落。" * 20] * paragraphs))
+            from_reading = rng.randint(1, cfg.readings) if cfg.readings and rng.random() < 0.4 else None
+            yield {
+                "id": i,
+                "author_id": rng.randint(1, cfg.users),
+                "title": f"解析档案 #{i}",
+                "content_markdown": "> 摘要：合成数据\n\n" + "\n\n".join(["正文段落。" * 20] * paragraphs),
+                "content_html": html_cache[paragraphs],
+                "from_reading_id": from_reading,
+                "is_auto_generated": from_reading is not None,
+                "is_featured": rng.random() < 0.01,
+                "is_published": rng.random() < 0.8,
+                "created_at": ts(i, cfg.articles),
+            }
+
+    def tag_links() -> Iterator[Dict[str, Any]]:
+        per = min(cfg.tags_per_article, cfg.tags)
+        for article_id in range(1, cfg.articles + 1):
+            for tag_id in rng.sample(range(1, cfg.tags + 1), rng.randint(0, per)):
+                yield {"article_id": article_id, "tag_id": tag_id}
+
+    def likes() -> Iterator[Dict[str, Any]]:
+        per = min(cfg.likes_per_article * 2, cfg.users)
+        for article_id in range(1, cfg.articles + 1):
+            for user_id in rng.sample(range(1, cfg.users + 1), rng.randint(0, per)):
+                yield {"article_id": article_id, "user_id": user_id, "created_at": ts(article_id, cfg.articles)}
+
+    def comments() -> Iterator[Dict[str, Any]]:
+        for article_id in range(1, cfg.articles + 1):
+            created = ts(article_id, cfg.articles)
+            for j in range(rng.randint(0, cfg.comments_per_article * 2)):
+                yield {
+                    "article_id": article_id,
+                    "user_id": rng.randint(1, cfg.users),
+                    "content": "很有共鸣的解读。" * rng.randint(1, 5),
+                    "created_at": created + timedelta(minutes=j * 7),
+                }
+
+    def ai_logs() -> Iterator[Dict[str, Any]]:
+        for i in range(1, cfg.ai_logs + 1):
+            failed = rng.random() < 0.03
+            yield {
+                "user_id": rng.randint(1, cfg.users),
+                "model": rng.choice(("qwen-plus-2025-09-11", "gemini-3.0-pro-preview")),
+                "tokens_in": rng.randint(1500, 4000),
+                "tokens_out": rng.randint(400, 2500),
+                "latency_ms": int(rng.lognormvariate(9.3, 0.5)),
+                "status": "error" if failed else "success",
+                "created_at": ts(i, cfg.ai_logs),
+            }
+
+    steps: List[tuple[Table, Callable[[], Iterator[Dict[str, Any]]]]] = [
+        (User.__table__, users),
+        (Tag.__table__, tags),
+        (CardReading.__table__, readings),
+        (Article.__table__, articles),
+        (ArticleTagLink.__table__, tag_links),
+        (ArticleLike.__table__, likes),
+        (Comment.__table__, comments),
+        (AICallLog.__table__, ai_logs),
+    ]
+    counts: Dict[str, int] = {}
+    for table, rows in steps:
+        started = time.perf_counter()
+        counts[table.name] = _insert_batches(engine, table, rows(), cfg.batch_size)
+        logger.info("%s done in %.1fs", table.name, time.perf_counter() - started)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    return counts
+
+
+def build_snapshot(snapshot: Path, cfg: SyntheticConfig) -> Dict[str, int]:
+    snapshot = Path(snapshot)
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    if snapshot.exists():
+        snapshot.unlink()
+    engine = create_engine(f"sqlite:///{snapshot.as_posix()}")
+    _sqlite_bulk_pragmas(engine)
+    try:
+        counts = generate(engine, cfg)
+    finally:
+        engine.dispose()
+    # no build time here: the manifest is identical for identical snapshots
+    manifest = {"config": asdict(cfg), "counts": counts}
+    snapshot.with_suffix(snapshot.suffix + ".json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return counts
+
+
+def restore_snapshot(snapshot: Path, target: Path) -> Path:
+    """Copy a snapshot over a working database file (the snapshot itself stays pristine)."""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(snapshot, target)
+    return target
+
+
+def main(argv: List[str] | None = None) -> int:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic large-dataset SQLite snapshot.")
+    parser.add_argument("--snapshot", type=Path, required=True, help="snapshot .sqlite3 file to (re)build")
+    parser.add_argument("--restore-to", type=Path, help="copy an existing snapshot to this DB file instead of generating")
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.restore_to:
+        print(f"restored {restore_snapshot(args.snapshot, args.restore_to)}")
+        return 0
+    cfg = SyntheticConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    counts = build_snapshot(args.snapshot, cfg)
+    print(json.dumps(counts, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
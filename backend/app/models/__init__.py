@@ -3,3 +3,8 @@ from app.models.card_reading import CardReading  # noqa: F401
 from app.models.article import Article, Tag, ArticleTagLink, Comment, ArticleLike  # noqa: F401
 from app.models.ai_log import AICallLog  # noqa: F401
 from app.models.card_definition import CardDefinition  # noqa: F401
+from app.models.ai_usage import AIUsageRollup, AIUsageRollupState  # noqa: F401
+from app.models.idempotency import IdempotencyRecord  # noqa: F401
+from app.models.reading_fingerprint import ReadingFingerprint  # noqa: F401
+from app.models.reading_card import ReadingCard  # noqa: F401
+from app.models.archive_job import ArchiveJob  # noqa: F401
@@ -3,15 +3,23 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class AICallLog(SQLModel, table=True):
+    __table_args__ = (Index("ix_aicalllog_created", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: Optional[int] = Field(default=None, index=True)
     model: str = Field(default="")
     tokens_in: Optional[int] = None
     tokens_out: Optional[int] = None
+    # part of tokens_in served from the provider's prompt cache, when reported
+    tokens_cached: Optional[int] = None
     latency_ms: Optional[int] = None
+    # estimated prompt tokens as submitted and after compaction/budgeting (app.services.prompt_budget)
+    prompt_tokens_raw: Optional[int] = None
+    prompt_tokens_compacted: Optional[int] = None
     status: str = Field(default="success")
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, Column, Index, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class AIUsageRollup(SQLModel, table=True):
+    """Pre-aggregated AICallLog stats per hour/day bucket, keyed by model or by user."""
+
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "dimension", "key", name="uq_aiusagerollup_bucket"),
+        Index("ix_aiusagerollup_dimension_bucket", "granularity", "dimension", "bucket_start"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    granularity: str = Field(max_length=8)  # "hour" | "day"
+    bucket_start: datetime
+    dimension: str = Field(max_length=8)  # "model" | "user"
+    key: str = Field(max_length=128)
+    calls: int = 0
+    errors: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    cost: float = 0.0
+    # mergeable latency sketch (see app.services.ai_usage.LatencySketch)
+    latency_sketch: Any = Field(default=None, sa_column=Column(JSON))
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class AIUsageRollupState(SQLModel, table=True):
+    """Single-row watermark: AICallLog ids up to `last_log_id` are already rolled up."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    last_log_id: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
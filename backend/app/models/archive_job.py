@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, Column, Index
+from sqlmodel import Field, SQLModel
+
+from app.db.compressed import CompressedText
+
+
+class ArchiveJob(SQLModel, table=True):
+    """A reading queued for archiving as an article; one per reading (app.services.archive)."""
+
+    __table_args__ = (Index("ix_archivejob_state_requested", "state", "requested_at"),)
+
+    reading_id: int = Field(primary_key=True, foreign_key="cardreading.id")
+    state: str = Field(default="pending", max_length=8)  # pending | running | done | failed
+    # optional overrides from the archive button: edited analysis, cover image, extra tags
+    analysis: Optional[str] = Field(default=None, sa_column=Column(CompressedText))
+    cover_url: Optional[str] = Field(default=None, max_length=512)
+    tag_names: Any = Field(default=None, sa_column=Column(JSON))
+    article_id: Optional[int] = Field(default=None, foreign_key="article.id")
+    claim: Optional[str] = Field(default=None, max_length=32)
+    attempts: int = Field(default=0)
+    error: Optional[str] = Field(default=None, max_length=255)
+    requested_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    claimed_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -3,19 +3,28 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, ForeignKey, Relationship, UniqueConstraint
 from app.models.user import User
 from app.models.card_reading import CardReading
 
 
 class ArticleTagLink(SQLModel, table=True):
-    __table_args__ = (UniqueConstraint("article_id", "tag_id", name="uq_article_tag"),)
+    __table_args__ = (
+        UniqueConstraint("article_id", "tag_id", name="uq_article_tag"),
+        Index("ix_articletaglink_tag_article", "tag_id", "article_id"),
+    )
 
     article_id: int = Field(foreign_key="article.id", primary_key=True)
     tag_id: int = Field(foreign_key="tag.id", primary_key=True)
 
 
 class Article(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_article_published_created", "is_published", "created_at"),
+        Index("ix_article_author_created", "author_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     author_id: int = Field(foreign_key="user.id", index=True)
     title: str
@@ -41,6 +50,8 @@ class Tag(SQLModel, table=True):
 
 
 class Comment(SQLModel, table=True):
+    __table_args__ = (Index("ix_comment_article_created", "article_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     article_id: int = Field(foreign_key="article.id", index=True)
     user_id: int = Field(foreign_key="user.id", index=True)
@@ -3,19 +3,23 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Optional
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index
 from sqlmodel import Field, SQLModel, ForeignKey, Relationship
+from app.db.compressed import CompressedJSON, CompressedText
 from app.models.user import User
 
 
 class CardReading(SQLModel, table=True):
+    __table_args__ = (Index("ix_cardreading_user_created", "user_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id", index=True)
     card_type: str = Field(default="")
     scene_desc: str = Field(default="")
-    ai_response: str = Field(default="")
-    cards_json: Any = Field(default=None, sa_column=Column(JSON))
-    image_urls: Any = Field(default=None, sa_column=Column(JSON))
+    # large payloads are stored compressed; list queries defer them
+    ai_response: str = Field(default="", sa_column=Column(CompressedText, nullable=False))
+    cards_json: Any = Field(default=None, sa_column=Column(CompressedJSON))
+    image_urls: Any = Field(default=None, sa_column=Column(CompressedJSON))
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
     user: User = Relationship()
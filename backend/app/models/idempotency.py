@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, Index, LargeBinary, UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    """One `Idempotency-Key` per caller: in flight, then the stored response until expiry."""
+
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotencyrecord_scope_key"),
+        Index("ix_idempotencyrecord_expires", "expires_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    scope: str = Field(max_length=32)  # "user:<id>" or "anon"
+    key: str = Field(max_length=128)
+    fingerprint: str = Field(max_length=32)  # method + path + body digest
+    state: str = Field(default="in_flight", max_length=12)  # "in_flight" | "done"
+    status_code: Optional[int] = None
+    content_type: Optional[str] = Field(default=None, max_length=128)
+    # compressed with app.db.compressed.compress_bytes
+    body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    expires_at: datetime = Field(nullable=False)
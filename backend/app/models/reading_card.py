@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class ReadingCard(SQLModel, table=True):
+    """One card of a CardReading, normalised at write time (app.services.reading_cards)."""
+
+    # one covering index per card_stats query, each read in group/distinct order
+    __table_args__ = (
+        Index("ix_readingcard_layout_reading", "in_layout", "reading_id"),
+        Index("ix_readingcard_layout_card", "in_layout", "card_id", "orientation"),
+        Index("ix_readingcard_layout_color", "in_layout", "color", "value"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    reading_id: int = Field(foreign_key="cardreading.id", index=True)
+    # CardDefinition.id; None when the model named a card that isn't in the deck
+    card_id: Optional[str] = Field(default=None, max_length=32)
+    name: str = Field(default="", max_length=64)
+    orientation: Optional[str] = Field(default=None, max_length=5)  # "front" | "back"
+    color: Optional[str] = Field(default=None, max_length=16)
+    value: Optional[int] = None
+    position: Optional[str] = Field(default=None, max_length=32)
+    confidence: Optional[float] = None
+    # on the submitted board, as opposed to only mentioned in the model's output
+    in_layout: bool = Field(default=False)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, Column, JSON
+from sqlmodel import Field, SQLModel
+
+
+class ReadingFingerprint(SQLModel, table=True):
+    """Similarity features of a CardReading (see app.services.reading_similarity)."""
+
+    reading_id: Optional[int] = Field(default=None, primary_key=True, foreign_key="cardreading.id")
+    user_id: int = Field(index=True)
+    card_type: str = Field(default="", index=True)
+    # {card_id: 1 (front up) | -1 (back up)}
+    orientation: Any = Field(default=None, sa_column=Column(JSON))
+    # 64-bit SimHash of the normalised scene description, stored signed
+    scene_hash: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
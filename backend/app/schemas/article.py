@@ -19,6 +19,24 @@ class ArticleCreate(ArticleBase):
     pass
 
 
+class ArchiveRequest(BaseModel):
+    reading_id: int
+    # edited analysis to archive instead of the stored one
+    analysis: Optional[str] = None
+    cover_url: Optional[str] = Field(default=None, max_length=512)
+    tag_names: List[str] = Field(default_factory=list)
+
+
+class ArchiveJobRead(BaseModel):
+    reading_id: int
+    state: str
+    article_id: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ArticleRead(BaseModel):
     id: int
     title: str
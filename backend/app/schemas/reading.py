@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CardInfo(BaseModel):
@@ -18,6 +18,36 @@ class ReadingCreate(BaseModel):
     scene_desc: str
 
 
+class InterpretItem(BaseModel):
+    """One reading of a batch; mirrors the interpret-with-image form fields."""
+
+    card_type: str
+    scene_desc: str
+    cardset_layout: List[Any] = Field(default_factory=list)
+    cardset_scores: Dict[str, Any] = Field(default_factory=dict)
+    cardset_score_text: str = ""
+    cardset_layout_summary: str = ""
+    cardset_score_logic: str = ""
+
+
+class BatchInterpretRequest(BaseModel):
+    items: List[InterpretItem]
+    # "offline" uses the provider's cheaper, slower tier when ai.yaml configures one
+    tier: Literal["standard", "offline"] = "standard"
+
+
+class ReadingSummary(BaseModel):
+    """List item: omits the large payload columns so they are never loaded for lists."""
+
+    id: int
+    card_type: str
+    scene_desc: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class ReadingRead(BaseModel):
     id: int
     card_type: str
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UploadPresignRequest(BaseModel):
+    filename: Optional[str] = None
+    content_type: str = Field(default="application/octet-stream", max_length=127)
+    size: int = Field(gt=0)
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")  # hex digest of the exact bytes to upload
+
+
+class PresignedUpload(BaseModel):
+    key: str
+    url: str  # where the file is served once uploaded
+    method: str = "PUT"
+    upload_url: str
+    headers: Dict[str, str]  # send these with the body; the signature covers them
+    expires_at: datetime
@@ -1,9 +1,11 @@
 ﻿from __future__ import annotations
 
+import json
 import logging
 import os
 import time
 import asyncio
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
@@ -11,11 +13,12 @@ import httpx
 import yaml
 from dotenv import load_dotenv
 
-from app.core.config import get_settings, PROJECT_ROOT
+from app.core import metrics, observability
+from app.core.config import AIConfig, get_settings, PROJECT_ROOT
+from app.services import ai_trace, prompt_budget
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 PROMPT_FILE = Path(__file__).resolve().parents[3] / 'config' / 'prompt.txt'
 PRESET_FILE = PROJECT_ROOT / "config" / "model_presets.yaml"
 BASE_PROMPT = None
@@ -27,6 +30,14 @@ load_dotenv(PROJECT_ROOT / ".env")
 load_dotenv(PROJECT_ROOT / "backend" / ".env")
 
 
+class AICallCancelled(RuntimeError):
+    """The caller went away before the provider finished; the upstream call was aborted."""
+
+
+class AICallTimeout(RuntimeError):
+    """The request deadline passed before the provider finished."""
+
+
 def _normalize_content(content: Any) -> str:
     if not content:
         return ""
@@ -37,6 +48,30 @@ def _normalize_content(content: Any) -> str:
     return ""
 
 
+def _collect_stream(text: str) -> Dict[str, Any]:
+    """Fold an OpenAI-style SSE stream into the shape of a non-streamed completion."""
+    parts: List[str] = []
+    data: Dict[str, Any] = {}
+    for line in text.splitlines():
+        if not line.startswith("data:"):
+            continue
+        chunk = line[5:].strip()
+        if not chunk or chunk == "[DONE]":
+            continue
+        try:
+            event = json.loads(chunk)
+        except json.JSONDecodeError:
+            continue
+        for choice in event.get("choices") or []:
+            parts.append(_normalize_content((choice.get("delta") or {}).get("content")))
+        if event.get("usage"):
+            data["usage"] = event["usage"]
+        data.setdefault("id", event.get("id"))
+        data.setdefault("model", event.get("model"))
+    data["choices"] = [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}, "finish_reason": "stop"}]
+    return data
+
+
 def _resolve_api_key(provider: str | None) -> tuple[str, str]:
     """Pick API key by provider, return (key, source)."""
     provider = (provider or "").lower()
@@ -50,14 +85,42 @@ def _resolve_api_key(provider: str | None) -> tuple[str, str]:
     return key, "AI_API_KEY"
 
 
+# providers whose OpenAI-compatible API takes explicit `cache_control` markers (DashScope);
+# others (e.g. gemini) cache repeated prefixes implicitly
+CACHE_CONTROL_PROVIDERS = {"qwen", "dashscope"}
+
+
+def _cache_hints(ai_cfg: AIConfig) -> bool:
+    if ai_cfg.cache_control is not None:
+        return ai_cfg.cache_control
+    return (ai_cfg.provider or "").lower() in CACHE_CONTROL_PROVIDERS
+
+
+def cached_tokens(usage: Dict[str, Any]) -> int | None:
+    """Prompt tokens served from the provider's cache, if the usage block reports them."""
+    details = usage.get("prompt_tokens_details") or {}
+    value = details.get("cached_tokens", usage.get("cached_tokens"))
+    return int(value) if value is not None else None
+
+
 async def call_ai_model(
     files: List[Tuple[str, bytes]],
     prompt: str,
     user_id: int | None = None,
+    deadline: float | None = None,
+    extra_params: Dict[str, Any] | None = None,
+    system: str | None = None,
 ) -> Dict[str, Any]:
     """Call OpenAI-compatible multimodal endpoint.
 
-    If ai.yaml is missing or AI_API_KEY is unset, returns a stubbed response.
+    `system` goes first as its own message so providers can cache it as a prefix; it is
+    marked with ``cache_control`` where the provider takes explicit hints (see
+    `_cache_hints`). `extra_params` are merged over the configured defaults (e.g.
+    ``AIConfig.offline_params``).
+
+    `deadline` is an event-loop time (``loop.time()``); past it the upstream request is
+    aborted and AICallTimeout raised. Cancelling the calling task closes the upstream
+    connection too, which stops a streamed generation.
     """
     start = time.time()
     ai_cfg = settings.load_ai_config()
@@ -84,71 +147,125 @@ async def call_ai_model(
     masked_key = f"{api_key[:6]}***{api_key[-4:]}" if len(api_key) > 10 else "SHORT_KEY"
     endpoint = ai_cfg.base_url.rstrip("/") + (ai_cfg.chat_completion_path or DEFAULT_PATH)
 
-    print(
-        "[ai_client] call start",
-        {
+    logger.info(
+        "AI call start",
+        extra={
             "model": ai_cfg.model,
             "prompt_len": len(prompt),
             "endpoint": endpoint,
             "api_key": masked_key,
             "key_source": key_source,
             "provider": ai_cfg.provider,
+            "user_id": user_id,
         },
-        flush=True,
     )
 
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
     }
+    messages: List[Dict[str, Any]] = []
+    if system:
+        system_part: Dict[str, Any] = {"type": "text", "text": system}
+        if _cache_hints(ai_cfg):
+            system_part["cache_control"] = {"type": "ephemeral"}
+        messages.append({"role": "system", "content": [system_part]})
+    messages.append({"role": "user", "content": [{"type": "text", "text": prompt}]})
     payload: Dict[str, Any] = {
         "model": ai_cfg.model,
-        "messages": [
-            {
-                "role": "user",
-                "content": [{"type": "text", "text": prompt}],
-            }
-        ],
+        "messages": messages,
     }
     if ai_cfg.default_params:
         payload.update(ai_cfg.default_params)
+    if extra_params:
+        payload.update(extra_params)
+
+    request_id = observability.current_request_id()
+    if request_id:
+        headers["X-Request-ID"] = request_id
+
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    upstream_start = time.perf_counter()
+    first_byte_at: float | None = None
+    chunk_offsets: list[float] = []
+    outcome = "error"
+    status: int | None = None
+    content_type = ""
+    raw = b""
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(endpoint, json=payload, headers=headers)
-        text = resp.text
-        status = resp.status_code
-        content_type = resp.headers.get("content-type", "")
+    try:
+        async with asyncio.timeout_at(deadline), httpx.AsyncClient(timeout=60) as client:
+            async with client.stream("POST", endpoint, content=body, headers=headers) as resp:
+                status = resp.status_code
+                content_type = resp.headers.get("content-type", "")
+                first_byte_at = time.perf_counter()
+                chunks = []
+                async for chunk in resp.aiter_bytes():
+                    chunks.append(chunk)
+                    if len(chunk_offsets) < ai_trace.MAX_CHUNK_OFFSETS:
+                        chunk_offsets.append(round((time.perf_counter() - upstream_start) * 1000, 1))
+                raw = b"".join(chunks)
+                text = raw.decode(resp.encoding or "utf-8", errors="replace")
+        outcome = "success" if status < 400 else f"http_{status // 100}xx"
+    except (TimeoutError, httpx.TimeoutException) as exc:
+        outcome = "timeout"
+        raise AICallTimeout("AI provider did not answer before the request deadline") from exc
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        upstream_elapsed = time.perf_counter() - upstream_start
+        observability.add_ai_time(upstream_elapsed * 1000)
+        metrics.AI_LATENCY.labels(ai_cfg.provider or "default", ai_cfg.model, outcome).observe(upstream_elapsed)
+        recorder = ai_trace.get_recorder(settings.ai_record_path)
+        if recorder is not None:
+            recorder.record(
+                ai_trace.build_entry(
+                    provider=ai_cfg.provider or "default",
+                    model=ai_cfg.model,
+                    prompt=prompt,
+                    payload_bytes=len(body),
+                    response_bytes=len(raw),
+                    status=status,
+                    outcome=outcome,
+                    latency_ms=upstream_elapsed * 1000,
+                    ttfb_ms=(first_byte_at - upstream_start) * 1000 if first_byte_at else None,
+                    chunk_offsets_ms=chunk_offsets,
+                    content_type=content_type,
+                )
+            )
 
-    if "application/json" in content_type:
+    if "text/event-stream" in content_type and status < 400:
+        # providers configured with `"stream": true` in default_params
+        data = _collect_stream(text)
+    elif "application/json" in content_type:
         try:
-            data = resp.json()
+            data = json.loads(text)
         except Exception as exc:  # noqa: BLE001
-            print("[ai_client] json parse failed", {"status": status, "snippet": text[:400]}, flush=True)
+            logger.error("AI json parse failed", extra={"status": status, "snippet": text[:400]})
             raise RuntimeError(f"AI response parse error: {exc}") from exc
     else:
-        print("[ai_client] non-json response", {"status": status, "snippet": text[:400]}, flush=True)
+        logger.error("AI non-json response", extra={"status": status, "snippet": text[:400]})
         raise RuntimeError("AI response is not JSON; check endpoint/network")
 
     if status >= 400:
-        print("[ai_client] http error", {"status": status, "body": data}, flush=True)
+        logger.error("AI http error", extra={"status": status, "body": data})
         raise RuntimeError(data.get("error", {}).get("message") or f"AI request failed: {status}")
 
     message = (data.get("choices") or [{}])[0].get("message") or {}
     content = _normalize_content(message.get("content"))
     latency_ms = int((time.time() - start) * 1000)
 
-    print(
-        "[ai_client] call done",
-        {
+    logger.info(
+        "AI call done",
+        extra={
             "model": ai_cfg.model,
             "latency_ms": latency_ms,
             "status": status,
             "content_len": len(content),
             "raw_keys": list(data.keys()),
         },
-        flush=True,
     )
-    logger.info('AI call end model=%s latency_ms=%s', ai_cfg.model, latency_ms)
 
     return {
         "analysis": content,
@@ -157,15 +274,19 @@ async def call_ai_model(
     }
 
 
-def build_prompt(
-    card_type: str,
-    scene_desc: str,
-    cardset_layout: str | None = None,
-    cardset_scores: str | None = None,
-    cardset_score_text: str | None = None,
-    cardset_layout_summary: str | None = None,
-    cardset_score_logic: str | None = None,
-) -> str:
+@dataclass
+class PromptBuild:
+    # `system` is the stable prefix (instructions + card catalog) providers can cache;
+    # `text` is the per-request part
+    text: str
+    # estimated input tokens of the prompt as the client sent it, and as sent upstream
+    raw_tokens: int
+    tokens: int
+    truncated: List[str]
+    system: str = ''
+
+
+def _base_prompt() -> str:
     global BASE_PROMPT
     if BASE_PROMPT is None:
         try:
@@ -175,16 +296,100 @@ def build_prompt(
                 'You are a card interpretation assistant. Combine the provided images and descriptions to output JSON with '
                 'an `analysis` summary and a `cards` list.'
             )
+    return BASE_PROMPT
+
 
+def build_prompt(
+    card_type: str,
+    scene_desc: str,
+    cardset_layout: str | None = None,
+    cardset_scores: str | None = None,
+    cardset_score_text: str | None = None,
+    cardset_layout_summary: str | None = None,
+    cardset_score_logic: str | None = None,
+    reference_analysis: str | None = None,
+) -> str:
+    """The prompt exactly as submitted, without compaction or a budget."""
     layout_part = f"\nCard layout JSON: {cardset_layout}" if cardset_layout else ''
     layout_summary_part = f"\nLayout summary: {cardset_layout_summary}" if cardset_layout_summary else ''
     score_part = f"\nScores JSON: {cardset_scores}" if cardset_scores else ''
     score_text_part = f"\nScore summary: {cardset_score_text}" if cardset_score_text else ''
     score_logic_part = f"\nScoring rule: {cardset_score_logic}" if cardset_score_logic else ''
+    reference_part = (
+        f"\nReference interpretation of a near-identical layout (adapt it to this scene, do not copy it): {reference_analysis}"
+        if reference_analysis
+        else ''
+    )
 
     return (
-        f"{BASE_PROMPT}\n\n"
+        f"{_base_prompt()}\n\n"
         f"Card set type: {card_type}\n"
         f"Scene description: {scene_desc}"
-        f"{layout_part}{layout_summary_part}{score_part}{score_text_part}{score_logic_part}"
+        f"{layout_part}{layout_summary_part}{score_part}{score_text_part}{score_logic_part}{reference_part}"
+    )
+
+
+def assemble_prompt(
+    card_type: str,
+    scene_desc: str,
+    cardset_layout: Any = None,
+    cardset_scores: Any = None,
+    cardset_score_text: str | None = None,
+    cardset_layout_summary: str | None = None,
+    cardset_score_logic: str | None = None,
+    reference_analysis: str | None = None,
+    deck: Dict[str, Any] | None = None,
+    model: str | None = None,
+) -> PromptBuild:
+    """Compacted prompt within PROMPT_TOKEN_BUDGET, plus before/after size estimates.
+
+    The instructions and the ``CardDefinition`` catalog form the system prefix, identical
+    across calls; everything request-specific goes in the user text. The layout refers to
+    catalog entries (see prompt_budget.compact_layout) and the scores JSON is left out
+    when the score summary carries the same numbers. Over budget, the reference
+    interpretation goes first, then the free-text summaries, then the scene description
+    down to PROMPT_MIN_SCENE_CHARS; the prefix and the layout are never cut.
+    """
+    raw = build_prompt(
+        card_type=card_type,
+        scene_desc=scene_desc,
+        cardset_layout=cardset_layout if isinstance(cardset_layout, str) else json.dumps(cardset_layout, ensure_ascii=False),
+        cardset_scores=cardset_scores if isinstance(cardset_scores, str) else json.dumps(cardset_scores, ensure_ascii=False),
+        cardset_score_text=cardset_score_text,
+        cardset_layout_summary=cardset_layout_summary,
+        cardset_score_logic=cardset_score_logic,
+        reference_analysis=reference_analysis,
+    )
+    scores = '' if cardset_score_text else prompt_budget.compact_json(cardset_scores or '')
+    system = _base_prompt()
+    if deck:
+        system += (
+            "\n\nCard catalog (number: F front | B back, each title/color/value):\n" + prompt_budget.render_catalog(deck)
+        )
+    system_tokens = prompt_budget.estimate_tokens(system, model)
+    sections = [
+        prompt_budget.Section("Card set type: ", card_type),
+        prompt_budget.Section("\nScene description: ", scene_desc or '', priority=5, min_chars=settings.prompt_min_scene_chars),
+        prompt_budget.Section(
+            "\nCards (row-col, card number + F/B side, title, e.g. 2-2 01B 乐观; color/value are in the catalog): ",
+            prompt_budget.compact_layout(cardset_layout, deck),
+        ),
+        prompt_budget.Section("\nLayout summary: ", cardset_layout_summary or '', priority=3),
+        prompt_budget.Section("\nScores JSON: ", '' if scores in ('{}', '[]') else scores, priority=4),
+        prompt_budget.Section("\nScore summary: ", cardset_score_text or '', priority=4),
+        prompt_budget.Section("\nScoring rule: ", cardset_score_logic or '', priority=2),
+        prompt_budget.Section(
+            "\nReference interpretation of a near-identical layout (adapt it to this scene, do not copy it): ",
+            reference_analysis or '',
+            priority=1,
+        ),
+    ]
+    budget = settings.prompt_token_budget
+    fitted = prompt_budget.fit(sections, max(budget - system_tokens, 1) if budget > 0 else 0, model)
+    return PromptBuild(
+        text="".join(section.render() for section in fitted.sections),
+        raw_tokens=prompt_budget.estimate_tokens(raw, model),
+        tokens=system_tokens + fitted.tokens,
+        truncated=fitted.truncated,
+        system=system,
     )
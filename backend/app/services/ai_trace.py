@@ -0,0 +1,97 @@
+"""Sanitized AI traffic recorder for capacity planning (replayed by ``bench.replay``).
+
+Enabled by setting ``AI_RECORD_PATH``. Each upstream call appends one JSON line with
+timing and sizes only: no prompt text, response content or credentials are stored,
+just a SHA-256 of the prompt so repeated prompts can be recognised.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# keeps one trace line bounded even for long SSE streams
+MAX_CHUNK_OFFSETS = 512
+
+
+class TraceRecorder:
+    """Appends trace entries from a background thread so the event loop never does file IO."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="ai-trace-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        self._queue.put(entry)
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            while True:
+                entry = self._queue.get()
+                try:
+                    fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    if self._queue.empty():
+                        fh.flush()
+                except Exception:  # noqa: BLE001
+                    logger.exception("failed to write AI trace entry")
+
+
+_recorder: Optional[TraceRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder(path: Optional[Path]) -> Optional[TraceRecorder]:
+    global _recorder
+    if path is None:
+        return None
+    if _recorder is None or _recorder.path != Path(path):
+        with _recorder_lock:
+            if _recorder is None or _recorder.path != Path(path):
+                _recorder = TraceRecorder(path)
+    return _recorder
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def build_entry(
+    *,
+    provider: str,
+    model: str,
+    prompt: str,
+    payload_bytes: int,
+    response_bytes: int,
+    status: Optional[int],
+    outcome: str,
+    latency_ms: float,
+    ttfb_ms: Optional[float],
+    chunk_offsets_ms: Optional[list[float]] = None,
+    content_type: str = "",
+) -> Dict[str, Any]:
+    return {
+        # call start, so a replay can reproduce arrival times
+        "ts": round(time.time() - latency_ms / 1000, 3),
+        "provider": provider,
+        "model": model,
+        "prompt_sha": prompt_fingerprint(prompt),
+        "prompt_chars": len(prompt),
+        "payload_bytes": payload_bytes,
+        "response_bytes": response_bytes,
+        "status": status,
+        "outcome": outcome,
+        "latency_ms": round(latency_ms, 1),
+        "ttfb_ms": round(ttfb_ms, 1) if ttfb_ms is not None else None,
+        "content_type": content_type,
+        "chunk_offsets_ms": chunk_offsets_ms or [],
+    }
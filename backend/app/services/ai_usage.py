@@ -0,0 +1,360 @@
+"""Incremental AI usage rollups (hour/day, per model and per user) and raw log retention.
+
+    python -m app.services.ai_usage            # roll up pending AICallLog rows and prune
+
+A compactor folds AICallLog rows past a watermark into ``AIUsageRollup`` rows. Latency
+percentiles come from a mergeable log-bucket sketch, so hourly buckets, daily buckets
+and multi-day ranges all combine without touching raw rows. Workers may all run the
+compactor: each pass claims its id range with a compare-and-set on the watermark row,
+so a range is only ever counted once.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core.config import get_settings
+from app.models.ai_log import AICallLog
+from app.models.ai_usage import AIUsageRollup, AIUsageRollupState
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+DIMENSIONS = ("model", "user")
+STATE_ID = 1
+
+
+class LatencySketch:
+    """Log-bucketed histogram with bounded relative error (DDSketch-style); merge = add counts."""
+
+    def __init__(self, relative_accuracy: float = 0.02, buckets: Optional[Dict[int, int]] = None, zeros: int = 0) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = dict(buckets or {})
+        self.zeros = zeros
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= 0:
+            self.zeros += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {"a": self.relative_accuracy, "z": self.zeros, "b": {str(k): v for k, v in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "LatencySketch":
+        if not data:
+            return cls()
+        return cls(data.get("a", 0.02), {int(k): v for k, v in (data.get("b") or {}).items()}, data.get("z", 0))
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"unknown granularity {granularity!r}")
+
+
+def call_cost(model: str, tokens_in: int, tokens_out: int, prices: Dict[str, List[float]]) -> float:
+    """Cost from `ai_model_prices` (model -> [input, output] price per 1k tokens)."""
+    price = prices.get(model)
+    if not price:
+        return 0.0
+    return (tokens_in * price[0] + tokens_out * (price[1] if len(price) > 1 else price[0])) / 1000
+
+
+@dataclass
+class _Accumulator:
+    calls: int = 0
+    errors: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    cost: float = 0.0
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+
+    def add(self, log: AICallLog, cost: float) -> None:
+        self.calls += 1
+        # a caller hanging up is not a provider failure
+        self.errors += log.status not in ("success", "cancelled")
+        self.tokens_in += log.tokens_in or 0
+        self.tokens_out += log.tokens_out or 0
+        self.cost += cost
+        if log.latency_ms is not None:
+            self.sketch.add(log.latency_ms)
+
+
+def _ensure_state(engine: Engine) -> None:
+    with Session(engine) as session:
+        if session.get(AIUsageRollupState, STATE_ID) is None:
+            session.add(AIUsageRollupState(id=STATE_ID, last_log_id=0))
+            try:
+                session.commit()
+            except IntegrityError:  # another worker created it first
+                session.rollback()
+
+
+def _aggregate(logs: Iterable[AICallLog], prices: Dict[str, List[float]]) -> Dict[Tuple[str, datetime, str, str], _Accumulator]:
+    acc: Dict[Tuple[str, datetime, str, str], _Accumulator] = defaultdict(_Accumulator)
+    for log in logs:
+        cost = call_cost(log.model, log.tokens_in or 0, log.tokens_out or 0, prices)
+        for granularity in GRANULARITIES:
+            start = bucket_start(log.created_at, granularity)
+            acc[(granularity, start, "model", log.model or "unknown")].add(log, cost)
+            acc[(granularity, start, "user", str(log.user_id) if log.user_id is not None else "anonymous")].add(log, cost)
+    return acc
+
+
+def _apply(session: Session, acc: Dict[Tuple[str, datetime, str, str], _Accumulator], now: datetime) -> None:
+    buckets: Dict[str, set] = defaultdict(set)
+    for granularity, start, _, _ in acc:
+        buckets[granularity].add(start)
+    existing: Dict[Tuple[str, datetime, str, str], AIUsageRollup] = {}
+    for granularity, starts in buckets.items():
+        rows = session.exec(
+            select(AIUsageRollup).where(
+                AIUsageRollup.granularity == granularity, AIUsageRollup.bucket_start.in_(starts)
+            )
+        ).all()
+        for row in rows:
+            existing[(row.granularity, row.bucket_start, row.dimension, row.key)] = row
+
+    for (granularity, start, dimension, key), part in acc.items():
+        row = existing.get((granularity, start, dimension, key))
+        if row is None:
+            row = AIUsageRollup(granularity=granularity, bucket_start=start, dimension=dimension, key=key)
+        row.calls += part.calls
+        row.errors += part.errors
+        row.tokens_in += part.tokens_in
+        row.tokens_out += part.tokens_out
+        row.cost += part.cost
+        row.latency_sketch = LatencySketch.from_dict(row.latency_sketch).merge(part.sketch).to_dict()
+        row.updated_at = now
+        session.add(row)
+
+
+def pending_logs_query(last_id: int, batch_size: int):
+    return select(AICallLog).where(AICallLog.id > last_id).order_by(AICallLog.id).limit(batch_size)
+
+
+def expired_logs_query(cutoff: datetime, watermark: int, batch_size: int):
+    return select(AICallLog.id).where(AICallLog.created_at < cutoff, AICallLog.id <= watermark).limit(batch_size)
+
+
+def compact_once(engine: Engine, batch_size: int = 5000, settle_seconds: int = 60, now: Optional[datetime] = None) -> int:
+    """Roll up one batch past the watermark; returns the number of logs consumed."""
+    now = now or datetime.utcnow()
+    # rows younger than the settle window may sit behind ids of still-open transactions
+    cutoff = now - timedelta(seconds=settle_seconds)
+    prices = get_settings().ai_model_prices
+    _ensure_state(engine)
+    with Session(engine) as session:
+        last_id = session.get(AIUsageRollupState, STATE_ID).last_log_id
+        logs = session.exec(pending_logs_query(last_id, batch_size)).all()
+        ready = []
+        for log in logs:
+            if log.created_at >= cutoff:
+                break
+            ready.append(log)
+        if not ready:
+            return 0
+
+        claimed = session.execute(
+            update(AIUsageRollupState)
+            .where(AIUsageRollupState.id == STATE_ID, AIUsageRollupState.last_log_id == last_id)
+            .values(last_log_id=ready[-1].id, updated_at=now)
+        )
+        if claimed.rowcount != 1:
+            # another worker rolled this range up concurrently
+            session.rollback()
+            return 0
+        _apply(session, _aggregate(ready, prices), now)
+        session.commit()
+        return len(ready)
+
+
+def compact(engine: Engine, batch_size: int = 5000, settle_seconds: int = 60) -> int:
+    total = 0
+    while True:
+        done = compact_once(engine, batch_size=batch_size, settle_seconds=settle_seconds)
+        total += done
+        if done < batch_size:
+            return total
+
+
+def prune(engine: Engine, log_retention_days: int, hourly_retention_days: int, batch_size: int = 5000) -> Dict[str, int]:
+    """Delete raw logs past retention that are already rolled up, and old hourly rollups."""
+    now = datetime.utcnow()
+    removed = {"ai_logs": 0, "hourly_rollups": 0}
+    if log_retention_days > 0:
+        with Session(engine) as session:
+            state = session.get(AIUsageRollupState, STATE_ID)
+            watermark = state.last_log_id if state else 0
+        cutoff = now - timedelta(days=log_retention_days)
+        while True:
+            with Session(engine) as session:
+                ids = expired_logs_query(cutoff, watermark, batch_size)
+                result = session.execute(delete(AICallLog).where(AICallLog.id.in_(ids)))
+                session.commit()
+            removed["ai_logs"] += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    if hourly_retention_days > 0:
+        with Session(engine) as session:
+            result = session.execute(
+                delete(AIUsageRollup).where(
+                    AIUsageRollup.granularity == "hour",
+                    AIUsageRollup.bucket_start < now - timedelta(days=hourly_retention_days),
+                )
+            )
+            session.commit()
+        removed["hourly_rollups"] = result.rowcount
+    return removed
+
+
+def run_maintenance(engine: Engine) -> Dict[str, int]:
+    settings = get_settings()
+    rolled = compact(engine)
+    removed = prune(engine, settings.ai_log_retention_days, settings.ai_rollup_hourly_retention_days)
+    return {"rolled_up": rolled, **removed}
+
+
+async def run_periodic(engine: Engine, interval_seconds: float) -> None:
+    """Background compactor: roll up and prune every `interval_seconds` (cancel to stop)."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(run_maintenance, engine)
+            if any(result.values()):
+                logger.info("ai usage rollup", extra=result)
+        except Exception:  # noqa: BLE001
+            logger.exception("ai usage rollup failed")
+
+
+def _row_stats(calls: int, errors: int, tokens_in: int, tokens_out: int, cost: float, sketch: LatencySketch) -> dict:
+    p50, p95 = sketch.quantile(0.5), sketch.quantile(0.95)
+    return {
+        "calls": calls,
+        "errors": errors,
+        "error_rate": round(errors / calls, 4) if calls else 0.0,
+        "p50_ms": round(p50, 1) if p50 is not None else None,
+        "p95_ms": round(p95, 1) if p95 is not None else None,
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "cost": round(cost, 6),
+    }
+
+
+def rollup_query(granularity: str, dimension: str, since: Optional[datetime], until: Optional[datetime], key: Optional[str]):
+    query = select(AIUsageRollup).where(AIUsageRollup.granularity == granularity, AIUsageRollup.dimension == dimension)
+    if since is not None:
+        query = query.where(AIUsageRollup.bucket_start >= bucket_start(since, granularity))
+    if until is not None:
+        query = query.where(AIUsageRollup.bucket_start < until)
+    if key is not None:
+        query = query.where(AIUsageRollup.key == key)
+    return query
+
+
+def series(
+    session: Session,
+    granularity: str = "day",
+    dimension: str = "model",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    key: Optional[str] = None,
+) -> List[dict]:
+    rows = session.exec(
+        rollup_query(granularity, dimension, since, until, key).order_by(AIUsageRollup.bucket_start, AIUsageRollup.key)
+    ).all()
+    return [
+        {
+            "bucket_start": row.bucket_start,
+            "key": row.key,
+            **_row_stats(row.calls, row.errors, row.tokens_in, row.tokens_out, row.cost, LatencySketch.from_dict(row.latency_sketch)),
+        }
+        for row in rows
+    ]
+
+
+def summary(
+    session: Session,
+    granularity: str = "day",
+    dimension: str = "model",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 20,
+) -> List[dict]:
+    """Totals per key over the range, merging bucket sketches; busiest keys first."""
+    totals: Dict[str, list] = {}
+    for row in session.exec(rollup_query(granularity, dimension, since, until, None)).all():
+        entry = totals.setdefault(row.key, [0, 0, 0, 0, 0.0, LatencySketch()])
+        entry[0] += row.calls
+        entry[1] += row.errors
+        entry[2] += row.tokens_in
+        entry[3] += row.tokens_out
+        entry[4] += row.cost
+        entry[5].merge(LatencySketch.from_dict(row.latency_sketch))
+    ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+    return [{"key": key, **_row_stats(*values)} for key, values in ranked]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Roll up AICallLog rows and apply retention.")
+    parser.add_argument("--no-prune", action="store_true", help="only roll up, keep raw logs")
+    args = parser.parse_args(argv)
+
+    from app import models  # noqa: F401
+    from app.db.session import engine
+    from sqlmodel import SQLModel
+
+    SQLModel.metadata.create_all(engine)
+    if args.no_prune:
+        print({"rolled_up": compact(engine)})
+    else:
+        print(run_maintenance(engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Background pipeline that turns finished readings into (draft) articles.
+
+Readings are queued as ``archivejob`` rows, keyed by reading id so queueing twice is a
+no-op: automatically in the interpret transaction when AUTO_ARCHIVE_READINGS is on, or
+from the archive button (``POST /api/articles/archive``). A worker task per API
+process claims pending jobs in batches, renders their markdown, resolves tags with one
+query, bulk-inserts articles and tag links, and marks the jobs done in the same
+transaction. If a batch fails, its jobs are retried one by one so only the bad reading
+loses an attempt; it is retried with exponential backoff, up to MAX_ATTEMPTS. Claims
+expire after ARCHIVE_CLAIM_TIMEOUT_SECONDS, so a batch held by a worker that died is
+picked up again; a reading that already has an auto-generated article is linked to it
+instead of archived twice.
+
+    python -m app.services.archive   # drain the queue once
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+import markdown2
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, or_, and_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.archive_job import ArchiveJob
+from app.models.article import Article, ArticleTagLink, Tag
+from app.models.card_reading import CardReading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAGS = ("卡牌档案", "卡牌", "性格色彩", "解析")
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+_FENCED = re.compile(r"^```[a-zA-Z0-9]*\s+([\s\S]*?)\s*```$")
+
+_wake: Optional[asyncio.Event] = None
+
+
+def clean_tag_names(names: Iterable[str]) -> Set[str]:
+    """Tag names as stored: trimmed, lower-cased, no blanks or bare numbers."""
+    return {name.strip().lower() for name in names if name and name.strip() and not name.strip().isdigit()}
+
+
+def clean_analysis(text: str | None) -> str:
+    """Strip a code fence wrapped around the whole analysis (ParsePage.cleanResponseText)."""
+    raw = (text or "").strip()
+    fenced = _FENCED.match(raw)
+    if fenced:
+        return fenced.group(1).strip()
+    if not raw.startswith("```"):
+        return raw
+    lines = raw.split("\n")[1:]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if lines and lines[-1].strip().startswith("```"):
+        lines.pop()
+    return "\n".join(lines).strip()
+
+
+def format_markdown(reading: CardReading, job: ArchiveJob) -> str:
+    cover = f"![牌阵封面]({job.cover_url})\n\n" if job.cover_url else ""
+    analysis = job.analysis if job.analysis is not None else clean_analysis(reading.ai_response)
+    return f"{cover}> 摘要：{reading.scene_desc or '未提供'}\n\n{analysis}"
+
+
+def enqueue(
+    session: Session,
+    reading_id: int,
+    analysis: str | None = None,
+    cover_url: str | None = None,
+    tag_names: Iterable[str] = (),
+) -> ArchiveJob:
+    """Queue a reading (caller commits). A job that hasn't run yet takes the new overrides."""
+    job = session.get(ArchiveJob, reading_id)
+    if job is None:
+        job = ArchiveJob(reading_id=reading_id)
+    elif job.state not in ("pending", "failed"):
+        return job
+    job.state = "pending"
+    job.attempts = 0
+    job.analysis = analysis if analysis is not None else job.analysis
+    job.cover_url = cover_url or job.cover_url
+    job.tag_names = sorted(clean_tag_names(tag_names)) or job.tag_names
+    session.add(job)
+    return job
+
+
+def wake() -> None:
+    """Start the worker now instead of at its next poll (call after committing a job)."""
+    if _wake is not None:
+        _wake.set()
+
+
+def _claim(engine: Engine, batch_size: int) -> str:
+    settings = get_settings()
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.archive_claim_timeout_seconds)
+    # a failed attempt waits RETRY_BACKOFF_SECONDS * 2**(attempts - 1) from its claim
+    retry_due = or_(
+        ArchiveJob.attempts == 0,
+        ArchiveJob.claimed_at.is_(None),
+        *(
+            and_(ArchiveJob.attempts == n, ArchiveJob.claimed_at < now - timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (n - 1)))
+            for n in range(1, MAX_ATTEMPTS)
+        ),
+    )
+    claimable = or_(
+        and_(ArchiveJob.state == "pending", retry_due),
+        and_(ArchiveJob.state == "running", ArchiveJob.claimed_at < stale),
+    )
+    batch = select(ArchiveJob.reading_id).where(claimable).order_by(ArchiveJob.requested_at).limit(batch_size)
+    with engine.begin() as conn:
+        # the repeated condition keeps a concurrent claimer from taking the same rows
+        conn.execute(
+            update(ArchiveJob)
+            .where(ArchiveJob.reading_id.in_(batch.scalar_subquery()), claimable)
+            .values(state="running", claim=token, claimed_at=now, attempts=ArchiveJob.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+    return token
+
+
+def _tag_ids(session: Session, names: Set[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    found = {tag.name: tag.id for tag in session.exec(select(Tag).where(Tag.name.in_(names))).all()}
+    missing = names - found.keys()
+    if missing:
+        try:
+            with session.begin_nested():
+                session.execute(insert(Tag), [{"name": name} for name in sorted(missing)])
+        except IntegrityError:
+            # another writer created some of them; insert the rest one by one
+            for name in sorted(missing):
+                with contextlib.suppress(IntegrityError), session.begin_nested():
+                    session.execute(insert(Tag), [{"name": name}])
+        found.update({tag.name: tag.id for tag in session.exec(select(Tag).where(Tag.name.in_(missing))).all()})
+    return found
+
+
+def process_batch(engine: Engine, batch_size: int | None = None) -> int:
+    """Archive up to `batch_size` queued readings; returns how many jobs were claimed."""
+    batch_size = batch_size or get_settings().archive_batch_size
+    token = _claim(engine, batch_size)
+    with Session(engine) as session:
+        ids = list(session.exec(select(ArchiveJob.reading_id).where(ArchiveJob.claim == token)).all())
+    if not ids:
+        return 0
+    if not _archive_claimed(engine, token, ids) and len(ids) > 1:
+        # one bad reading must not use up the attempts of the whole batch
+        for reading_id in ids:
+            _archive_claimed(engine, token, [reading_id])
+    return len(ids)
+
+
+def _archive_claimed(engine: Engine, token: str, reading_ids: List[int]) -> bool:
+    """Archive these claimed jobs in one transaction; a lone job that fails is marked for retry."""
+    claimed = select(ArchiveJob).where(ArchiveJob.claim == token, ArchiveJob.reading_id.in_(reading_ids))
+    with Session(engine) as session:
+        try:
+            _archive(session, session.exec(claimed).all())
+            session.commit()
+            return True
+        except Exception as exc:  # noqa: BLE001
+            session.rollback()
+            if len(reading_ids) > 1:
+                logger.warning("archive batch failed, retrying jobs one by one", extra={"jobs": len(reading_ids)})
+                return False
+            logger.exception("archive job failed", extra={"reading_id": reading_ids[0]})
+            for job in session.exec(claimed).all():
+                # a pending retry is claimable again after its backoff (see _claim)
+                job.state = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+                job.error = str(exc)[:255]
+                session.add(job)
+            session.commit()
+            metrics.ARCHIVE_JOBS.labels("error").inc()
+            return False
+
+
+def _archive(session: Session, jobs: List[ArchiveJob]) -> None:
+    ids = [job.reading_id for job in jobs]
+    readings = {r.id: r for r in session.exec(select(CardReading).where(CardReading.id.in_(ids))).all()}
+    # readings archived before the pipeline (or by an earlier attempt) keep their article
+    existing = dict(
+        session.exec(
+            select(Article.from_reading_id, Article.id).where(
+                Article.from_reading_id.in_(ids), Article.is_auto_generated == True  # noqa: E712
+            )
+        ).all()
+    )
+    now = datetime.utcnow()
+    pending: List[tuple[ArchiveJob, Article, Set[str]]] = []
+    for job in jobs:
+        reading = readings.get(job.reading_id)
+        job.finished_at = now
+        if reading is None:
+            job.state, job.error = "failed", "reading not found"
+        elif job.reading_id in existing:
+            job.state, job.article_id = "done", existing[job.reading_id]
+            metrics.ARCHIVE_JOBS.labels("linked").inc()
+        else:
+            markdown = format_markdown(reading, job)
+            article = Article(
+                author_id=reading.user_id,
+                title=f"卡牌解析 - {reading.card_type}",
+                content_markdown=markdown,
+                content_html=markdown2.markdown(markdown),
+                from_reading_id=reading.id,
+                is_auto_generated=True,
+                is_published=False,
+            )
+            pending.append((job, article, clean_tag_names([reading.card_type, *DEFAULT_TAGS, *(job.tag_names or [])])))
+        session.add(job)
+    if not pending:
+        return
+
+    session.add_all([article for _, article, _ in pending])
+    session.flush()  # one multi-row INSERT ... RETURNING for the ids
+    tag_ids = _tag_ids(session, set().union(*(names for _, _, names in pending)))
+    links = [
+        {"article_id": article.id, "tag_id": tag_ids[name]}
+        for _, article, names in pending
+        for name in names
+        if name in tag_ids
+    ]
+    if links:
+        session.execute(insert(ArticleTagLink), links)
+    for job, article, _ in pending:
+        job.state, job.article_id, job.error = "done", article.id, None
+    metrics.ARCHIVE_JOBS.labels("created").inc(len(pending))
+
+
+def drain(engine: Engine) -> int:
+    total = 0
+    while claimed := process_batch(engine):
+        total += claimed
+    return total
+
+
+async def run_worker(engine: Engine, interval_seconds: float) -> None:
+    """Poll the queue every `interval_seconds`, or right away after `wake()` (cancel to stop)."""
+    global _wake
+    _wake = asyncio.Event()
+    while True:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(_wake.wait(), interval_seconds)
+        _wake.clear()
+        try:
+            archived = await run_in_threadpool(drain, engine)
+            if archived:
+                logger.info("archived readings", extra={"jobs": archived})
+        except Exception:  # noqa: BLE001
+            logger.exception("archive worker failed")
+
+
+if __name__ == "__main__":
+    from app.db.session import engine
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"processed {drain(engine)} archive jobs")
@@ -0,0 +1,183 @@
+"""Streaming bulk export of readings, articles and AI call logs.
+
+Rows are read with server-side cursors in ``yield_per`` batches and encoded chunk by
+chunk (NDJSON or CSV, optionally gzip), so memory stays flat regardless of table size.
+
+CLI:
+
+    python -m app.services.export readings --format csv --gzip --since 2025-01-01 -o readings.csv.gz
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import Table, select
+from sqlmodel import Session
+
+from app.db.session import engine
+from app.models.ai_log import AICallLog
+from app.models.article import Article
+from app.models.card_reading import CardReading
+
+CHUNK_BYTES = 64 * 1024
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ExportSource(NamedTuple):
+    table: Table
+    user_column: str
+
+
+EXPORT_SOURCES: Dict[str, ExportSource] = {
+    "readings": ExportSource(CardReading.__table__, "user_id"),
+    "articles": ExportSource(Article.__table__, "author_id"),
+    "ai_logs": ExportSource(AICallLog.__table__, "user_id"),
+}
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Unserializable export value: {type(value).__name__}")
+
+
+def iter_rows(
+    kind: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield rows as plain dicts; owns its session so it can outlive the request scope."""
+    source = EXPORT_SOURCES[kind]
+    table = source.table
+    query = select(table).order_by(table.c.id)
+    if since is not None:
+        query = query.where(table.c.created_at >= since)
+    if until is not None:
+        query = query.where(table.c.created_at < until)
+    if user_id is not None:
+        query = query.where(table.c[source.user_column] == user_id)
+    with Session(engine) as session:
+        result = session.execute(query.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            yield dict(row)
+
+
+def _buffered(pieces: Iterable[str]) -> Iterator[bytes]:
+    buf: List[str] = []
+    size = 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def encode_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    return _buffered(json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+    if isinstance(value, (datetime, date, bytes)):
+        return _json_default(value)
+    return value
+
+
+def encode_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    def lines() -> Iterator[str]:
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: _csv_value(val) for key, val in row.items()})
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+
+    return _buffered(lines())
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(
+    kind: str,
+    fmt: str = "ndjson",
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    if kind not in EXPORT_SOURCES:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    rows = iter_rows(kind, since=since, until=until, user_id=user_id, batch_size=batch_size)
+    if fmt == "csv":
+        chunks = encode_csv(rows, [c.name for c in EXPORT_SOURCES[kind].table.columns])
+    else:
+        chunks = encode_ndjson(rows)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_filename(kind: str, fmt: str, gzip: bool) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return f"{kind}_{stamp}.{fmt}" + (".gz" if gzip else "")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream a table export as NDJSON/CSV.")
+    parser.add_argument("kind", choices=sorted(EXPORT_SOURCES))
+    parser.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    stream = export_stream(
+        args.kind,
+        fmt=args.fmt,
+        gzip=args.gzip,
+        since=args.since,
+        until=args.until,
+        user_id=args.user_id,
+        batch_size=args.batch_size,
+    )
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
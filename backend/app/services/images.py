@@ -0,0 +1,112 @@
+"""Resized WebP/JPEG derivatives of uploaded images, rendered on first request.
+
+    /uploads/_d/<width>/<upload path>.<webp|jpg>
+    e.g. /uploads/_d/320/2026/10/19/reading_7_3f2a9c1e5b7d4a60.png.webp
+
+A derivative is written to the same relative path under ``upload_dir``, so the URL maps
+straight to the file and nginx can serve cached ones without the app (see
+``app.core.static``). Uploads are named after their content hash and never rewritten,
+so a source path identifies its bytes, and the path plus width and format is the cache
+key. Rendering runs in a process pool, and concurrent requests for the same derivative
+share one render. Widths are limited to IMAGE_DERIVATIVE_WIDTHS, and images are never
+upscaled.
+
+Pillow is optional. Without it, derivative URLs redirect to the original.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from app.core.config import get_settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional; derivatives fall back to the original
+    Image = ImageOps = None
+
+DERIVED_DIR = "_d"
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+SOURCE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+class Derivative(NamedTuple):
+    width: int
+    fmt: str
+    source: str  # path of the original, relative to upload_dir
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def parse(path: str) -> Optional[Derivative]:
+    """`_d/<width>/<source>.<fmt>` (relative to upload_dir), or None if it isn't one we make."""
+    parts = path.split("/", 2)
+    if len(parts) != 3 or parts[0] != DERIVED_DIR or not parts[1].isdigit():
+        return None
+    source, _, fmt = parts[2].rpartition(".")
+    width = int(parts[1])
+    if fmt not in FORMATS or width not in get_settings().image_derivative_widths:
+        return None
+    if Path(source).suffix.lower() not in SOURCE_SUFFIXES or source.startswith(f"{DERIVED_DIR}/"):
+        return None
+    return Derivative(width, fmt, source)
+
+
+def render(source: str, dest: str, width: int, fmt: str, quality: int) -> None:
+    """Runs in the pool: resize `source` to at most `width` wide and write it atomically."""
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        if fmt == "jpg" and img.mode != "RGB":
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            img.save(tmp, FORMATS[fmt], quality=quality, **({"method": 4} if fmt == "webp" else {"optimize": True}))
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=get_settings().image_workers)
+    return _pool
+
+
+async def ensure(source: str, dest: str, derivative: Derivative) -> None:
+    """Render `dest` unless it exists; concurrent callers for the same file share the work."""
+    if os.path.exists(dest):
+        return
+    future = _inflight.get(dest)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            _executor(), render, source, dest, derivative.width, derivative.fmt, get_settings().image_derivative_quality
+        )
+        _inflight[dest] = future
+        future.add_done_callback(lambda _: _inflight.pop(dest, None))
+    await asyncio.shield(future)
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,260 @@
+"""In-process pub/sub for comment and like notifications.
+
+Routes publish small JSON events to topics: ``article:<id>`` for everyone viewing the
+article and ``user:<id>`` for its author. ``/api/notifications`` streams them to
+subscribers over SSE or a WebSocket. Each event is serialised once, and that one string
+is queued to every subscriber, so a publish costs one list append per subscriber.
+
+An idle subscriber is a single slotted object in a topic set. Its queue is only created
+by the first event, and keep-alives come from one broker-wide timer instead of a timer
+per connection. A subscriber that falls more than NOTIFY_QUEUE_SIZE events behind loses
+the oldest ones and gets a ``resync`` event telling the client to re-fetch.
+
+With several workers on one host, set NOTIFY_BRIDGE_DIR. Every worker binds a Unix
+datagram socket there and forwards the events it publishes to the others. Delivery is
+best effort either way; clients re-fetch when they (re)connect.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# under the default unix datagram send buffer; bigger events are not bridged
+MAX_DATAGRAM = 60_000
+_PEER_REFRESH_SECONDS = 5.0
+
+
+class Event(NamedTuple):
+    type: str
+    data: str  # JSON, serialised once per publish
+
+
+RESYNC = Event("resync", "{}")
+
+
+def article_topic(article_id: int) -> str:
+    return f"article:{article_id}"
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class Subscriber:
+    __slots__ = ("topics", "limit", "_queue", "_waiter", "_lagged", "closed")
+
+    def __init__(self, topics: tuple[str, ...], limit: int) -> None:
+        self.topics = topics
+        self.limit = limit
+        self._queue: Optional[List[Event]] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._lagged = False
+        self.closed = False
+
+    def push(self, event: Event) -> None:
+        if self._queue is None:
+            self._queue = []
+        elif len(self._queue) >= self.limit:
+            del self._queue[0]
+            self._lagged = True
+            metrics.NOTIFY_EVENTS.labels("lagged").inc()
+        self._queue.append(event)
+        self.wake()
+
+    def wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self) -> None:
+        self.closed = True
+        self.wake()
+
+    async def get(self) -> Optional[List[Event]]:
+        """Queued events, [] on a keep-alive tick, None once closed."""
+        if not self._queue and not self.closed:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        if self.closed:
+            return None
+        events, self._queue = self._queue or [], None
+        if self._lagged:
+            self._lagged = False
+            events.insert(0, RESYNC)
+        return events
+
+
+class _Bridge:
+    """One Unix datagram socket per worker process, all in the same directory."""
+
+    def __init__(self, directory: Path, deliver: Callable[[List[str], Event], None]) -> None:
+        self.directory = directory
+        self.deliver = deliver
+        self.path = directory / f"notify-{os.getpid()}.sock"
+        self._peers: List[str] = []
+        self._peers_at = float("-inf")
+        self._sock: Optional[socket.socket] = None
+
+    def open(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(str(self.path))
+        loop.add_reader(self._sock.fileno(), self._read)
+
+    def close(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._sock is None:
+            return
+        loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_at > _PEER_REFRESH_SECONDS:
+            self._peers = [str(p) for p in self.directory.glob("notify-*.sock") if p != self.path]
+            self._peers_at = now
+        return self._peers
+
+    def forward(self, topics: List[str], event: Event) -> None:
+        if self._sock is None:
+            return
+        datagram = json.dumps([topics, event.type, event.data]).encode()
+        if len(datagram) > MAX_DATAGRAM:
+            logger.warning("notification too large to bridge", extra={"bytes": len(datagram), "type": event.type})
+            return
+        for peer in list(self._peer_paths()):
+            try:
+                self._sock.sendto(datagram, peer)
+            except BlockingIOError:
+                metrics.NOTIFY_EVENTS.labels("bridge_dropped").inc()
+            except (ConnectionRefusedError, FileNotFoundError) as exc:
+                # the worker behind it is gone; a refused socket file is stale
+                self._peers.remove(peer)
+                if isinstance(exc, ConnectionRefusedError):
+                    with contextlib.suppress(OSError):
+                        os.unlink(peer)
+
+    def _read(self) -> None:
+        while self._sock is not None:
+            try:
+                datagram = self._sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            try:
+                topics, event_type, data = json.loads(datagram)
+            except ValueError:
+                continue
+            metrics.NOTIFY_EVENTS.labels("bridged").inc()
+            self.deliver(topics, Event(event_type, data))
+
+
+class Broker:
+    def __init__(self) -> None:
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._bridge: Optional[_Bridge] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self.queue_size = 32
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self, queue_size: int, heartbeat_seconds: float, bridge_dir: Optional[Path] = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.queue_size = queue_size
+        if bridge_dir is not None:
+            if hasattr(socket, "AF_UNIX"):
+                self._bridge = _Bridge(bridge_dir, self._dispatch)
+                self._bridge.open(self._loop)
+            else:
+                logger.warning("NOTIFY_BRIDGE_DIR needs Unix sockets; notifications stay within each worker")
+        if heartbeat_seconds > 0:
+            self._keepalive_task = asyncio.create_task(self._keepalive(heartbeat_seconds))
+
+    async def stop(self) -> None:
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._keepalive_task
+            self._keepalive_task = None
+        if self._bridge is not None and self._loop is not None:
+            self._bridge.close(self._loop)
+            self._bridge = None
+        for sub in list(self._subscribers):
+            sub.close()
+        self._loop = None
+
+    async def _keepalive(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            for sub in self._subscribers:
+                sub.wake()
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        sub = Subscriber(tuple(topics), self.queue_size)
+        for topic in sub.topics:
+            self._topics.setdefault(topic, set()).add(sub)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subscribers.discard(sub)
+        for topic in sub.topics:
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._topics[topic]
+
+    def publish(self, topics: List[str], event_type: str, payload: dict) -> None:
+        """Queue an event for the topics' subscribers here and on bridged workers.
+
+        Safe to call from any thread (sync routes run in the threadpool); a no-op until
+        the broker has started, e.g. in CLI scripts.
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        event = Event(event_type, json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(topics, event)
+            return
+        with contextlib.suppress(RuntimeError):  # loop already closed at shutdown
+            loop.call_soon_threadsafe(self._fan_out, topics, event)
+
+    def _fan_out(self, topics: List[str], event: Event) -> None:
+        metrics.NOTIFY_EVENTS.labels("published").inc()
+        self._dispatch(topics, event)
+        if self._bridge is not None:
+            self._bridge.forward(topics, event)
+
+    def _dispatch(self, topics: List[str], event: Event) -> None:
+        for topic in topics:
+            for sub in self._topics.get(topic, ()):
+                sub.push(event)
+
+
+broker = Broker()
@@ -0,0 +1,147 @@
+"""Prompt size estimation, layout compaction and token budgeting for `ai_client`.
+
+Token counts are estimates (no tokenizer dependency): CJK characters and other text are
+weighted per model family. The board sends each card with its titles, colours, values
+and several position labels; all of that is derivable from ``CardDefinition`` and the
+slot index, so the layout is re-rendered as one short entry per card, e.g.
+``1-2 07B 乐观`` (row-col, card number + F/B side, title), with colours and values in
+the card catalog that `ai_client` sends as part of the cached system prefix.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+
+from app.models.card_definition import CardDefinition
+
+_CJK = re.compile(r"[⺀-鿿가-힯豈-﫿＀-￯]")
+# (tokens per CJK character, other characters per token) by model-name prefix
+TOKEN_PROFILES: Dict[str, tuple[float, float]] = {
+    "qwen": (0.8, 3.6),
+    "gemini": (0.9, 4.0),
+    "gpt": (1.0, 4.0),
+    "deepseek": (0.7, 3.6),
+}
+_DEFAULT_PROFILE = (1.0, 3.6)
+SLOTS_PER_ROW = 4  # matches CardSetBoard
+
+_deck: Optional[Dict[str, CardDefinition]] = None
+
+
+def estimate_tokens(text: str, model: str | None = None) -> int:
+    if not text:
+        return 0
+    name = (model or "").lower()
+    per_cjk, chars_per_token = next(
+        (profile for prefix, profile in TOKEN_PROFILES.items() if name.startswith(prefix)), _DEFAULT_PROFILE
+    )
+    cjk = len(_CJK.findall(text))
+    return int(cjk * per_cjk + (len(text) - cjk) / chars_per_token + 0.999)
+
+
+def _load_deck() -> Dict[str, CardDefinition]:
+    from app.db.session import engine
+
+    with Session(engine) as session:
+        return {card.id: card for card in session.exec(select(CardDefinition)).all()}
+
+
+async def get_deck() -> Dict[str, CardDefinition]:
+    """CardDefinition rows by id, loaded once per worker (the deck is seeded at startup)."""
+    global _deck
+    if _deck is None:
+        _deck = await run_in_threadpool(_load_deck)
+    return _deck
+
+
+def short_card_id(card_id: str) -> str:
+    """``card_07`` -> ``07``; other ids are kept as they are."""
+    return card_id.rsplit("_", 1)[-1] if card_id.startswith("card_") else card_id
+
+
+def render_catalog(deck: Dict[str, CardDefinition]) -> str:
+    """One line per card, ordered by id so the text is byte-identical on every call."""
+    return "\n".join(
+        f"{short_card_id(card.id)}: F {card.front_title}/{card.front_color}/{card.front_value}"
+        f" | B {card.back_title}/{card.back_color}/{card.back_value}"
+        for card in sorted(deck.values(), key=lambda c: c.id)
+    )
+
+
+def compact_layout(layout: Any, deck: Dict[str, CardDefinition] | None) -> str:
+    if isinstance(layout, str):
+        try:
+            layout = json.loads(layout or "[]")
+        except json.JSONDecodeError:
+            return layout
+    entries: List[str] = []
+    for idx, item in enumerate(layout or []):
+        if not isinstance(item, dict) or not item.get("cardId"):
+            continue
+        slot = item.get("slotIndex", idx)
+        position = f"{slot // SLOTS_PER_ROW + 1}-{slot % SLOTS_PER_ROW + 1}" if isinstance(slot, int) else "?"
+        back = item.get("side") == "back"
+        card = (deck or {}).get(item["cardId"])
+        if card is None:
+            # unknown card: keep what the client sent for it
+            face = "/".join(str(item[k]) for k in ("title", "color", "value") if item.get(k) is not None)
+            entries.append(f"{position} {item['cardId']}{'B' if back else 'F'} {face}".rstrip())
+            continue
+        # colour and value come from the catalog
+        title = card.back_title if back else card.front_title
+        entries.append(f"{position} {short_card_id(card.id)}{'B' if back else 'F'} {title}")
+    return "; ".join(entries)
+
+
+def compact_json(raw: Any) -> str:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return raw
+    return json.dumps(raw, ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass
+class Section:
+    label: str
+    text: str
+    # truncation order under the budget: lower goes first; None is never cut
+    priority: Optional[int] = None
+    min_chars: int = 0
+
+    def render(self) -> str:
+        return f"{self.label}{self.text}" if self.text else ""
+
+
+@dataclass
+class BudgetResult:
+    sections: List[Section]
+    tokens: int
+    truncated: List[str] = field(default_factory=list)
+
+
+def fit(sections: Iterable[Section], budget: int, model: str | None = None) -> BudgetResult:
+    """Cut sections in priority order (to `min_chars`, or out) until the estimate fits; 0 = no limit."""
+    sections = list(sections)
+    total = sum(estimate_tokens(s.render(), model) for s in sections)
+    truncated: List[str] = []
+    if budget <= 0 or total <= budget:
+        return BudgetResult(sections, total)
+    for section in sorted((s for s in sections if s.priority is not None and s.text), key=lambda s: s.priority):
+        before = estimate_tokens(section.render(), model)
+        target = max(before - (total - budget), 0)
+        keep = len(section.text)
+        while keep > section.min_chars and estimate_tokens(section.label + section.text[:keep] + "…", model) > target:
+            keep = max(int(keep * 0.9), section.min_chars)
+        section.text = section.text[:keep] + "…" if keep else ""
+        truncated.append(section.label.strip(" :\n"))
+        total += estimate_tokens(section.render(), model) - before
+        if total <= budget:
+            break
+    return BudgetResult(sections, total, truncated)
@@ -0,0 +1,262 @@
+"""Normalise each reading's cards into ``readingcard`` rows when the reading is written.
+
+Two sources are merged per card: the submitted board layout (authoritative for which
+cards were drawn and which side is up) and the model's structured output, validated
+against ``CardInfo`` for names, positions and confidence. The model output is parsed
+tolerantly: ``cards_json`` as returned, else a JSON object or list found in the
+analysis text (fenced ```json blocks first). Entries that don't validate are skipped.
+
+Backfill readings written before the table existed, from their stored ``cards_json`` /
+analysis (the submitted layouts were never stored):
+
+    python -m app.services.reading_cards --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import load_only
+from sqlmodel import Session, select
+
+from app.models.card_definition import CardDefinition
+from app.models.card_reading import CardReading
+from app.models.reading_card import ReadingCard
+from app.schemas.reading import CardInfo
+from app.services.prompt_budget import SLOTS_PER_ROW, short_card_id
+
+logger = logging.getLogger(__name__)
+
+_FENCED = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+# alternative keys models use for CardInfo fields
+_ALIASES = {
+    "title": "name",
+    "card": "name",
+    "card_name": "name",
+    "id": "code",
+    "card_id": "code",
+    "cardId": "code",
+    "slot": "position",
+    "location": "position",
+    "score": "confidence",
+}
+
+
+def _json_candidates(text: str) -> Iterator[Any]:
+    for block in _FENCED.findall(text):
+        try:
+            yield json.loads(block)
+        except json.JSONDecodeError:
+            continue
+    for opener, closer in (("{", "}"), ("[", "]")):
+        start, end = text.find(opener), text.rfind(closer)
+        if 0 <= start < end:
+            try:
+                yield json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                continue
+
+
+def _card_list(raw: Any) -> Optional[List[Any]]:
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+    if isinstance(raw, dict):
+        raw = raw.get("cards")
+    return raw if isinstance(raw, list) and raw else None
+
+
+def extract_cards(cards_json: Any, ai_response: str | None = None) -> List[CardInfo]:
+    """Model-reported cards as validated CardInfo entries; [] when there are none."""
+    items = _card_list(cards_json)
+    if items is None and ai_response:
+        items = next((found for found in map(_card_list, _json_candidates(ai_response)) if found), None)
+    cards: List[CardInfo] = []
+    for item in items or []:
+        if isinstance(item, str):
+            item = {"name": item}
+        if not isinstance(item, dict):
+            continue
+        data = {_ALIASES.get(key, key): value for key, value in item.items()}
+        for key in ("name", "code", "position"):
+            if data.get(key) is not None and not isinstance(data[key], str):
+                data[key] = str(data[key])
+        if not data.get("name") and data.get("code"):
+            data["name"] = data["code"]
+        confidence = data.get("confidence")
+        if isinstance(confidence, str) and confidence.strip().endswith("%"):
+            data["confidence"] = confidence.strip()[:-1]
+        try:
+            card = CardInfo.model_validate(data)
+        except ValidationError:
+            continue
+        if card.confidence is not None and 1 < card.confidence <= 100:
+            card.confidence /= 100
+        cards.append(card)
+    return cards
+
+
+def _deck_index(deck: Dict[str, CardDefinition]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Lower-cased id / number / title / english -> (card id, side it names or None)."""
+    index: Dict[str, Tuple[str, Optional[str]]] = {}
+    for card in deck.values():
+        index[card.id.lower()] = index[short_card_id(card.id).lower()] = (card.id, None)
+        for side in ("front", "back"):
+            for attr in ("title", "english"):
+                value = getattr(card, f"{side}_{attr}")
+                if value:
+                    index.setdefault(value.strip().lower(), (card.id, side))
+    return index
+
+
+def _face(card: CardDefinition, side: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    if side == "back":
+        return card.back_color, card.back_value
+    if side == "front":
+        return card.front_color, card.front_value
+    return None, None
+
+
+def normalize(
+    reading_id: int,
+    layout: Any,
+    cards: List[CardInfo],
+    deck: Dict[str, CardDefinition],
+) -> List[ReadingCard]:
+    rows: Dict[str, ReadingCard] = {}
+    extra: List[ReadingCard] = []
+    for idx, item in enumerate(layout if isinstance(layout, list) else []):
+        if not isinstance(item, dict) or item.get("cardId") not in deck:
+            continue
+        card = deck[item["cardId"]]
+        side = "back" if item.get("side") == "back" else "front"
+        color, value = _face(card, side)
+        slot = item.get("slotIndex", idx)
+        rows[card.id] = ReadingCard(
+            reading_id=reading_id,
+            card_id=card.id,
+            name=card.back_title if side == "back" else card.front_title,
+            orientation=side,
+            color=color,
+            value=value,
+            position=f"{slot // SLOTS_PER_ROW + 1}-{slot % SLOTS_PER_ROW + 1}" if isinstance(slot, int) else None,
+            in_layout=True,
+        )
+
+    index = _deck_index(deck) if cards else {}
+    for info in cards:
+        card_id, side = next(
+            (index[key.strip().lower()] for key in (info.code, info.name) if key and key.strip().lower() in index),
+            (None, None),
+        )
+        row = rows.get(card_id) if card_id else None
+        if row is not None:
+            row.confidence = info.confidence
+            row.position = row.position or (info.position or "")[:32] or None
+            continue
+        color, value = _face(deck[card_id], side) if card_id else (None, None)
+        row = ReadingCard(
+            reading_id=reading_id,
+            card_id=card_id,
+            name=info.name[:64],
+            orientation=side,
+            color=color,
+            value=value,
+            position=(info.position or "")[:32] or None,
+            confidence=info.confidence,
+        )
+        if card_id:
+            rows[card_id] = row
+        else:
+            extra.append(row)
+    return list(rows.values()) + extra
+
+
+def card_stats_queries() -> Dict[str, Any]:
+    """The statements `card_stats` runs, by name (app.db.query_plans checks these exact ones)."""
+    in_layout = ReadingCard.in_layout == True  # noqa: E712
+    return {
+        "readings": select(func.count(func.distinct(ReadingCard.reading_id))).where(in_layout),
+        "draws": select(ReadingCard.card_id, ReadingCard.orientation, func.count())
+        .where(in_layout, ReadingCard.card_id.is_not(None))
+        .group_by(ReadingCard.card_id, ReadingCard.orientation),
+        "colors": select(ReadingCard.color, func.sum(ReadingCard.value))
+        .where(in_layout, ReadingCard.color.is_not(None))
+        .group_by(ReadingCard.color),
+    }
+
+
+def card_stats(session: Session) -> Dict[str, Any]:
+    """Draw counts per card and side, and the average per-reading score of each colour."""
+    queries = card_stats_queries()
+    readings = session.exec(queries["readings"]).one()
+    draws = session.exec(queries["draws"]).all()
+    per_card: Dict[str, Dict[str, Any]] = {}
+    for card_id, orientation, count in draws:
+        entry = per_card.setdefault(card_id, {"card_id": card_id, "draws": 0, "front": 0, "back": 0})
+        entry["draws"] += count
+        entry[orientation or "front"] += count
+    colors = session.exec(queries["colors"]).all()
+    return {
+        "readings": readings,
+        "cards": sorted(per_card.values(), key=lambda e: e["card_id"]),
+        "colors": [
+            {"color": color, "average_score": round((total or 0) / readings, 3) if readings else None}
+            for color, total in colors
+        ],
+    }
+
+
+def backfill(engine: Engine, batch_size: int = 500, start_after_id: int = 0) -> int:
+    """Add rows for readings that have none; returns the number of readings filled."""
+    with Session(engine) as session:
+        deck = {card.id: card for card in session.exec(select(CardDefinition)).all()}
+    last_id = start_after_id
+    filled = 0
+    while True:
+        with Session(engine) as session:
+            readings = session.exec(
+                select(CardReading)
+                .options(load_only(CardReading.id, CardReading.ai_response, CardReading.cards_json))
+                .where(CardReading.id > last_id, ~select(ReadingCard.id).where(ReadingCard.reading_id == CardReading.id).exists())
+                .order_by(CardReading.id)
+                .limit(batch_size)
+            ).all()
+            if not readings:
+                break
+            for reading in readings:
+                cards_json = reading.cards_json
+                # some writers stored the board itself as cards_json
+                layout_shaped = isinstance(cards_json, list) and all(isinstance(i, dict) and "cardId" in i for i in cards_json)
+                rows = normalize(
+                    reading.id,
+                    cards_json if layout_shaped else None,
+                    [] if layout_shaped else extract_cards(cards_json, reading.ai_response),
+                    deck,
+                )
+                session.add_all(rows)
+                filled += bool(rows)
+            last_id = readings[-1].id
+            session.commit()
+        logger.info("reading card backfill batch done last_id=%s filled=%s", last_id, filled)
+    return filled
+
+
+if __name__ == "__main__":
+    from app.db.session import engine
+
+    parser = argparse.ArgumentParser(description="Backfill readingcard rows from stored model output.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--start-after-id", type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    total = backfill(engine, batch_size=args.batch_size, start_after_id=args.start_after_id)
+    print(f"filled {total} readings")
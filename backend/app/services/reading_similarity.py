@@ -0,0 +1,248 @@
+"""Near-duplicate reading lookup so similar requests can reuse a past interpretation.
+
+Each reading is reduced to a per-card orientation vector over the ``CardDefinition``
+deck (+1 front up, -1 back up, 0 absent) and a 64-bit SimHash of its scene text. A
+worker keeps those features in NumPy arrays per card type and scores all candidates at
+once:
+
+    score = w * cosine(orientation) + (1 - w) * (1 - hamming(simhash) / 64)
+
+with ``w = READING_REUSE_LAYOUT_WEIGHT``. ``READING_REUSE_MODE`` selects what a hit does:
+``off`` (default), ``seed`` (prior interpretation goes into the prompt as a reference)
+or ``serve`` (answered from the prior interpretation without a model call). NumPy is
+optional; without it the mode behaves as ``off``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+
+from app.core.config import get_settings
+from app.models.card_definition import CardDefinition
+from app.models.reading_fingerprint import ReadingFingerprint
+
+try:  # optional: only needed when READING_REUSE_MODE is not "off"
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+logger = logging.getLogger(__name__)
+
+REUSE_MODES = ("off", "seed", "serve")
+_REFRESH_SECONDS = 5.0
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_MASK64 = (1 << 64) - 1
+
+
+def available() -> bool:
+    return np is not None
+
+
+def orientation_from_layout(layout: Iterable[dict]) -> Dict[str, int]:
+    """{card_id: 1 | -1} from the board payload (CardSetBoard.slotToLayoutItem)."""
+    orientation: Dict[str, int] = {}
+    for item in layout or []:
+        if not isinstance(item, dict) or not item.get("cardId"):
+            continue
+        orientation[str(item["cardId"])] = -1 if item.get("side") == "back" else 1
+    return orientation
+
+
+def scene_simhash(text: str) -> int:
+    """Unsigned 64-bit SimHash over character bigrams (works for CJK without tokenising)."""
+    normalized = _NON_WORD.sub("", (text or "").lower())
+    if not normalized:
+        return 0
+    grams = [normalized[i:i + 2] for i in range(len(normalized) - 1)] or [normalized]
+    weights = [0] * 64
+    for gram in grams:
+        value = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & _MASK64
+
+
+@dataclass
+class Match:
+    reading_id: int
+    score: float
+    layout_similarity: float
+    scene_similarity: float
+
+
+class _Bucket:
+    """Growable column arrays for one card type."""
+
+    def __init__(self, width: int) -> None:
+        self.size = 0
+        self.ids = np.zeros(64, dtype=np.int64)
+        self.users = np.zeros(64, dtype=np.int64)
+        self.hashes = np.zeros(64, dtype=np.uint64)
+        self.norms = np.zeros(64, dtype=np.float32)
+        self.layout = np.zeros((64, width), dtype=np.int8)
+
+    def append(self, reading_id: int, user_id: int, vector, scene_hash: int) -> None:
+        if self.size == len(self.ids):
+            grow = len(self.ids)
+            self.ids = np.concatenate([self.ids, np.zeros(grow, dtype=np.int64)])
+            self.users = np.concatenate([self.users, np.zeros(grow, dtype=np.int64)])
+            self.hashes = np.concatenate([self.hashes, np.zeros(grow, dtype=np.uint64)])
+            self.norms = np.concatenate([self.norms, np.zeros(grow, dtype=np.float32)])
+            self.layout = np.concatenate([self.layout, np.zeros((grow, self.layout.shape[1]), dtype=np.int8)])
+        i = self.size
+        self.ids[i], self.users[i], self.hashes[i] = reading_id, user_id, scene_hash
+        self.layout[i] = vector
+        self.norms[i] = np.sqrt(np.count_nonzero(vector))
+        self.size += 1
+
+
+class SimilarityIndex:
+    def __init__(self) -> None:
+        self.columns: Dict[str, int] = {}
+        self.buckets: Dict[str, _Bucket] = {}
+        # highest id loaded from the table; ids added locally are only tracked for dedupe
+        self.last_reading_id = 0
+        self._added: set[int] = set()
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _vector(self, orientation: Dict[str, int]):
+        vector = np.zeros(len(self.columns), dtype=np.int8)
+        for card_id, side in orientation.items():
+            column = self.columns.get(card_id)
+            if column is not None:
+                vector[column] = side
+        return vector
+
+    def add(self, reading_id: int, user_id: int, card_type: str, orientation: Dict[str, int], scene_hash: int) -> None:
+        if not self.columns or reading_id in self._added:
+            return
+        vector = self._vector(orientation)
+        if not vector.any():
+            return
+        bucket = self.buckets.setdefault(card_type, _Bucket(len(self.columns)))
+        bucket.append(reading_id, user_id, vector, to_unsigned(scene_hash))
+        self._added.add(reading_id)
+
+    def _fetch(self, after_id: int, batch: int = 5000):
+        """Read the deck (first time) and fingerprints written since `after_id`, e.g. by other workers."""
+        from app.db.session import engine
+
+        with Session(engine) as session:
+            deck = None if self.columns else sorted(session.exec(select(CardDefinition.id)).all())
+            rows = []
+            while True:
+                chunk = session.exec(
+                    select(ReadingFingerprint)
+                    .where(ReadingFingerprint.reading_id > after_id)
+                    .order_by(ReadingFingerprint.reading_id)
+                    .limit(batch)
+                ).all()
+                rows.extend(chunk)
+                if len(chunk) < batch:
+                    return deck, rows
+                after_id = chunk[-1].reading_id
+
+    async def refresh(self) -> None:
+        if time.monotonic() - self._refreshed_at < _REFRESH_SECONDS:
+            return
+        async with self._lock:
+            if time.monotonic() - self._refreshed_at < _REFRESH_SECONDS:
+                return
+            deck, rows = await run_in_threadpool(self._fetch, self.last_reading_id)
+            # arrays are only mutated on the event loop
+            if deck is not None:
+                self.columns = {card_id: i for i, card_id in enumerate(deck)}
+            for row in rows:
+                self.add(row.reading_id, row.user_id, row.card_type, row.orientation or {}, row.scene_hash)
+                self.last_reading_id = max(self.last_reading_id, row.reading_id)
+            self._refreshed_at = time.monotonic()
+
+    def search(
+        self,
+        card_type: str,
+        orientation: Dict[str, int],
+        scene_hash: int,
+        layout_weight: float,
+        user_id: Optional[int] = None,
+    ) -> Optional[Match]:
+        bucket = self.buckets.get(card_type)
+        if bucket is None or not bucket.size:
+            return None
+        query = self._vector(orientation)
+        query_norm = np.sqrt(np.count_nonzero(query))
+        if not query_norm:
+            return None
+        n = bucket.size
+        candidates = np.ones(n, dtype=bool) if user_id is None else bucket.users[:n] == user_id
+        if not candidates.any():
+            return None
+
+        layout_sim = (bucket.layout[:n].astype(np.int32) @ query.astype(np.int32)) / (bucket.norms[:n] * query_norm)
+        differing = np.bitwise_xor(bucket.hashes[:n], np.uint64(to_unsigned(scene_hash)))
+        distance = np.unpackbits(differing.view(np.uint8).reshape(n, 8), axis=1).sum(axis=1)
+        scene_sim = 1.0 - distance / 64.0
+        score = np.where(candidates, layout_weight * layout_sim + (1 - layout_weight) * scene_sim, -1.0)
+        best = int(np.argmax(score))
+        if score[best] < 0:
+            return None
+        return Match(int(bucket.ids[best]), float(score[best]), float(layout_sim[best]), float(scene_sim[best]))
+
+
+_index = SimilarityIndex()
+
+
+async def find_similar(card_type: str, orientation: Dict[str, int], scene: str, user_id: int) -> Optional[Match]:
+    """Best prior reading at or above READING_REUSE_THRESHOLD, or None."""
+    settings = get_settings()
+    if settings.reading_reuse_mode == "off" or not available() or not orientation:
+        return None
+    await _index.refresh()
+    match = _index.search(
+        card_type,
+        orientation,
+        scene_simhash(scene),
+        settings.reading_reuse_layout_weight,
+        user_id=None if settings.reading_reuse_scope == "global" else user_id,
+    )
+    if match is None or match.score < settings.reading_reuse_threshold:
+        return None
+    return match
+
+
+def build_fingerprint(reading_id: int, user_id: int, card_type: str, orientation: Dict[str, int], scene: str) -> ReadingFingerprint:
+    return ReadingFingerprint(
+        reading_id=reading_id,
+        user_id=user_id,
+        card_type=card_type,
+        orientation=orientation,
+        scene_hash=to_signed(scene_simhash(scene)),
+    )
+
+
+def remember(fingerprint: ReadingFingerprint) -> None:
+    """Make a just-committed reading searchable in this worker without waiting for a refresh."""
+    if available() and _index.columns:
+        _index.add(
+            fingerprint.reading_id,
+            fingerprint.user_id,
+            fingerprint.card_type,
+            fingerprint.orientation or {},
+            fingerprint.scene_hash,
+        )
@@ -0,0 +1,277 @@
+"""Where uploaded files live: the local upload_dir or an S3-compatible bucket.
+
+STORAGE_BACKEND=local (the default) writes under UPLOAD_DIR, which is served at /uploads
+(``app.core.static``). STORAGE_BACKEND=s3 writes to S3_BUCKET at S3_ENDPOINT_URL. That can
+be AWS, MinIO or anything else that speaks the S3 API (``python -m bench.s3_standin`` is a
+local one). Requests are SigV4-signed and sent over httpx, so no SDK is needed. Either way
+the public URL comes from the object key and STORAGE_PUBLIC_BASE_URL, never from the
+process's working directory.
+
+Keys are ``YYYY/MM/DD/<prefix>_<sha256[:16]><suffix>``, so a key names its bytes and the
+file behind a URL never changes.
+
+Direct uploads: ``presign_upload`` returns a request the browser sends itself. For S3 it
+is a presigned PUT to the bucket, so the bytes never pass through the API workers. The
+signature covers the content type, the length and an ``x-amz-checksum-sha256``, so the
+bucket rejects any body other than the one the key was derived from. The local backend
+hands out a PUT to /api/uploads/direct/<key> carrying a short-lived token instead, and
+the body is streamed to disk and checked the same way.
+"""
+from __future__ import annotations
+
+import abc
+import base64
+import hashlib
+import hmac
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterable, Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import anyio
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.schemas.upload import PresignedUpload, UploadPresignRequest
+from app.utils.security import create_token
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._/-]*$")
+_SUFFIX_RE = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def upload_key(prefix: str, digest: str, filename: Optional[str], default_suffix: str = "") -> str:
+    suffix = Path(filename or "").suffix
+    if not _SUFFIX_RE.match(suffix):
+        suffix = default_suffix
+    return f"{datetime.utcnow():%Y/%m/%d}/{prefix}_{digest[:16]}{suffix.lower()}"
+
+
+def valid_key(key: str) -> bool:
+    return bool(_KEY_RE.match(key)) and ".." not in key and "//" not in key and not key.startswith("_d/")
+
+
+class Storage(abc.ABC):
+    def __init__(self, public_base_url: str) -> None:
+        self.public_base_url = public_base_url.rstrip("/")
+
+    def url(self, key: str) -> str:
+        return f"{self.public_base_url}/{quote(key)}"
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def presign_put(self, key: str, content_type: str, size: int, sha256: str, expires_in: int) -> Tuple[str, Dict[str, str]]:
+        """(upload URL, headers the client must send) for a PUT of exactly these bytes."""
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: Path, public_base_url: str = "/uploads") -> None:
+        super().__init__(public_base_url)
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        if not valid_key(key):
+            raise ValueError(f"invalid storage key: {key!r}")
+        return self.root / key
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self.path(key).exists)
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        await run_in_threadpool(self._write, self.path(key), data)
+
+    @staticmethod
+    def _write(dest: Path, data: bytes) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    async def write_stream(self, key: str, chunks: AsyncIterable[bytes], size: int, sha256: str) -> None:
+        """Stream a direct upload to disk; ValueError unless it is exactly `size` bytes hashing to `sha256`."""
+        dest = self.path(key)
+        await run_in_threadpool(dest.parent.mkdir, parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.tmp")
+        digest, received = hashlib.sha256(), 0
+        try:
+            async with await anyio.open_file(tmp, "wb") as f:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > size:
+                        raise ValueError("body is longer than the signed size")
+                    digest.update(chunk)
+                    await f.write(chunk)
+            if received != size or digest.hexdigest() != sha256:
+                raise ValueError("body does not match the signed size and checksum")
+            await run_in_threadpool(os.replace, tmp, dest)
+        finally:
+            await run_in_threadpool(tmp.unlink, missing_ok=True)
+
+    def presign_put(self, key: str, content_type: str, size: int, sha256: str, expires_in: int) -> Tuple[str, Dict[str, str]]:
+        claims = {"type": "upload", "key": key, "content_type": content_type, "size": size, "sha256": sha256}
+        token = create_token(claims, timedelta(seconds=expires_in))
+        return f"{get_settings().api_prefix}/uploads/direct/{quote(key)}?token={token}", {"Content-Type": content_type}
+
+
+# -- AWS Signature Version 4 ---------------------------------------------------------
+
+
+def uri_encode(value: str, safe: str = "") -> str:
+    return quote(value, safe="-_.~" + safe)
+
+
+def canonical_query(query: Dict[str, str]) -> str:
+    return "&".join(f"{uri_encode(k)}={uri_encode(v)}" for k, v in sorted(query.items()))
+
+
+def signed_header_names(headers: Dict[str, str]) -> str:
+    return ";".join(sorted(k.lower() for k in headers))
+
+
+def canonical_request(method: str, path: str, query: Dict[str, str], headers: Dict[str, str], payload_hash: str) -> str:
+    lines = "".join(f"{k.lower()}:{' '.join(str(v).split())}\n" for k, v in sorted(headers.items(), key=lambda h: h[0].lower()))
+    return "\n".join([method, path, canonical_query(query), lines, signed_header_names(headers), payload_hash])
+
+
+def sigv4_signature(secret_key: str, region: str, amz_date: str, canonical: str, service: str = "s3") -> str:
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+    key = f"AWS4{secret_key}".encode()
+    for part in (amz_date[:8], region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+class S3Storage(Storage):
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        path_style: bool = True,
+        public_base_url: Optional[str] = None,
+    ) -> None:
+        parts = urlsplit(endpoint_url)
+        self.host = parts.netloc if path_style else f"{bucket}.{parts.netloc}"
+        self.origin = f"{parts.scheme}://{self.host}"
+        self.prefix = f"/{bucket}" if path_style else ""
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        super().__init__(public_base_url or f"{self.origin}{self.prefix}")
+
+    def object_path(self, key: str) -> str:
+        if not valid_key(key):
+            raise ValueError(f"invalid storage key: {key!r}")
+        return f"{self.prefix}/{uri_encode(key, '/')}"
+
+    def _scope(self, amz_date: str) -> str:
+        return f"{self.access_key_id}/{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+    def _signed_headers(self, method: str, key: str, headers: Dict[str, str], payload_hash: str) -> Dict[str, str]:
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        headers = {**headers, "host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash}
+        canonical = canonical_request(method, self.object_path(key), {}, headers, payload_hash)
+        signature = sigv4_signature(self.secret_access_key, self.region, amz_date, canonical)
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self._scope(amz_date)}, "
+            f"SignedHeaders={signed_header_names(headers)}, Signature={signature}"
+        )
+        del headers["host"]  # httpx sets the same value
+        return headers
+
+    async def _request(self, method: str, key: str, data: bytes = b"", headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        payload_hash = hashlib.sha256(data).hexdigest()
+        signed = self._signed_headers(method, key, headers or {}, payload_hash)
+        async with httpx.AsyncClient(timeout=30) as client:
+            return await client.request(method, f"{self.origin}{self.object_path(key)}", content=data or None, headers=signed)
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        response = await self._request("PUT", key, data, {"content-type": content_type})
+        response.raise_for_status()
+
+    def presign_put(self, key: str, content_type: str, size: int, sha256: str, expires_in: int) -> Tuple[str, Dict[str, str]]:
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        client_headers = {
+            "content-type": content_type,
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        # browsers set Host and Content-Length themselves, but both are signed
+        headers = {**client_headers, "host": self.host, "content-length": str(size)}
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": self._scope(amz_date),
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": signed_header_names(headers),
+        }
+        path = self.object_path(key)
+        canonical = canonical_request("PUT", path, query, headers, UNSIGNED_PAYLOAD)
+        query["X-Amz-Signature"] = sigv4_signature(self.secret_access_key, self.region, amz_date, canonical)
+        return f"{self.origin}{path}?{canonical_query(query)}", client_headers
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> Storage:
+    settings = get_settings()
+    if settings.storage_backend == "local":
+        return LocalStorage(settings.upload_dir, settings.storage_public_base_url or "/uploads")
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            settings.s3_endpoint_url,
+            settings.s3_bucket,
+            settings.s3_region,
+            settings.s3_access_key_id,
+            settings.s3_secret_access_key,
+            settings.s3_path_style,
+            settings.storage_public_base_url,
+        )
+    raise ValueError(f"unknown STORAGE_BACKEND: {settings.storage_backend!r}")
+
+
+async def save_upload(prefix: str, filename: Optional[str], data: bytes, content_type: str, default_suffix: str = "") -> str:
+    """Store `data` under its content-hash key (once) and return its public URL."""
+    digest = (await run_in_threadpool(hashlib.sha256, data)).hexdigest()
+    key = upload_key(prefix, digest, filename, default_suffix)
+    storage = get_storage()
+    if not await storage.exists(key):
+        await storage.put(key, data, content_type)
+    return storage.url(key)
+
+
+def presign_upload(prefix: str, request: UploadPresignRequest, default_suffix: str = "") -> PresignedUpload:
+    ttl = get_settings().upload_presign_ttl_seconds
+    key = upload_key(prefix, request.sha256, request.filename, default_suffix)
+    storage = get_storage()
+    upload_url, headers = storage.presign_put(key, request.content_type, request.size, request.sha256, ttl)
+    return PresignedUpload(
+        key=key,
+        url=storage.url(key),
+        upload_url=upload_url,
+        headers=headers,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+    )
@@ -0,0 +1,134 @@
+"""Local OpenAI-compatible mock provider for benchmarks.
+
+    python -m bench.mock_ai --port 9100 --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+
+Serves ``POST /v1/chat/completions`` and ``POST /chat/completions`` with configurable
+latency, jitter, error injection (HTTP 500/429) and SSE streaming (``"stream": true``).
+A system message seen before is reported as cached in ``usage.prompt_tokens_details``,
+like providers with prefix caching.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+MOCK_ANALYSIS = (
+    "## 性格色彩解读\n\n"
+    "你的牌面以红色与蓝色为主导，显示出热情与深思并存的特质。"
+    "在当前情境中，你既渴望被认可，又习惯于反复推敲细节。\n\n"
+    "### 引导问题\n\n1. 如果不担心别人的评价，你会怎么做？\n2. 什么样的结果对你来说算“足够好”？\n"
+)
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 800
+    jitter_ms: float = 200
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    stream_chunks: int = 20
+    seed: int | None = None
+
+
+def create_mock_app(cfg: MockConfig) -> Starlette:
+    rng = random.Random(cfg.seed)
+
+    def delay_seconds() -> float:
+        return max(0.0, rng.gauss(cfg.latency_ms, cfg.jitter_ms)) / 1000 if cfg.jitter_ms else cfg.latency_ms / 1000
+
+    seen_prefixes: set[int] = set()
+
+    def completion(model: str, prompt_chars: int, cached_chars: int = 0) -> dict:
+        return {
+            "id": f"mock-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": MOCK_ANALYSIS}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 2,
+                "completion_tokens": len(MOCK_ANALYSIS) // 2,
+                "total_tokens": prompt_chars // 2 + len(MOCK_ANALYSIS) // 2,
+                "prompt_tokens_details": {"cached_tokens": cached_chars // 2},
+            },
+        }
+
+    async def stream(model: str, total_delay: float) -> AsyncIterator[bytes]:
+        pieces = max(1, cfg.stream_chunks)
+        step = max(1, len(MOCK_ANALYSIS) // pieces)
+        for start in range(0, len(MOCK_ANALYSIS), step):
+            await asyncio.sleep(total_delay / pieces)
+            chunk = {
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": MOCK_ANALYSIS[start:start + step]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        messages = body.get("messages") or []
+        prompt_chars = len(json.dumps(messages, ensure_ascii=False))
+        cached_chars = 0
+        if messages and messages[0].get("role") == "system":
+            prefix = json.dumps(messages[0].get("content"), ensure_ascii=False)
+            if hash(prefix) in seen_prefixes:
+                cached_chars = len(prefix)
+            seen_prefixes.add(hash(prefix))
+        total_delay = delay_seconds()
+        roll = rng.random()
+        if roll < cfg.error_rate:
+            await asyncio.sleep(total_delay / 2)
+            return JSONResponse({"error": {"message": "mock injected failure", "type": "server_error"}}, status_code=500)
+        if roll < cfg.error_rate + cfg.rate_limit_rate:
+            return JSONResponse({"error": {"message": "mock rate limited", "type": "rate_limit"}}, status_code=429)
+        if body.get("stream"):
+            return StreamingResponse(stream(model, total_delay), media_type="text/event-stream")
+        await asyncio.sleep(total_delay)
+        return JSONResponse(completion(model, prompt_chars, cached_chars))
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/chat/completions", chat_completions, methods=["POST"]),
+        ]
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the mock OpenAI-compatible provider.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    cfg = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stream_chunks=args.stream_chunks,
+        seed=args.seed,
+    )
+    uvicorn.run(create_mock_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
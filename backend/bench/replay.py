@@ -0,0 +1,259 @@
+"""Replay a recorded AI traffic trace (``AI_RECORD_PATH``) against the app at N x speed.
+
+    AI_RECORD_PATH=data/ai-trace.jsonl uvicorn main:app        # record sanitized traffic
+    python -m bench.replay run --trace data/ai-trace.jsonl --speeds 1,2,4,8
+    python -m bench.replay serve --trace data/ai-trace.jsonl --port 9100
+
+``serve`` is an OpenAI-compatible provider that answers each call with the recorded
+status, response size, time-to-first-byte and chunk timing. ``run`` boots the app
+against it (see ``bench.stack``) and replays the interpretations at the recorded
+inter-arrival times divided by each speed. Every request carries
+``X-Request-ID: replay-<n>``; the app forwards it upstream, so the provider replays
+entry ``n`` for it. Reported overhead is end-to-end latency minus the recorded
+upstream latency, i.e. time spent in our stack.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from bench.run import percentile
+from bench.stack import launch_stack
+from app.db.synthetic import SYNTHETIC_PASSWORD
+
+REPLAY_ID_PREFIX = "replay-"
+CARD_TYPE = "性格色彩"
+
+
+def load_trace(path: Path) -> List[dict]:
+    entries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            entries.append(json.loads(line))
+    if not entries:
+        raise SystemExit(f"trace {path} is empty")
+    # both the driver and the provider index entries by arrival order
+    return sorted(entries, key=lambda e: e["ts"])
+
+
+def _filler_body(entry: dict) -> bytes:
+    """A response of the recorded size: a completion on success, an error document otherwise."""
+    size = int(entry.get("response_bytes") or 0)
+    status = entry.get("status") or 500
+    if status >= 400:
+        doc = {"error": {"message": f"replayed {status}", "type": "replay"}}
+    else:
+        doc = {
+            "id": "replay",
+            "object": "chat.completion",
+            "model": entry.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": ""}, "finish_reason": "stop"}],
+        }
+    shell = len(json.dumps(doc).encode("utf-8"))
+    if status < 400:
+        doc["choices"][0]["message"]["content"] = "x" * max(0, size - shell)
+    return json.dumps(doc).encode("utf-8")
+
+
+def create_replay_app(entries: List[dict]) -> Starlette:
+    fallback = itertools.cycle(range(len(entries)))
+
+    def pick(request: Request) -> dict:
+        request_id = request.headers.get("x-request-id", "")
+        if request_id.startswith(REPLAY_ID_PREFIX):
+            try:
+                return entries[int(request_id[len(REPLAY_ID_PREFIX):]) % len(entries)]
+            except ValueError:
+                pass
+        return entries[next(fallback)]
+
+    async def chat_completions(request: Request):
+        await request.body()
+        started = time.perf_counter()
+        entry = pick(request)
+        if entry.get("status") is None:
+            # the recorded call never got a response (connect error / timeout)
+            await asyncio.sleep((entry.get("latency_ms") or 0) / 1000)
+            return JSONResponse({"error": {"message": "replayed transport failure"}}, status_code=504)
+
+        body = _filler_body(entry)
+        offsets = [o / 1000 for o in entry.get("chunk_offsets_ms") or []] or [(entry.get("latency_ms") or 0) / 1000]
+        ttfb = (entry.get("ttfb_ms") or 0) / 1000
+        await asyncio.sleep(max(0.0, ttfb - (time.perf_counter() - started)))
+
+        async def chunks() -> AsyncIterator[bytes]:
+            step = -(-len(body) // len(offsets))
+            for i, offset in enumerate(offsets):
+                await asyncio.sleep(max(0.0, offset - (time.perf_counter() - started)))
+                piece = body[i * step:(i + 1) * step]
+                if piece:
+                    yield piece
+
+        media_type = (entry.get("content_type") or "application/json").split(";")[0]
+        return StreamingResponse(chunks(), status_code=entry["status"], media_type=media_type)
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/chat/completions", chat_completions, methods=["POST"]),
+        ]
+    )
+
+
+def _scene_for(entry: dict, template_chars: int) -> str:
+    # pad the scene so the rebuilt prompt is roughly the recorded size
+    return "场" * max(1, int(entry.get("prompt_chars") or 0) - template_chars)
+
+
+def _template_chars() -> int:
+    from app.services.ai_client import build_prompt
+
+    return len(build_prompt(card_type=CARD_TYPE, scene_desc="", cardset_layout="[]", cardset_scores="{}"))
+
+
+async def replay_once(base_url: str, entries: List[dict], speed: float, users: int) -> Dict[str, object]:
+    template_chars = _template_chars()
+    arrivals = [(e["ts"] - entries[0]["ts"]) / speed for e in entries]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    async with httpx.AsyncClient(base_url=base_url, timeout=180, limits=limits) as client:
+        tokens = []
+        for user in range(1, min(users, 50) + 1):
+            resp = await client.post("/api/auth/login", json={"email": f"user{user}@example.com", "password": SYNTHETIC_PASSWORD})
+            resp.raise_for_status()
+            tokens.append(resp.json()["access_token"])
+
+        latencies: List[float] = []
+        overheads: List[float] = []
+        errors: List[str] = []
+        in_flight = 0
+        peak_in_flight = 0
+        origin = time.perf_counter()
+
+        async def fire(index: int, entry: dict, at: float) -> None:
+            nonlocal in_flight, peak_in_flight
+            await asyncio.sleep(max(0.0, at - (time.perf_counter() - origin)))
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            started = time.perf_counter()
+            try:
+                resp = await client.post(
+                    "/api/ai/card/interpret-with-image",
+                    data={"card_type": CARD_TYPE, "scene_desc": _scene_for(entry, template_chars)},
+                    headers={
+                        "Authorization": f"Bearer {tokens[index % len(tokens)]}",
+                        "X-Request-ID": f"{REPLAY_ID_PREFIX}{index}",
+                    },
+                )
+                expected_ok = (entry.get("status") or 500) < 400
+                if (resp.status_code < 400) != expected_ok:
+                    errors.append(f"#{index} {resp.status_code} {resp.text[:120]}")
+            except httpx.HTTPError as exc:
+                errors.append(f"#{index} {exc!r}")
+            finally:
+                in_flight -= 1
+            elapsed = (time.perf_counter() - started) * 1000
+            latencies.append(elapsed)
+            overheads.append(max(0.0, elapsed - (entry.get("latency_ms") or 0)))
+
+        await asyncio.gather(*(fire(i, e, at) for i, (e, at) in enumerate(zip(entries, arrivals))))
+        seconds = time.perf_counter() - origin
+
+    latencies.sort()
+    overheads.sort()
+    return {
+        "speed": speed,
+        "requests": len(latencies),
+        "unexpected": len(errors),
+        "seconds": round(seconds, 3),
+        "rps": round(len(latencies) / seconds, 2) if seconds else 0.0,
+        "peak_in_flight": peak_in_flight,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "overhead_p50_ms": round(percentile(overheads, 50), 1),
+        "overhead_p95_ms": round(percentile(overheads, 95), 1),
+        "overhead_p99_ms": round(percentile(overheads, 99), 1),
+        "error_samples": errors[:3],
+    }
+
+
+def _trace_summary(entries: List[dict]) -> str:
+    recorded = sorted(e.get("latency_ms") or 0 for e in entries)
+    span = entries[-1]["ts"] - entries[0]["ts"]
+    return (
+        f"trace: {len(entries)} calls over {span:.1f}s, upstream p50={percentile(recorded, 50)}ms "
+        f"p95={percentile(recorded, 95)}ms p99={percentile(recorded, 99)}ms"
+    )
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    entries = load_trace(args.trace)
+    uvicorn.run(create_replay_app(entries), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    entries = load_trace(args.trace)
+    if args.limit:
+        entries = entries[: args.limit]
+    speeds = [float(s) for s in args.speeds.split(",") if s]
+    print(_trace_summary(entries), flush=True)
+
+    results = []
+    provider_argv = ["bench.replay", "serve", "--trace", str(args.trace.resolve())]
+    with launch_stack(provider_argv, workers=args.workers, snapshot=args.snapshot) as stack:
+        for speed in speeds:
+            res = asyncio.run(replay_once(stack.base_url, entries, speed, stack.users))
+            results.append(res)
+            print(
+                f"speed={speed:<5} n={res['requests']:<5} unexpected={res['unexpected']:<4} rps={res['rps']:<8} "
+                f"peak={res['peak_in_flight']:<5} p50={res['p50_ms']:<8} p95={res['p95_ms']:<8} p99={res['p99_ms']:<8} "
+                f"overhead p95={res['overhead_p95_ms']}",
+                flush=True,
+            )
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        report = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "workers": args.workers, "results": results}
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded AI traffic against the app.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the replay provider")
+    serve.add_argument("--trace", type=Path, required=True)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=9100)
+    serve.set_defaults(func=cmd_serve)
+
+    run = sub.add_parser("run", help="boot the app against the replay provider and replay the trace")
+    run.add_argument("--trace", type=Path, required=True)
+    run.add_argument("--speeds", default="1,2,4,8", help="comma-separated replay speed multipliers")
+    run.add_argument("--limit", type=int, help="replay only the first N calls")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    run.add_argument("--snapshot", type=Path, help="reuse a synthetic snapshot instead of generating one")
+    run.add_argument("--output", type=Path, help="write results JSON here")
+    run.set_defaults(func=cmd_run)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Route benchmark suite: real uvicorn workers, seeded SQLite, local mock AI provider.
+
+    python -m bench.run                                   # run and print a report
+    python -m bench.run --save-baseline bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json    # exit 1 on regression
+
+``bench/baseline.json`` is committed, recorded with the defaults above (one worker). The
+numbers depend on the machine, so on different hardware record a local baseline with
+``--save-baseline`` from the base commit first and compare against that.
+
+Boots ``main:app`` (``create_app``) in a uvicorn subprocess against a synthetic dataset
+(``app.db.synthetic``) and ``bench.mock_ai``, then drives each scenario at fixed
+concurrency levels and reports throughput and p50/p95/p99 latency.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from bench.stack import launch_stack
+from app.db.synthetic import SYNTHETIC_PASSWORD
+
+SCENARIOS = ("login", "cards", "interpret", "feed", "article_detail", "like", "comment")
+
+
+@dataclass
+class LevelResult:
+    requests: int
+    errors: int
+    seconds: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    error_samples: List[str] = field(default_factory=list)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class BenchContext:
+    def __init__(self, client: httpx.AsyncClient, tokens: List[str], article_ids: List[int]) -> None:
+        self.client = client
+        self.tokens = tokens
+        self.article_ids = article_ids
+        self.rng = random.Random(7)
+
+    def auth(self, i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[i % len(self.tokens)]}"}
+
+    def article(self) -> int:
+        return self.rng.choice(self.article_ids)
+
+
+def _scenario(name: str) -> Callable[[BenchContext, int], Awaitable[httpx.Response]]:
+    async def login(ctx: BenchContext, i: int) -> httpx.Response:
+        user = i % len(ctx.tokens) + 1
+        return await ctx.client.post("/api/auth/login", json={"email": f"user{user}@example.com", "password": SYNTHETIC_PASSWORD})
+
+    async def cards(ctx: BenchContext, i: int) -> httpx.Response:
+        return await ctx.client.get("/api/ai/cards", headers=ctx.auth(i))
+
+    async def interpret(ctx: BenchContext, i: int) -> httpx.Response:
+        data = {
+            "card_type": "性格色彩",
+            "scene_desc": "和团队在项目节奏上有分歧，想看看自己的真实想法。",
+            "cardset_layout": json.dumps([{"title": "乐观", "value": 1, "color": "red", "positionLabel": "第一排 第1列"}] * 12, ensure_ascii=False),
+            "cardset_scores": json.dumps({"red": 12, "blue": 8, "yellow": 5, "green": 3}),
+            "cardset_score_text": "红: 12 | 蓝: 8 | 黄: 5 | 绿: 3",
+        }
+        return await ctx.client.post("/api/ai/card/interpret-with-image", data=data, headers=ctx.auth(i))
+
+    async def feed(ctx: BenchContext, i: int) -> httpx.Response:
+        return await ctx.client.get("/api/articles/", params={"scope": "community"})
+
+    async def article_detail(ctx: BenchContext, i: int) -> httpx.Response:
+        return await ctx.client.get(f"/api/articles/{ctx.article()}")
+
+    async def like(ctx: BenchContext, i: int) -> httpx.Response:
+        return await ctx.client.post(f"/api/articles/{ctx.article()}/like", headers=ctx.auth(i))
+
+    async def comment(ctx: BenchContext, i: int) -> httpx.Response:
+        return await ctx.client.post(f"/api/articles/{ctx.article()}/comments", json={"content": "bench comment"}, headers=ctx.auth(i))
+
+    return locals()[name]
+
+
+async def run_level(ctx: BenchContext, name: str, concurrency: int, total: int) -> LevelResult:
+    call = _scenario(name)
+    latencies: List[float] = []
+    errors: List[str] = []
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                resp = await call(ctx, i)
+                ok = resp.status_code < 400
+                detail = f"{resp.status_code} {resp.text[:120]}"
+            except httpx.HTTPError as exc:
+                ok, detail = False, repr(exc)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors.append(detail)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return LevelResult(
+        requests=len(latencies),
+        errors=len(errors),
+        seconds=round(seconds, 3),
+        rps=round(len(latencies) / seconds, 2) if seconds else 0.0,
+        p50_ms=round(percentile(ordered, 50), 1),
+        p95_ms=round(percentile(ordered, 95), 1),
+        p99_ms=round(percentile(ordered, 99), 1),
+        error_samples=errors[:3],
+    )
+
+
+async def drive(base_url: str, scenarios: List[str], levels: List[int], total: int, users: int, articles: int) -> Dict[str, Dict[str, dict]]:
+    limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        tokens = []
+        for user in range(1, min(users, 50) + 1):
+            resp = await client.post("/api/auth/login", json={"email": f"user{user}@example.com", "password": SYNTHETIC_PASSWORD})
+            resp.raise_for_status()
+            tokens.append(resp.json()["access_token"])
+        ctx = BenchContext(client, tokens, list(range(1, articles + 1)))
+        results: Dict[str, Dict[str, dict]] = {}
+        for name in scenarios:
+            results[name] = {}
+            for level in levels:
+                res = await run_level(ctx, name, level, total)
+                results[name][str(level)] = asdict(res)
+                print(
+                    f"{name:<15} c={level:<4} n={res.requests:<5} err={res.errors:<4} rps={res.rps:<9} "
+                    f"p50={res.p50_ms:<8} p95={res.p95_ms:<8} p99={res.p99_ms}",
+                    flush=True,
+                )
+        return results
+
+
+def compare(current: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolerance: float) -> List[str]:
+    """Regressions: p95 slower or throughput lower than baseline by more than `tolerance`."""
+    problems = []
+    for name, levels in current.items():
+        for level, res in levels.items():
+            base = (baseline.get(name) or {}).get(level)
+            if not base:
+                continue
+            if base["p95_ms"] and res["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                problems.append(f"{name} c={level}: p95 {res['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+            if base["rps"] and res["rps"] < base["rps"] * (1 - tolerance):
+                problems.append(f"{name} c={level}: rps {res['rps']} vs baseline {base['rps']}")
+            if res["errors"] > base["errors"]:
+                problems.append(f"{name} c={level}: errors {res['errors']} vs baseline {base['errors']}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark API routes against a seeded DB and mock AI provider.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario per level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--snapshot", type=Path, help="reuse a synthetic snapshot instead of generating one")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--articles", type=int, default=300)
+    parser.add_argument("--ai-latency-ms", type=float, default=200)
+    parser.add_argument("--ai-jitter-ms", type=float, default=50)
+    parser.add_argument("--ai-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--save-baseline", type=Path, help="write results JSON as the new baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline and exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    if args.baseline and not args.baseline.is_file():
+        parser.error(f"no baseline at {args.baseline}; record one with --save-baseline {args.baseline}")
+
+    provider_argv = [
+        "bench.mock_ai",
+        "--latency-ms", str(args.ai_latency_ms),
+        "--jitter-ms", str(args.ai_jitter_ms),
+        "--error-rate", str(args.ai_error_rate),
+        "--seed", "1",
+    ]
+    with launch_stack(provider_argv, workers=args.workers, snapshot=args.snapshot, users=args.users, articles=args.articles) as stack:
+        results = asyncio.run(drive(stack.base_url, scenarios, levels, args.requests, stack.users, stack.articles))
+
+    report = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "workers": args.workers, "results": results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print("no regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
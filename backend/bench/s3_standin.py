@@ -0,0 +1,132 @@
+"""Local S3-compatible stand-in for STORAGE_BACKEND=s3 (path-style, one bucket, SigV4).
+
+    python -m bench.s3_standin --port 9200 --bucket uploads --data-dir /tmp/s3
+    STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://127.0.0.1:9200 S3_BUCKET=uploads \\
+        S3_ACCESS_KEY_ID=standin S3_SECRET_ACCESS_KEY=standin-secret uvicorn main:app
+
+Serves PUT, GET and HEAD on ``/<bucket>/<key>``. Header-signed and presigned requests are
+both checked like S3 does: the signature, presigned expiry, ``x-amz-content-sha256``,
+``x-amz-checksum-sha256`` and the signed Content-Length. CORS is open, so browsers can PUT
+presigned uploads from the dev frontend. Objects are stored as files under --data-dir.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import unquote
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+
+from app.services.storage import UNSIGNED_PAYLOAD, canonical_request, sigv4_signature, uri_encode
+
+_AUTH_RE = re.compile(r"AWS4-HMAC-SHA256 Credential=([^,]+), *SignedHeaders=([^,]+), *Signature=([0-9a-f]+)")
+
+
+def _error(status: int, code: str) -> Response:
+    return Response(f"<Error><Code>{code}</Code></Error>", status_code=status, media_type="application/xml")
+
+
+def create_standin_app(bucket: str, data_dir: Path, access_key: str, secret_key: str, region: str) -> Starlette:
+    def check_signature(request: Request) -> Optional[Response]:
+        query = dict(request.query_params)
+        auth = request.headers.get("authorization")
+        if auth:
+            match = _AUTH_RE.match(auth)
+            if match is None:
+                return _error(403, "AccessDenied")
+            credential, signed, signature = match.groups()
+            amz_date = request.headers.get("x-amz-date", "")
+            payload_hash = request.headers.get("x-amz-content-sha256", UNSIGNED_PAYLOAD)
+        elif "X-Amz-Signature" in query:
+            credential, signed = query["X-Amz-Credential"], query["X-Amz-SignedHeaders"]
+            signature = query.pop("X-Amz-Signature")
+            amz_date = query["X-Amz-Date"]
+            payload_hash = UNSIGNED_PAYLOAD
+            issued = datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            if (datetime.now(timezone.utc) - issued).total_seconds() > int(query["X-Amz-Expires"]):
+                return _error(403, "AccessDenied")
+        else:
+            return _error(403, "AccessDenied")
+        if credential != f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request":
+            return _error(403, "InvalidAccessKeyId")
+        headers: Dict[str, str] = {name: request.headers.get(name, "") for name in signed.split(";")}
+        path = uri_encode(unquote(request.url.path), "/")
+        canonical = canonical_request(request.method, path, query, headers, payload_hash)
+        if not hmac.compare_digest(sigv4_signature(secret_key, region, amz_date, canonical), signature):
+            return _error(403, "SignatureDoesNotMatch")
+        return None
+
+    def object_path(request: Request) -> Optional[Path]:
+        key = request.path_params["key"]
+        if request.path_params["bucket"] != bucket or ".." in key.split("/"):
+            return None
+        return data_dir / key
+
+    async def put_object(request: Request) -> Response:
+        denied = check_signature(request)
+        if denied is not None:
+            return denied
+        path = object_path(request)
+        if path is None:
+            return _error(404, "NoSuchBucket")
+        body = await request.body()
+        declared = request.headers.get("x-amz-content-sha256", UNSIGNED_PAYLOAD)
+        if declared != UNSIGNED_PAYLOAD and declared != hashlib.sha256(body).hexdigest():
+            return _error(400, "XAmzContentSHA256Mismatch")
+        checksum = request.headers.get("x-amz-checksum-sha256")
+        if checksum is not None and checksum != base64.b64encode(hashlib.sha256(body).digest()).decode():
+            return _error(400, "BadDigest")
+        if int(request.headers.get("content-length", len(body))) != len(body):
+            return _error(400, "IncompleteBody")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+        return Response(status_code=200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    async def get_object(request: Request) -> Response:
+        # reads are public, like a bucket behind STORAGE_PUBLIC_BASE_URL; HEAD is how the API checks existence
+        path = object_path(request)
+        if path is None or not path.is_file():
+            return _error(404, "NoSuchKey")
+        return FileResponse(path)
+
+    routes = [
+        Route("/{bucket}/{key:path}", put_object, methods=["PUT"]),
+        Route("/{bucket}/{key:path}", get_object, methods=["GET", "HEAD"]),
+    ]
+    middleware = [
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["GET", "HEAD", "PUT"], allow_headers=["*"], expose_headers=["ETag"])
+    ]
+    return Starlette(routes=routes, middleware=middleware)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a local S3-compatible stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--bucket", default="uploads")
+    parser.add_argument("--data-dir", type=Path, default=Path("s3-data"))
+    parser.add_argument("--access-key", default="standin")
+    parser.add_argument("--secret-key", default="standin-secret")
+    parser.add_argument("--region", default="us-east-1")
+    args = parser.parse_args(argv)
+    app = create_standin_app(args.bucket, args.data_dir, args.access_key, args.secret_key, args.region)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Serialization micro-benchmark for the list routes (no server, no database).
+
+    python -m bench.serialization                 # 1,000-item lists
+    python -m bench.serialization --items 5000 --repeat 20
+
+For each list it times, from rows as the DB returns them to response bytes:
+
+* pydantic - read models built per row, then FastAPI's response_model pass
+             (``serialize_response``) and the stock JSONResponse (stdlib json);
+* dicts    - the routes' row-to-dict helpers rendered by FastJSONResponse on stdlib json;
+* orjson   - the same dicts rendered by FastJSONResponse with orjson (when installed).
+
+It checks that every path decodes to the same JSON before reporting the best of
+``--repeat`` runs.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.ai import card_dicts
+from app.api.articles import article_dicts
+from app.core import responses
+from app.core.responses import FastJSONResponse, rows_as_dicts
+from app.db.synthetic import COLORS, SCENES, TAG_WORDS
+from app.schemas.article import ArticleRead
+from app.schemas.card import CardDefinitionRead, CardFace
+from app.schemas.reading import ReadingSummary
+
+
+def article_rows(rng: random.Random, n: int):
+    start = datetime(2026, 1, 1)
+    rows, tags, likes, authors = [], {}, {}, {}
+    for i in range(1, n + 1):
+        body = "\n\n".join(rng.choice(SCENES) for _ in range(8))
+        author_id = rng.randint(1, max(n // 10, 1))
+        rows.append(
+            (
+                i,
+                f"卡牌解析 - {rng.choice(TAG_WORDS)} #{i}",
+                f"> 摘要：{rng.choice(SCENES)}\n\n{body}",
+                "".join(f"<p>{line}</p>\n" for line in body.split("\n\n")),
+                True,
+                rng.random() < 0.5,
+                rng.random() < 0.1,
+                author_id,
+                i if rng.random() < 0.5 else None,
+                start + timedelta(minutes=i, microseconds=rng.randint(0, 999_999)),
+            )
+        )
+        tags[i] = rng.sample(TAG_WORDS, 3)
+        likes[i] = rng.randint(0, 50)
+        authors[author_id] = f"用户{author_id}"
+    return rows, tags, likes, authors
+
+
+def reading_rows(rng: random.Random, n: int):
+    start = datetime(2026, 1, 1)
+    return [
+        (i, "性格色彩", rng.choice(SCENES), start + timedelta(minutes=i, microseconds=rng.randint(0, 999_999)))
+        for i in range(1, n + 1)
+    ]
+
+
+def card_rows(rng: random.Random, n: int):
+    def face(side: str, i: int):
+        return (f"{side}{i}", f"{side.upper()} {i}", rng.randint(1, 5), rng.choice(COLORS), f"/cards/{side}-{i}.png")
+
+    return [(f"CARD-{i:04d}", *face("正", i), *face("反", i)) for i in range(n)]
+
+
+def pydantic_articles(data) -> List[ArticleRead]:
+    rows, tags, likes, authors = data
+    return [
+        ArticleRead(
+            id=row[0],
+            title=row[1],
+            content_markdown=row[2],
+            content_html=row[3],
+            is_published=row[4],
+            is_auto_generated=row[5],
+            is_featured=row[6],
+            author_id=row[7],
+            author_name=authors.get(row[7]),
+            from_reading_id=row[8],
+            tags=tags.get(row[0], []),
+            created_at=row[9],
+            likes_count=likes.get(row[0], 0),
+        )
+        for row in data[0]
+    ]
+
+
+def pydantic_readings(rows) -> List[Any]:
+    # what load_only ORM objects looked like to the response_model pass
+    fields = tuple(ReadingSummary.model_fields)
+    return [SimpleNamespace(**dict(zip(fields, row))) for row in rows]
+
+
+def pydantic_cards(rows) -> List[CardDefinitionRead]:
+    def face(values):
+        return CardFace(title=values[0], english=values[1], value=values[2], color=values[3], image=values[4])
+
+    return [CardDefinitionRead(id=row[0], front=face(row[1:6]), back=face(row[6:11])) for row in rows]
+
+
+def baseline_path(response_type: Any, build: Callable[[Any], Any]) -> Callable[[Any], bytes]:
+    field = create_model_field("Response", response_type, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def run(data: Any) -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=build(data), is_coroutine=True))
+        return JSONResponse(content).body
+
+    return run
+
+
+def best_ms(fn: Callable[[Any], bytes], data: Any, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(items: int, repeat: int) -> Dict[str, Dict[str, Optional[float]]]:
+    rng = random.Random(1)
+    reading_fields = tuple(ReadingSummary.model_fields)
+    cases = {
+        "articles": (
+            article_rows(rng, items),
+            baseline_path(List[ArticleRead], pydantic_articles),
+            lambda data: FastJSONResponse(article_dicts(*data)).body,
+        ),
+        "readings": (
+            reading_rows(rng, items),
+            baseline_path(List[ReadingSummary], pydantic_readings),
+            lambda rows: FastJSONResponse(rows_as_dicts(rows, reading_fields)).body,
+        ),
+        "cards": (
+            card_rows(rng, items),
+            baseline_path(List[CardDefinitionRead], pydantic_cards),
+            lambda rows: FastJSONResponse(card_dicts(rows)).body,
+        ),
+    }
+    has_orjson = responses.orjson is not None
+    report: Dict[str, Dict[str, Optional[float]]] = {}
+    for name, (data, baseline, fast) in cases.items():
+        expected = json.loads(baseline(data))
+        timings: Dict[str, Optional[float]] = {"pydantic": best_ms(baseline, data, repeat)}
+        saved, responses.orjson = responses.orjson, None
+        try:
+            if json.loads(fast(data)) != expected:
+                raise AssertionError(f"{name}: dict path output differs from the pydantic path")
+            timings["dicts"] = best_ms(fast, data, repeat)
+        finally:
+            responses.orjson = saved
+        if has_orjson:
+            if json.loads(fast(data)) != expected:
+                raise AssertionError(f"{name}: orjson output differs from the pydantic path")
+            timings["orjson"] = best_ms(fast, data, repeat)
+        else:
+            timings["orjson"] = None
+        report[name] = timings
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare list-route serialization paths.")
+    parser.add_argument("--items", type=int, default=1000, help="rows per list")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per path; the best is reported")
+    args = parser.parse_args(argv)
+
+    report = run(args.items, args.repeat)
+    print(f"{args.items} items, best of {args.repeat} (ms)")
+    print(f"{'list':<10}{'pydantic':>10}{'dicts':>10}{'orjson':>10}{'speedup':>10}")
+    for name, t in report.items():
+        fastest = t["orjson"] if t["orjson"] is not None else t["dicts"]
+        orjson_ms = f"{t['orjson']:.2f}" if t["orjson"] is not None else "n/a"
+        print(f"{name:<10}{t['pydantic']:>10.2f}{t['dicts']:>10.2f}{orjson_ms:>10}{t['pydantic'] / fastest:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Boot the API (uvicorn + ``main:app``) on a seeded SQLite DB next to a local AI provider."""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.db.synthetic import SyntheticConfig, build_snapshot, restore_snapshot  # noqa: E402
+
+
+@dataclass
+class Stack:
+    base_url: str
+    provider_url: str
+    users: int
+    articles: int
+    workdir: Path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process exited early ({proc.returncode}) while waiting for {url}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"timed out waiting for {url}")
+
+
+@contextmanager
+def launch_stack(
+    provider_argv: List[str],
+    workers: int = 1,
+    snapshot: Optional[Path] = None,
+    users: int = 200,
+    articles: int = 300,
+    extra_env: Optional[Dict[str, str]] = None,
+) -> Iterator[Stack]:
+    """Yield a running stack; `provider_argv` is a module command that accepts `--port`."""
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        tmp_path = Path(tmp)
+        db_path = tmp_path / "bench.sqlite3"
+        if snapshot:
+            restore_snapshot(snapshot, db_path)
+            manifest = json.loads(snapshot.with_suffix(snapshot.suffix + ".json").read_text(encoding="utf-8"))
+            users, articles = manifest["config"]["users"], manifest["config"]["articles"]
+        else:
+            print(f"seeding {db_path} ...", flush=True)
+            build_snapshot(db_path, SyntheticConfig(users=users, articles=articles, readings=users, ai_logs=users, tags=50))
+
+        provider_port, app_port = free_port(), free_port()
+        ai_yaml = tmp_path / "ai.yaml"
+        ai_yaml.write_text(
+            json.dumps(
+                {
+                    "provider": "mock",
+                    "base_url": f"http://127.0.0.1:{provider_port}",
+                    "model": "mock-model",
+                    "chat_completion_path": "/v1/chat/completions",
+                }
+            ),
+            encoding="utf-8",
+        )
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{db_path.as_posix()}",
+            "AI_CONFIG_PATH": str(ai_yaml),
+            "AI_API_KEY": "bench-key",
+            "UPLOAD_DIR": str(tmp_path / "uploads"),
+            "PROFILE_DIR": str(tmp_path / "profiles"),
+            "RATE_LIMIT_LOGIN_PER_MINUTE": "0",
+            "RATE_LIMIT_AI_PER_HOUR": "0",
+            "LOG_LEVEL": "WARNING",
+            **(extra_env or {}),
+        }
+        provider = subprocess.Popen(
+            [sys.executable, "-m", *provider_argv, "--port", str(provider_port)], cwd=BACKEND_DIR, env=env
+        )
+        app = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        try:
+            wait_ready(f"http://127.0.0.1:{app_port}/docs", app)
+            wait_ready(f"http://127.0.0.1:{provider_port}/", provider)
+            yield Stack(
+                base_url=f"http://127.0.0.1:{app_port}",
+                provider_url=f"http://127.0.0.1:{provider_port}",
+                users=users,
+                articles=articles,
+                workdir=tmp_path,
+            )
+        finally:
+            for proc in (app, provider):
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
@@ -1,39 +1,107 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from app.api import auth, ai, articles, admin
+from app.api import auth, ai, articles, admin, notifications, uploads
+from app.core import admission, metrics
+from app.core.compression import CompressionMiddleware
+from app.core.idempotency import IdempotencyMiddleware
 from app.core.config import get_settings
-from app.db.session import init_db
+from app.core.responses import FastJSONResponse
+from app.core.static import UploadFiles
+from app.core.middleware import ProfileRequestMiddleware, RequestTimingMiddleware
+from app.core.observability import configure_logging, instrument_engine
+from app.db.session import async_engine, engine, init_db
+from app.services import ai_usage, archive, images
+from app.services.notifications import broker
 
 settings = get_settings()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    configure_logging(settings.log_level, json_format=settings.log_json)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+    app = FastAPI(title=settings.app_name, default_response_class=FastJSONResponse)
 
+    # innermost of the stack so shed responses still get CORS headers, timing logs and metrics
+    app.add_middleware(admission.AdmissionMiddleware, engines=(engine, async_engine.sync_engine))
+    # outside admission control so replays and attached retries never take an AI slot
+    app.add_middleware(IdempotencyMiddleware)
+    # outside idempotency so stored replays stay uncompressed and are negotiated per request
+    app.add_middleware(CompressionMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID", "X-Profile-ID", "Retry-After", "Idempotent-Replayed", "X-Reading-Reused-From"],
     )
+    app.add_middleware(ProfileRequestMiddleware)
+    app.add_middleware(RequestTimingMiddleware)
 
     app.include_router(auth.router, prefix=settings.api_prefix)
     app.include_router(ai.router, prefix=settings.api_prefix)
     app.include_router(articles.router, prefix=settings.api_prefix)
     app.include_router(admin.router, prefix=settings.api_prefix)
+    app.include_router(notifications.router, prefix=settings.api_prefix)
+    app.include_router(uploads.router, prefix=settings.api_prefix)
+
+    if settings.metrics_enabled:
+        app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
 
     # serve uploads
-    app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+    app.mount("/uploads", UploadFiles(directory=settings.upload_dir), name="uploads")
 
     @app.on_event("startup")
     def startup_event():
         init_db()
 
+    @app.on_event("startup")
+    async def start_loop_monitor():
+        if settings.metrics_enabled or settings.admission_enabled:
+            on_sample = admission.load_state.record_loop_lag if settings.admission_enabled else None
+            app.state.loop_lag_task = asyncio.create_task(
+                metrics.monitor_event_loop_lag(admission.load_state.sample_interval, on_sample=on_sample)
+            )
+
+    @app.on_event("startup")
+    async def start_usage_rollups():
+        if settings.ai_rollup_interval_seconds > 0:
+            app.state.ai_rollup_task = asyncio.create_task(
+                ai_usage.run_periodic(engine, settings.ai_rollup_interval_seconds)
+            )
+
+    @app.on_event("startup")
+    async def start_archive_worker():
+        if settings.archive_interval_seconds > 0:
+            app.state.archive_task = asyncio.create_task(archive.run_worker(engine, settings.archive_interval_seconds))
+
+    @app.on_event("startup")
+    async def start_notifications():
+        await broker.start(settings.notify_queue_size, settings.notify_heartbeat_seconds, settings.notify_bridge_dir)
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await broker.stop()
+        images.shutdown()
+        metrics.mark_worker_dead(os.getpid())
+        for name in ("loop_lag_task", "ai_rollup_task", "archive_task"):
+            task = getattr(app.state, name, None)
+            if task is None:
+                continue
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await async_engine.dispose()
+
     return app
 
 
@@ -0,0 +1,75 @@
+"""Shared fixtures: the app against a throwaway SQLite database, driven in-process.
+
+    cd backend && python -m pytest -q
+
+Settings and engines are created at import time, so the environment is set up here
+before anything under ``app`` is imported.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="backend-tests-"))
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{(_TMP / 'test.sqlite3').as_posix()}",
+        "UPLOAD_DIR": str(_TMP / "uploads"),
+        "PROFILE_DIR": str(_TMP / "profiles"),
+        "ARCHIVE_INTERVAL_SECONDS": "0",
+        "AI_ROLLUP_INTERVAL_SECONDS": "0",
+        "LOG_JSON": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.security import create_token  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from main import app as application
+    from app.db.session import init_db
+
+    init_db()
+    return application
+
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        yield http
+
+
+@pytest.fixture
+def user(app) -> User:
+    with Session(engine) as session:
+        account = User(email=f"user{os.urandom(4).hex()}@example.com", password_hash="x", nickname="tester")
+        session.add(account)
+        session.commit()
+        session.refresh(account)
+        return account
+
+
+def token_for(user_id: int, token_type: str = "access") -> str:
+    return create_token({"sub": str(user_id), "type": token_type}, timedelta(minutes=5))
+
+
+def bearer(user_id: int, token_type: str = "access") -> dict:
+    return {"Authorization": f"Bearer {token_for(user_id, token_type)}"}
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from app.db import compressed
+from app.db.compressed import CompressedJSON, CompressedText, decompress_bytes
+
+
+def test_text_round_trips_and_large_values_are_compressed(monkeypatch):
+    monkeypatch.setattr(compressed.settings, "payload_compression", "zlib")
+    column = CompressedText()
+    small, large = "短", "解读" * 2000
+
+    stored_small = column.process_bind_param(small, None)
+    stored_large = column.process_bind_param(large, None)
+
+    assert stored_small[:1] == compressed.MARKER_PLAIN
+    assert stored_large[:1] == compressed.MARKER_ZLIB
+    assert len(stored_large) < len(large.encode("utf-8")) // 10
+    assert column.process_result_value(stored_small, None) == small
+    assert column.process_result_value(stored_large, None) == large
+
+
+def test_json_round_trips():
+    column = CompressedJSON()
+    value = {"cards": [{"id": "card_01", "side": "back"}] * 100}
+    assert column.process_result_value(column.process_bind_param(value, None), None) == value
+
+
+def test_legacy_uncompressed_rows_still_read():
+    assert CompressedText().process_result_value("plain text row", None) == "plain text row"
+    assert CompressedJSON().process_result_value('["a", 1]', None) == ["a", 1]
+    assert CompressedText().process_result_value(None, None) is None
+
+
+def test_codec_none_stores_plain(monkeypatch):
+    monkeypatch.setattr(compressed.settings, "payload_compression", "none")
+    stored = CompressedText().process_bind_param("x" * 5000, None)
+    assert stored[:1] == compressed.MARKER_PLAIN
+    assert decompress_bytes(stored) == b"x" * 5000
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import pytest
+from sqlmodel import Session, func, select
+
+from app.core.config import get_settings
+from app.core.idempotency import _fingerprint
+from app.db.session import engine
+from app.models.article import Article, Comment
+from app.models.user import User
+
+from conftest import bearer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def article(user) -> Article:
+    with Session(engine) as session:
+        post = Article(author_id=user.id, title="t", content_markdown="m", content_html="<p>m</p>", is_published=True)
+        session.add(post)
+        session.commit()
+        session.refresh(post)
+        return post
+
+
+def _comment_count(article_id: int) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Comment).where(Comment.article_id == article_id)).one()
+
+
+async def test_retry_replays_the_stored_response(client, user, article):
+    headers = {**bearer(user.id), "Idempotency-Key": "replay-1"}
+    first = await client.post(f"/api/articles/{article.id}/comments", json={"content": "hi"}, headers=headers)
+    retry = await client.post(f"/api/articles/{article.id}/comments", json={"content": "hi"}, headers=headers)
+
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert _comment_count(article.id) == 1
+
+
+async def test_key_reused_with_a_different_request_is_422(client, user, article):
+    headers = {**bearer(user.id), "Idempotency-Key": "reuse-1"}
+    await client.post(f"/api/articles/{article.id}/comments", json={"content": "one"}, headers=headers)
+    other = await client.post(f"/api/articles/{article.id}/comments", json={"content": "two"}, headers=headers)
+
+    assert other.status_code == 422
+    assert _comment_count(article.id) == 1
+
+
+async def test_keys_are_scoped_per_caller(client, user, article):
+    with Session(engine) as session:
+        other = User(email=f"other-{user.id}@example.com", password_hash="x")
+        session.add(other)
+        session.commit()
+        session.refresh(other)
+    for account in (user, other):
+        response = await client.post(
+            f"/api/articles/{article.id}/comments",
+            json={"content": "same"},
+            headers={**bearer(account.id), "Idempotency-Key": "scoped-1"},
+        )
+        assert response.status_code == 200
+        assert "idempotent-replayed" not in response.headers
+    assert _comment_count(article.id) == 2
+
+
+@pytest.mark.parametrize("token_type", ["refresh", "profile", "upload"])
+async def test_auth_failure_is_not_replayed(client, user, article, token_type):
+    key = {"Idempotency-Key": f"auth-{token_type}"}
+    rejected = await client.post(
+        f"/api/articles/{article.id}/comments", json={"content": "hi"}, headers={**key, **bearer(user.id, token_type)}
+    )
+    retried = await client.post(
+        f"/api/articles/{article.id}/comments", json={"content": "hi"}, headers={**key, **bearer(user.id)}
+    )
+
+    assert rejected.status_code == 401
+    assert retried.status_code == 200
+    assert "idempotent-replayed" not in retried.headers
+    assert _comment_count(article.id) == 1
+
+
+async def test_oversized_keyed_body_is_413(client, user, article, monkeypatch):
+    monkeypatch.setattr(get_settings(), "idempotency_max_request_bytes", 64)
+    headers = {**bearer(user.id), "Idempotency-Key": "big-1"}
+    response = await client.post(f"/api/articles/{article.id}/comments", json={"content": "x" * 100}, headers=headers)
+
+    assert response.status_code == 413
+    assert _comment_count(article.id) == 0
+
+
+async def test_oversized_streamed_body_is_413_without_content_length(client, user, article, monkeypatch):
+    monkeypatch.setattr(get_settings(), "idempotency_max_request_bytes", 64)
+
+    async def chunks():
+        for _ in range(10):
+            yield b'{"content": "' if _ == 0 else b"xxxxxxxxxxxxxxxx"
+
+    headers = {**bearer(user.id), "Idempotency-Key": "big-2", "Content-Type": "application/json"}
+    response = await client.post(f"/api/articles/{article.id}/comments", content=chunks(), headers=headers)
+
+    assert response.status_code == 413
+
+
+def _multipart(boundary: str, file_bytes: bytes, field: str = "scene") -> tuple:
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="scene_desc"\r\n\r\n{field}\r\n'
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="image_files"; filename="a.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + file_bytes + f"\r\n--{boundary}--\r\n".encode()
+    scope = {"type": "http", "method": "POST", "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]}
+    return scope, body
+
+
+async def test_multipart_fingerprint_ignores_the_boundary():
+    path = "/api/ai/card/interpret-with-image"
+    first = await _fingerprint(*_pair(_multipart("aaaa", b"\x89PNG1"), path))
+    rebuilt = await _fingerprint(*_pair(_multipart("bbbbbbbb", b"\x89PNG1"), path))
+    other_file = await _fingerprint(*_pair(_multipart("aaaa", b"\x89PNG2"), path))
+    other_field = await _fingerprint(*_pair(_multipart("aaaa", b"\x89PNG1", field="other"), path))
+
+    assert first == rebuilt
+    assert len({first, other_file, other_field}) == 3
+
+
+def _pair(scope_body: tuple, path: str) -> tuple:
+    scope, body = scope_body
+    return scope, path, body
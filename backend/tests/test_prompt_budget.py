@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from app.services.prompt_budget import Section, estimate_tokens, fit
+
+
+def _sections():
+    return [
+        Section("Layout: ", "x" * 400),  # never cut
+        Section("\nScene: ", "s" * 400, priority=5, min_chars=100),
+        Section("\nSummary: ", "m" * 400, priority=3),
+        Section("\nReference: ", "r" * 400, priority=1),
+    ]
+
+
+def _tokens(sections) -> int:
+    return sum(estimate_tokens(s.render()) for s in sections)
+
+
+def test_within_budget_or_unlimited_is_untouched():
+    full = _tokens(_sections())
+    for budget in (0, full):
+        result = fit(_sections(), budget)
+        assert result.truncated == []
+        assert result.tokens == full
+        assert [s.text for s in result.sections] == [s.text for s in _sections()]
+
+
+def test_lowest_priority_is_cut_first_and_only_as_far_as_needed():
+    full = _tokens(_sections())
+    result = fit(_sections(), full - 20)
+    layout, scene, summary, reference = result.sections
+
+    assert result.truncated == ["Reference"]
+    assert 0 < len(reference.text) < 400
+    assert reference.text.endswith("…")
+    assert (layout.text, scene.text, summary.text) == ("x" * 400, "s" * 400, "m" * 400)
+    assert result.tokens <= full - 20
+
+
+def test_cuts_continue_in_priority_order_and_respect_min_chars():
+    result = fit(_sections(), estimate_tokens("Layout: " + "x" * 400) + 10)
+    layout, scene, summary, reference = result.sections
+
+    assert result.truncated == ["Reference", "Summary", "Scene"]
+    assert reference.text == "" and summary.text == ""
+    assert scene.text == "s" * 100 + "…"  # cut to min_chars, not out
+    assert layout.text == "x" * 400  # priority None is never cut
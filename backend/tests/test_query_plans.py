@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from sqlmodel import create_engine
+
+from app.db.query_plans import check_query_plans, seed_plan_fixture
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{(tmp_path / 'plans.sqlite3').as_posix()}")
+    seed_plan_fixture(engine)
+    try:
+        assert check_query_plans(engine) == {}
+    finally:
+        engine.dispose()
+
+
+def test_plan_check_flags_a_full_scan(tmp_path):
+    engine = create_engine(f"sqlite:///{(tmp_path / 'plans.sqlite3').as_posix()}")
+    seed_plan_fixture(engine)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_readingcard_layout_reading")
+        failures = check_query_plans(engine)
+    finally:
+        engine.dispose()
+    assert "reading_cards.readings" in failures
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+
+import httpx
+import pytest
+
+from app.services.storage import S3Storage, canonical_request, sigv4_signature
+from bench.s3_standin import create_standin_app
+
+pytestmark = pytest.mark.anyio
+
+ACCESS, SECRET, REGION, BUCKET = "standin", "standin-secret", "us-east-1", "uploads"
+KEY = "2026/01/01/test_0123456789abcdef.png"
+
+
+@pytest.fixture
+def storage() -> S3Storage:
+    return S3Storage("http://s3.test", BUCKET, REGION, ACCESS, SECRET)
+
+
+@pytest.fixture
+async def bucket(tmp_path):
+    app = create_standin_app(BUCKET, tmp_path, ACCESS, SECRET, REGION)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://s3.test") as http:
+        yield http, tmp_path
+
+
+def test_sigv4_matches_the_aws_documented_example():
+    # "GET Object" example from the AWS Signature Version 4 documentation for S3
+    headers = {
+        "host": "examplebucket.s3.amazonaws.com",
+        "range": "bytes=0-9",
+        "x-amz-content-sha256": hashlib.sha256(b"").hexdigest(),
+        "x-amz-date": "20130524T000000Z",
+    }
+    canonical = canonical_request("GET", "/test.txt", {}, headers, headers["x-amz-content-sha256"])
+    signature = sigv4_signature("wJalrXUtnFEMI/K7MDENG/bPxRfiCYEXAMPLEKEY", "us-east-1", "20130524T000000Z", canonical)
+    assert signature == "f0e8bdb87c964420e857bd35b5d6ed310bd44f0170aba48dd91039c6036bdb41"
+
+
+async def test_presigned_put_is_accepted_for_exactly_the_signed_bytes(storage, bucket):
+    http, root = bucket
+    data = b"\x89PNG" + bytes(range(256))
+    url, headers = storage.presign_put(KEY, "image/png", len(data), hashlib.sha256(data).hexdigest(), 600)
+
+    response = await http.put(url, content=data, headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert (root / KEY).read_bytes() == data
+
+
+async def test_presigned_put_rejects_other_bodies(storage, bucket):
+    http, root = bucket
+    data = b"\x89PNG" + bytes(range(256))
+    url, headers = storage.presign_put(KEY, "image/png", len(data), hashlib.sha256(data).hexdigest(), 600)
+
+    tampered = await http.put(url, content=data[:-1] + b"\x00", headers=headers)  # same length
+    longer = await http.put(url, content=data + b"x", headers=headers)  # content-length is signed
+    other_type = await http.put(url, content=data, headers={**headers, "content-type": "text/html"})
+
+    assert tampered.status_code == 400
+    assert longer.status_code == 403
+    assert other_type.status_code == 403
+    assert not (root / KEY).exists()
+
+
+async def test_header_signed_put(storage, bucket):
+    http, root = bucket
+    data = b"hello"
+    headers = storage._signed_headers("PUT", KEY, {"content-type": "text/plain"}, hashlib.sha256(data).hexdigest())
+
+    response = await http.put(storage.object_path(KEY), content=data, headers=headers)
+    forged = await http.put(
+        storage.object_path(KEY), content=data, headers={**headers, "authorization": headers["authorization"][:-1] + "0"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert (root / KEY).read_bytes() == data
+    assert forged.status_code == 403
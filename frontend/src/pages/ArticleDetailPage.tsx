@@ -24,11 +24,36 @@ function ArticleDetailPage() {
     load();
   }, [id]);
 
+  // live comments and likes instead of re-fetching; EventSource reconnects on its own
+  useEffect(() => {
+    const source = new EventSource(`/api/notifications/stream?article_id=${id}`);
+    let opened = false;
+    const refetch = async () => {
+      const c = await api.get(`/articles/${id}/comments`);
+      setComments(c.data);
+    };
+    source.onopen = () => {
+      // catch up on anything missed while disconnected
+      if (opened) refetch();
+      opened = true;
+    };
+    source.addEventListener('comment', (e) => {
+      const { comment: c } = JSON.parse((e as MessageEvent).data);
+      setComments((prev) => (prev.some((p) => p.id === c.id) ? prev : [...prev, c]));
+    });
+    source.addEventListener('like', (e) => {
+      const { likes_count } = JSON.parse((e as MessageEvent).data);
+      setArticle((prev: any) => (prev ? { ...prev, likes_count } : prev));
+    });
+    source.addEventListener('resync', refetch);
+    return () => source.close();
+  }, [id]);
+
   const submitComment = async () => {
     if (!comment) return;
     try {
       const { data } = await api.post(`/articles/${id}/comments`, { content: comment });
-      setComments((prev) => [...prev, data]);
+      setComments((prev) => (prev.some((p) => p.id === data.id) ? prev : [...prev, data]));
       setComment('');
     } catch (err: any) {
       message.error(err.response?.data?.detail || '评论失败');
@@ -96,7 +121,7 @@ function ArticleDetailPage() {
                 <Button danger>删除</Button>
               </Popconfirm>
             )}
-            <Button onClick={like}>点赞</Button>
+            <Button onClick={like}>点赞 {article.likes_count || 0}</Button>
             <Button onClick={goBack}>返回</Button>
           </Space>
         }
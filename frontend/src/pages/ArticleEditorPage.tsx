@@ -2,7 +2,7 @@
 import { Card, Form, Input, Button, Space, message, Switch } from 'antd';
 import { UploadOutlined } from '@ant-design/icons';
 import MDEditor from '@uiw/react-md-editor';
-import api from '../utils/api';
+import api, { uploadFile } from '../utils/api';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 
 function ArticleEditorPage() {
@@ -34,12 +34,9 @@ function ArticleEditorPage() {
   }, [editId, form]);
 
   const handleUpload = async (file: File) => {
-    const fd = new FormData();
-    fd.append('file', file);
     setUploading(true);
     try {
-      const { data } = await api.post('/ai/upload', fd);
-      setCoverUrl(data.url);
+      setCoverUrl(await uploadFile(file, file.name));
       message.success('封面上传成功');
     } catch (err: any) {
       message.error(err.response?.data?.detail || err.message || '上传失败');
@@ -5,7 +5,7 @@ import MarkdownPreview from '@uiw/react-markdown-preview';
 import '@uiw/react-markdown-preview/markdown.css';
 import { jsPDF } from 'jspdf';
 import html2canvas from 'html2canvas';
-import api from '../utils/api';
+import api, { uploadFile } from '../utils/api';
 import CardSetBoard, { type CardSetHandle, type CardSetState } from '../components/CardSetBoard';
 import useAuthStore from '../stores/auth';
 
@@ -225,15 +225,7 @@ function ParsePage() {
       reader.readAsDataURL(blob);
     });
 
-  const uploadImage = async (blob: Blob) => {
-    const fd = new FormData();
-    fd.append('file', blob, 'cardset.png');
-    const token = useAuthStore.getState().accessToken;
-    const { data } = await api.post('/ai/upload', fd, {
-      headers: token ? { Authorization: `Bearer ${token}` } : undefined,
-    });
-    return data.url as string;
-  };
+  const uploadImage = (blob: Blob) => uploadFile(blob, 'cardset.png');
 
   const exportResultImage = async () => {
     if (!resultCardRef.current) {
@@ -355,7 +347,6 @@ function ParsePage() {
 
   const archiveArticle = async () => {
     const values = form.getFieldsValue();
-    const sceneDesc = values.scene_desc || '';
     const cardType = values.card_type || '未命名卡组';
     if (!user) {
       message.warning('请先登录后再归档');
@@ -366,6 +357,10 @@ function ParsePage() {
       message.warning('暂无解析结果可归档');
       return;
     }
+    if (!result?.id) {
+      message.warning('解析记录尚未保存，暂无法归档');
+      return;
+    }
     if (!boardRef.current?.captureImage) {
       message.warning('当前无可导出的牌阵图片');
       return;
@@ -374,30 +369,19 @@ function ParsePage() {
       setArchiving(true);
       const blob = await boardRef.current.captureImage();
       const coverUrl = await uploadImage(blob);
-      const markdown = `![牌阵封面](${coverUrl})\n\n> 摘要：${sceneDesc || '未提供'}\n\n${responseText}`;
-      const tagNames = Array.from(
-        new Set(
-          [cardType, '卡牌档案', '卡牌', '性格色彩', '解析']
-            .map((t) => (t || '').trim())
-            .filter((t) => t && !/^\d+$/.test(t)),
-        ),
-      );
-      const title = `卡牌解析 - ${cardType}`;
-
       const token = useAuthStore.getState().accessToken;
+      // the server renders the article (same markdown, title and default tags) in its archive queue
       const { data } = await api.post(
-        '/articles',
+        '/articles/archive',
         {
-          title,
-          content_markdown: markdown,
-          is_published: false,
-          is_auto_generated: true,
-          tag_names: tagNames,
-          from_reading_id: result?.id || null,
+          reading_id: result.id,
+          analysis: responseText,
+          cover_url: coverUrl,
+          tag_names: [cardType],
         },
         token ? { headers: { Authorization: `Bearer ${token}` } } : undefined,
       );
-      message.success(`已归档为文章 #${data.id}`);
+      message.success(data.article_id ? `已归档为文章 #${data.article_id}` : '已加入归档队列');
     } catch (err: any) {
       if (err.response?.status === 401) {
         message.error('登录已过期，请重新登录后再归档');
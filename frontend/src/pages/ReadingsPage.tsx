@@ -1,7 +1,7 @@
 ﻿import { useMemo, useState } from 'react';
 import { useQuery } from '@tanstack/react-query';
 import { Card, Button, Tag, Space, Typography, Modal } from 'antd';
-import api from '../utils/api';
+import api, { thumbnailUrl } from '../utils/api';
 import { useNavigate } from 'react-router-dom';
 import useAuthStore from '../stores/auth';
 
@@ -67,7 +67,7 @@ function ReadingsPage() {
           const cover = coverMatch ? coverMatch[1] : null;
           return (
             <article key={item.id} style={styles.card}>
-              {cover ? <img src={cover} alt={item.title} style={styles.cover} /> : <div style={styles.cover} />}
+              {cover ? <img src={thumbnailUrl(cover, 640)} loading="lazy" alt={item.title} style={styles.cover} /> : <div style={styles.cover} />}
               <div style={{ padding: '10px 14px 0', display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
                 <span style={styles.badge}>ID: {item.id}</span>
                 <Space size={8}>
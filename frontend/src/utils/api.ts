@@ -14,4 +14,38 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Resized WebP of an uploaded image (served from /uploads/_d/, see backend app/services/images.py).
+// Widths must be one of IMAGE_DERIVATIVE_WIDTHS; other URLs are returned unchanged.
+export const thumbnailUrl = (url: string, width: 160 | 320 | 640 | 1280) => {
+  const match = url.match(/^\/uploads\/(?!_d\/)(.+)$/);
+  return match ? `/uploads/_d/${width}/${match[1]}.webp` : url;
+};
+
+const sha256Hex = async (blob: Blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+// Uploads a file and returns its public URL. The bytes go straight to storage (a presigned
+// S3 PUT, or /api/uploads/direct locally); without WebCrypto (plain-http origins) it falls
+// back to a multipart POST to `path`.
+export const uploadFile = async (file: Blob, filename: string, path = '/ai/upload') => {
+  if (!window.crypto?.subtle) {
+    const fd = new FormData();
+    fd.append('file', file, filename);
+    const { data } = await api.post(path, fd);
+    return data.url as string;
+  }
+  const contentType = file.type || 'application/octet-stream';
+  const { data } = await api.post(`${path}/presign`, {
+    filename,
+    content_type: contentType,
+    size: file.size,
+    sha256: await sha256Hex(file),
+  });
+  const res = await fetch(data.upload_url, { method: data.method, headers: data.headers, body: file });
+  if (!res.ok) throw new Error(`上传失败 (${res.status})`);
+  return data.url as string;
+};
+
 export default api;